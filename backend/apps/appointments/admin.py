@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Appointment, AppointmentSlotLock, AppointmentHistory, AppointmentProposal
+from .models import Appointment, AppointmentSlotLock, AppointmentHistory, AppointmentProposal, DailyClinicStats
 
 
 @admin.register(Appointment)
@@ -54,6 +54,14 @@ class AppointmentSlotLockAdmin(admin.ModelAdmin):
     list_filter = ['date']
 
 
+@admin.register(DailyClinicStats)
+class DailyClinicStatsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'appointments_total', 'billable_count', 'revenue', 'new_patients', 'computed_at']
+    date_hierarchy = 'date'
+    ordering = ['-date']
+    readonly_fields = ['computed_at']
+
+
 @admin.register(AppointmentHistory)
 class AppointmentHistoryAdmin(admin.ModelAdmin):
     list_display = ['appointment', 'action_type', 'actor_type', 'actor', 'created_at']
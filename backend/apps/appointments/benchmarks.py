@@ -0,0 +1,561 @@
+"""
+Benchmarks du parcours de réservation.
+
+Jeux de données générés par factory-boy (graine fixe, donc reproductibles)
+puis mesure des étapes chaudes de la réservation :
+
+- validation d'une demande (AppointmentCreateSerializer.validate) ;
+- créneaux disponibles (un jour en cache, une plage de 31 jours à froid) ;
+- verrouillage d'un créneau (lock_slot) ;
+- workflow bidirectionnel : respond (proposition), accept, counter_propose ;
+- statistiques du dashboard (instantané invalidé) et données des graphiques.
+
+Chaque scénario est exécuté ``repeat`` fois ; on retient les percentiles de
+latence, le nombre médian de requêtes SQL et le temps passé en base. Les
+résultats sont sérialisables en JSON pour comparer deux commits
+(cf. compare_results et la commande benchmark_booking).
+
+Les appels d'API passent par toute la pile (middlewares compris) avec un
+client authentifié : les throttles anonymes ne s'appliquent donc pas.
+
+isolated_services() remplace les services partagés (cache Redis, verrous,
+throttling, broker Celery, channel layer) par des équivalents locaux : un
+benchmark n'écrit rien dans le Redis de l'application et n'envoie aucune
+tâche aux workers réels.
+"""
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+
+import django
+import factory
+import factory.random
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.content_management.models import ClinicSchedule
+from config.query_budget import record_queries
+from .locks import get_slot_lock_backend
+from .models import Appointment
+from .rollups import rollup_daily_stats
+from .serializers import AppointmentCreateSerializer
+from .slot_cache import invalidate_all_bitmaps
+from .slots import MAX_SLOTS_RANGE_DAYS, get_available_slots
+from .stats import invalidate_dashboard_stats
+
+User = get_user_model()
+
+# Tailles de jeux de données disponibles (nombre de RDV)
+DATASET_SIZES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+HISTORY_DAYS = 730  # Profondeur de l'historique généré
+FUTURE_DAYS = 90  # RDV à venir
+FUTURE_FILL_RATE = 0.5  # Part des créneaux futurs occupés par un RDV actif
+PATIENT_RATIO = 50  # Un compte patient pour 50 RDV
+LINKED_RATE = 0.7  # Part des RDV pris par un patient connecté
+BATCH_SIZE = 5000
+
+# Répartition des statuts (le premier RDV d'un créneau peut être actif,
+# les suivants sont forcément clos : contrainte unique_active_appointment_slot)
+PAST_STATUSES = {'completed': 70, 'cancelled': 15, 'rejected': 10, 'no_show': 5}
+FUTURE_ACTIVE_STATUSES = {
+    'confirmed': 60, 'pending': 25,
+    'awaiting_patient_response': 10, 'awaiting_admin_response': 5,
+}
+CLOSED_STATUSES = {'cancelled': 60, 'rejected': 25, 'rejected_by_patient': 15}
+
+REASONS = [
+    'Contrôle de routine',
+    'Baisse de vision',
+    'Renouvellement d\'ordonnance',
+    'Douleur oculaire',
+    'Suivi post-opératoire',
+    '',
+]
+
+PERCENTILES = (50, 95, 99)
+
+# Services locaux substitués pendant un benchmark (cf. isolated_services)
+ISOLATED_SETTINGS = {
+    'CACHES': {
+        'default': {
+            'BACKEND': 'config.cache_backends.InstrumentedLocMemCache',
+            'LOCATION': 'benchmark',
+        }
+    },
+    'SLOT_LOCK_BACKEND': 'apps.appointments.locks.DatabaseSlotLockBackend',
+    'THROTTLE_BACKEND': 'config.rate_limit.CacheGCRABackend',
+    'CELERY_TASK_ALWAYS_EAGER': True,
+    'CELERY_BROKER_URL': 'memory://',
+    'CHANNEL_LAYERS': {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    },
+}
+
+
+class BenchmarkError(Exception):
+    """Un scénario n'a pas pu s'exécuter (réponse inattendue, créneaux épuisés)"""
+
+
+class PatientFactory(factory.django.DjangoModelFactory):
+    """Compte patient (mot de passe haché une seule fois pour tout le lot)"""
+
+    class Meta:
+        model = User
+
+    email = factory.Sequence(lambda n: f'patient{n}@benchmark.vida.local')
+    first_name = factory.Faker('first_name', locale='fr_FR')
+    last_name = factory.Faker('last_name', locale='fr_FR')
+    role = User.Role.PATIENT
+    is_active = True
+
+
+class AppointmentFactory(factory.django.DjangoModelFactory):
+    """RDV ; date, heure et statut sont fournis par seed_dataset"""
+
+    class Meta:
+        model = Appointment
+
+    patient_first_name = factory.Faker('first_name', locale='fr_FR')
+    patient_last_name = factory.Faker('last_name', locale='fr_FR')
+    patient_email = factory.Sequence(lambda n: f'visiteur{n}@benchmark.vida.local')
+    patient_phone = factory.Sequence(lambda n: f'06 {n % 1000:03d} {n // 1000 % 100:02d} {n // 100000 % 100:02d}')
+    consultation_type = factory.Iterator(Appointment.ConsultationType.values)
+    reason = factory.Iterator(REASONS)
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _schedule_times():
+    """Créneaux d'une journée type (8h-12h, 14h-18h, 30 minutes)"""
+    times = []
+    for start, end in ((8, 12), (14, 18)):
+        for minutes in range(start * 60, end * 60, 30):
+            times.append(dt_time(minutes // 60, minutes % 60))
+    return times
+
+
+def ensure_clinic_schedule():
+    """Clinique ouverte du lundi au samedi (8h-12h, 14h-18h), fermée le dimanche"""
+    for day_of_week in range(7):
+        is_open = day_of_week < 6
+        ClinicSchedule.objects.update_or_create(
+            day_of_week=day_of_week,
+            defaults={
+                'is_open': is_open,
+                'morning_start': dt_time(8, 0) if is_open else None,
+                'morning_end': dt_time(12, 0) if is_open else None,
+                'afternoon_start': dt_time(14, 0) if is_open else None,
+                'afternoon_end': dt_time(18, 0) if is_open else None,
+                'slot_duration': 30,
+            }
+        )
+
+
+def seed_dataset(size, seed=42, batch_size=BATCH_SIZE, stdout=None):
+    """
+    Génère ``size`` RDV répartis sur HISTORY_DAYS jours passés et FUTURE_DAYS
+    jours à venir (hors dimanche et aujourd'hui), plus les comptes patients.
+
+    Insertion par bulk_create (les signals ne sont pas déclenchés) puis
+    reconstruction des agrégats journaliers et des bitmaps de créneaux.
+
+    Returns:
+        Nombre de RDV créés
+    """
+    # factory-boy journalise chaque attribut généré en DEBUG
+    factory_logger = logging.getLogger('factory')
+    level = factory_logger.level
+    factory_logger.setLevel(logging.INFO)
+    try:
+        return _seed_dataset(size, seed, batch_size, stdout)
+    finally:
+        factory_logger.setLevel(level)
+
+
+def _seed_dataset(size, seed, batch_size, stdout):
+    factory.random.reseed_random(seed)
+    PatientFactory.reset_sequence()
+    AppointmentFactory.reset_sequence()
+    rng = random.Random(seed)
+    today = timezone.localdate()
+
+    ensure_clinic_schedule()
+
+    password = make_password('BenchmarkPassword123!')
+    patients = User.objects.bulk_create(
+        PatientFactory.build_batch(max(size // PATIENT_RATIO, 10), password=password),
+        batch_size=batch_size
+    )
+
+    days = [
+        today + timedelta(days=offset)
+        for offset in range(-HISTORY_DAYS, FUTURE_DAYS + 1)
+        if offset != 0 and (today + timedelta(days=offset)).weekday() != 6
+    ]
+    slots = [(day, slot_time) for day in days for slot_time in _schedule_times()]
+    rng.shuffle(slots)
+
+    created = 0
+    batch = []
+    for index in range(size):
+        day, slot_time = slots[index % len(slots)]
+        if index >= len(slots):
+            status = _weighted(rng, CLOSED_STATUSES)
+        elif day < today:
+            status = _weighted(rng, PAST_STATUSES)
+        elif rng.random() < FUTURE_FILL_RATE:
+            status = _weighted(rng, FUTURE_ACTIVE_STATUSES)
+        else:
+            status = 'cancelled'
+
+        fields = {'date': day, 'time': slot_time, 'status': status}
+        if rng.random() < LINKED_RATE:
+            patient = rng.choice(patients)
+            fields.update(
+                patient=patient,
+                patient_email=patient.email,
+                patient_first_name=patient.first_name,
+                patient_last_name=patient.last_name,
+            )
+        batch.append(AppointmentFactory.build(**fields))
+
+        if len(batch) >= batch_size:
+            created += len(Appointment.objects.bulk_create(batch))
+            batch = []
+            if stdout:
+                stdout.write(f'   {created}/{size} RDV')
+    if batch:
+        created += len(Appointment.objects.bulk_create(batch))
+
+    rollup_daily_stats(min(days), today - timedelta(days=1))
+    invalidate_all_bitmaps()
+    invalidate_dashboard_stats()
+    return created
+
+
+def _summarize(samples):
+    """Percentiles de latence (ms), requêtes SQL et temps en base d'un scénario"""
+    durations = [duration * 1000 for duration, _, _ in samples]
+    summary = {'runs': len(samples)}
+    if len(durations) > 1:
+        cuts = statistics.quantiles(durations, n=100, method='inclusive')
+        for percentile in PERCENTILES:
+            summary[f'p{percentile}_ms'] = round(cuts[percentile - 1], 3)
+    else:
+        for percentile in PERCENTILES:
+            summary[f'p{percentile}_ms'] = round(durations[0], 3)
+    summary.update(
+        mean_ms=round(statistics.fmean(durations), 3),
+        min_ms=round(min(durations), 3),
+        max_ms=round(max(durations), 3),
+        queries=statistics.median_low([count for _, count, _ in samples]),
+        max_queries=max(count for _, count, _ in samples),
+        db_ms=round(statistics.fmean(db * 1000 for _, _, db in samples), 3),
+    )
+    return summary
+
+
+class Recorder:
+    """Accumule durée, requêtes SQL et temps en base par scénario"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def measure(self, name):
+        with record_queries() as stats:
+            start = time.perf_counter()
+            yield
+            elapsed = time.perf_counter() - start
+        self.samples[name].append((elapsed, stats.count, stats.duration))
+
+    def results(self):
+        return {name: _summarize(samples) for name, samples in self.samples.items()}
+
+
+class BookingBenchmark:
+    """
+    Scénarios du parcours de réservation sur le jeu de données courant
+
+    Usage:
+        results = BookingBenchmark(repeat=50).run()
+    """
+
+    def __init__(self, repeat=50):
+        self.repeat = repeat
+        self.recorder = Recorder()
+        self.today = timezone.localdate()
+
+        self.staff = User.objects.create_user(
+            email=f'staff.{time.time_ns()}@benchmark.vida.local',
+            password='BenchmarkPassword123!',
+            first_name='Staff',
+            last_name='Benchmark',
+            role=User.Role.ADMIN,
+        )
+        self.patient = User.objects.create_user(
+            email=f'patient.{time.time_ns()}@benchmark.vida.local',
+            password='BenchmarkPassword123!',
+            first_name='Patient',
+            last_name='Benchmark',
+            role=User.Role.PATIENT,
+        )
+        self.staff_client = APIClient()
+        self.staff_client.force_authenticate(user=self.staff)
+        self.patient_client = APIClient()
+        self.patient_client.force_authenticate(user=self.patient)
+        self.free_slots = self._collect_free_slots()
+
+    def _collect_free_slots(self):
+        start = self.today + timedelta(days=1)
+        end = self.today + timedelta(days=FUTURE_DAYS)
+        free = deque()
+        while start <= end:
+            chunk_end = min(start + timedelta(days=MAX_SLOTS_RANGE_DAYS - 1), end)
+            for day, times in get_available_slots(start, chunk_end).items():
+                free.extend((day, slot_time) for slot_time in times)
+            start = chunk_end + timedelta(days=1)
+        return free
+
+    def _take_slot(self):
+        if not self.free_slots:
+            raise BenchmarkError('Plus de créneau libre : réduire --repeat')
+        return self.free_slots.popleft()
+
+    def _release_slot(self, slot):
+        self.free_slots.append(slot)
+
+    def _check(self, response, expected=200):
+        if response.status_code != expected:
+            raise BenchmarkError(
+                f'{response.request["PATH_INFO"]} : {response.status_code} '
+                f'(attendu {expected}) {getattr(response, "data", "")}'
+            )
+        return response
+
+    def run(self):
+        """Exécute tous les scénarios et retourne leurs mesures"""
+        for _ in range(self.repeat):
+            self.bench_validate()
+            self.bench_available_slots()
+            self.bench_lock_slot()
+            self.bench_workflow()
+            self.bench_dashboard()
+        return self.recorder.results()
+
+    def bench_validate(self):
+        day, slot_time = self.free_slots[0]
+        serializer = AppointmentCreateSerializer(data={
+            'patient_first_name': 'Jean',
+            'patient_last_name': 'Dupont',
+            'patient_email': 'Jean.Dupont@example.com',
+            'patient_phone': '06 123 45 67',
+            'date': day.isoformat(),
+            'time': slot_time.strftime('%H:%M'),
+            'consultation_type': 'generale',
+            'reason': 'Contrôle de routine',
+        })
+        with self.recorder.measure('validate'):
+            valid = serializer.is_valid()
+        if not valid:
+            raise BenchmarkError(f'validate : {serializer.errors}')
+
+    def bench_available_slots(self):
+        day = self.free_slots[0][0]
+        url = reverse('appointments-available-slots')
+        self.patient_client.get(url, {'date': day.isoformat()})  # bitmap en cache
+        with self.recorder.measure('available_slots'):
+            self._check(self.patient_client.get(url, {'date': day.isoformat()}))
+
+        invalidate_all_bitmaps()
+        start = self.today + timedelta(days=1)
+        with self.recorder.measure('available_slots_range_cold'):
+            self._check(self.patient_client.get(url, {
+                'start': start.isoformat(),
+                'end': (start + timedelta(days=30)).isoformat(),
+            }))
+
+    def bench_lock_slot(self):
+        slot = self._take_slot()
+        lock_id = f'benchmark-{time.time_ns()}'
+        with self.recorder.measure('lock_slot'):
+            self._check(self.patient_client.post(reverse('appointments-lock-slot'), {
+                'date': slot[0].isoformat(),
+                'time': slot[1].strftime('%H:%M'),
+                'lock_id': lock_id,
+            }, format='json'))
+        get_slot_lock_backend().release(slot[0], slot[1], lock_id)
+        self._release_slot(slot)
+
+    def _pending_appointment(self):
+        day, slot_time = self._take_slot()
+        return Appointment.objects.create(
+            patient=self.patient,
+            patient_first_name=self.patient.first_name,
+            patient_last_name=self.patient.last_name,
+            patient_email=self.patient.email,
+            patient_phone='06 123 45 67',
+            date=day,
+            time=slot_time,
+            consultation_type='generale',
+            status='pending',
+        )
+
+    def _respond(self, appointment):
+        proposed = self._take_slot()
+        with self.recorder.measure('respond'):
+            response = self._check(self.staff_client.post(
+                reverse('appointments-respond', args=[appointment.pk]),
+                {
+                    'action': 'propose',
+                    'proposed_date': proposed[0].isoformat(),
+                    'proposed_time': proposed[1].strftime('%H:%M'),
+                    'admin_message': 'Créneau alternatif',
+                },
+                format='json'
+            ))
+        return proposed, response.data['proposal_id']
+
+    def bench_workflow(self):
+        """Proposition acceptée, puis proposition contre-proposée"""
+        appointment = self._pending_appointment()
+        original = (appointment.date, appointment.time)
+        proposed, proposal_id = self._respond(appointment)
+        with self.recorder.measure('accept'):
+            self._check(self.patient_client.post(
+                reverse('appointments-accept', args=[appointment.pk]),
+                {'proposal_id': proposal_id},
+                format='json'
+            ))
+        # Le RDV occupe désormais le créneau proposé ; l'ancien est libre
+        self._release_slot(original)
+
+        appointment = self._pending_appointment()
+        proposed, _ = self._respond(appointment)
+        self._release_slot(proposed)
+        counter = self._take_slot()
+        with self.recorder.measure('counter_propose'):
+            self._check(self.patient_client.post(
+                reverse('appointments-counter-propose', args=[appointment.pk]),
+                {
+                    'proposed_date': counter[0].isoformat(),
+                    'proposed_time': counter[1].strftime('%H:%M'),
+                    'patient_message': 'Plutôt ce créneau',
+                },
+                format='json'
+            ))
+        self._release_slot(counter)
+
+    def bench_dashboard(self):
+        invalidate_dashboard_stats()
+        with self.recorder.measure('dashboard_stats'):
+            self._check(self.staff_client.get(reverse('appointments-dashboard-stats')))
+        with self.recorder.measure('chart_data'):
+            self._check(self.staff_client.get(reverse('appointments-chart-data')))
+
+
+@contextmanager
+def isolated_services():
+    """
+    Exécute un bloc avec cache, verrous, throttling, Celery et channel layer locaux
+
+    Sans cela, un benchmark incrémenterait les versions et écrirait bitmaps
+    et instantanés du dashboard dans le Redis partagé (valables jusqu'à 6 h),
+    poserait des verrous Redis et enverrait notify_admins_task aux workers,
+    qui notifieraient les vrais administrateurs de RDV de la base de test.
+    """
+    from config.celery import app
+
+    # La configuration Celery est figée au premier accès : override_settings
+    # ne suffit pas pour l'application déjà chargée
+    previous = {key: app.conf[key] for key in ('task_always_eager', 'broker_url')}
+    with override_settings(**ISOLATED_SETTINGS):
+        app.conf.update(task_always_eager=True, broker_url='memory://')
+        try:
+            yield
+        finally:
+            app.conf.update(previous)
+
+
+def run_benchmarks(size, repeat=50, seed=42, stdout=None):
+    """
+    Génère le jeu de données puis mesure les scénarios
+
+    Returns:
+        Dictionnaire {'rows', 'seed_seconds', 'scenarios'}
+    """
+    start = time.perf_counter()
+    rows = seed_dataset(size, seed=seed, stdout=stdout)
+    seed_seconds = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'seed_seconds': round(seed_seconds, 1),
+        'scenarios': BookingBenchmark(repeat=repeat).run(),
+    }
+
+
+def compare_results(baseline, current, tolerance=0.2):
+    """
+    Régressions entre deux fichiers de résultats
+
+    Un scénario régresse si son p95 dépasse celui de référence de plus de
+    ``tolerance`` (20 % par défaut) ou s'il exécute plus de requêtes SQL.
+
+    Returns:
+        Liste de (taille, scénario, métrique, référence, actuel)
+    """
+    regressions = []
+    for size, dataset in current.get('datasets', {}).items():
+        reference = baseline.get('datasets', {}).get(size)
+        if not reference:
+            continue
+        for name, result in dataset['scenarios'].items():
+            before = reference['scenarios'].get(name)
+            if not before:
+                continue
+            if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append((size, name, 'p95_ms', before['p95_ms'], result['p95_ms']))
+            if result['queries'] > before['queries']:
+                regressions.append((size, name, 'queries', before['queries'], result['queries']))
+    return regressions
+
+
+def result_metadata(repeat, seed):
+    """Contexte d'exécution enregistré avec les résultats"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'repeat': repeat,
+        'seed': seed,
+    }
@@ -0,0 +1,213 @@
+"""
+Backends de verrouillage temporaire des créneaux.
+
+Le backend est choisi par le setting SLOT_LOCK_BACKEND :
+- DatabaseSlotLockBackend : table AppointmentSlotLock (fallback, dev/tests)
+- RedisSlotLockBackend : SET NX avec TTL, libération vérifiée par propriétaire
+
+Avec Redis, les verrous expirent d'eux-mêmes : plus de lignes à purger ni de
+contention sur la table lors des pics de réservation.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import AppointmentSlotLock
+
+
+DEFAULT_SLOT_LOCK_BACKEND = 'apps.appointments.locks.DatabaseSlotLockBackend'
+DEFAULT_SLOT_LOCK_TTL = 300  # 5 minutes
+
+
+class BaseSlotLockBackend:
+    """Interface commune des backends de verrouillage."""
+
+    def acquire(self, date, time, owner, ttl):
+        """
+        Verrouille un créneau pour owner (ou prolonge son propre verrou).
+
+        Returns:
+            Date d'expiration du verrou, ou None si le créneau est déjà
+            verrouillé par quelqu'un d'autre
+        """
+        raise NotImplementedError
+
+    def release(self, date, time, owner):
+        """
+        Libère un créneau si owner en est le propriétaire.
+
+        Returns:
+            True si un verrou a été supprimé
+        """
+        raise NotImplementedError
+
+    def get_locks(self, layouts):
+        """
+        Retourne les verrous valides des créneaux donnés.
+
+        Args:
+            layouts: Dictionnaire {date: [heures]} des créneaux à examiner
+
+        Returns:
+            Dictionnaire {date: {heure: expires_at}}
+        """
+        raise NotImplementedError
+
+    def cleanup(self):
+        """Supprime les verrous expirés. Retourne le nombre supprimé."""
+        return 0
+
+
+class DatabaseSlotLockBackend(BaseSlotLockBackend):
+    """Verrous stockés dans la table AppointmentSlotLock."""
+
+    def acquire(self, date, time, owner, ttl):
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=ttl)
+
+        with transaction.atomic():
+            lock = AppointmentSlotLock.objects.select_for_update().filter(
+                date=date, time=time
+            ).first()
+            if lock and lock.expires_at > now and lock.locked_by != owner:
+                return None
+
+            AppointmentSlotLock.objects.update_or_create(
+                date=date,
+                time=time,
+                defaults={
+                    'locked_by': owner,
+                    'expires_at': expires_at
+                }
+            )
+        return expires_at
+
+    def release(self, date, time, owner):
+        deleted, _ = AppointmentSlotLock.objects.filter(
+            date=date, time=time, locked_by=owner
+        ).delete()
+        return deleted > 0
+
+    def get_locks(self, layouts):
+        locks = {}
+        if not layouts:
+            return locks
+
+        rows = AppointmentSlotLock.objects.filter(
+            date__range=(min(layouts), max(layouts)),
+            expires_at__gt=timezone.now()
+        ).values_list('date', 'time', 'expires_at')
+        for slot_date, slot_time, expires_at in rows:
+            locks.setdefault(slot_date, {})[slot_time] = expires_at
+        return locks
+
+    def cleanup(self):
+        deleted, _ = AppointmentSlotLock.objects.filter(
+            expires_at__lt=timezone.now()
+        ).delete()
+        return deleted
+
+
+class RedisSlotLockBackend(BaseSlotLockBackend):
+    """
+    Verrous Redis : une clé par créneau, valeur "<expiration>|<propriétaire>".
+
+    L'acquisition et la libération sont des scripts Lua atomiques : un seul
+    aller-retour, sans course entre la lecture du propriétaire et l'écriture.
+    """
+
+    KEY_PREFIX = 'vida:slots:lock'
+
+    # SET NX si libre, prolongation si déjà détenu par le même propriétaire
+    ACQUIRE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local sep = string.find(current, '|', 1, true)
+    if string.sub(current, sep + 1) ~= ARGV[1] then
+        return 0
+    end
+    redis.call('SET', KEYS[1], ARGV[3] .. '|' .. ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+if redis.call('SET', KEYS[1], ARGV[3] .. '|' .. ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+    # DEL uniquement si le propriétaire correspond
+    RELEASE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local sep = string.find(current, '|', 1, true)
+    if string.sub(current, sep + 1) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+end
+return 0
+"""
+
+    def __init__(self, alias='default'):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection(alias)
+        self._acquire = self.client.register_script(self.ACQUIRE_SCRIPT)
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def _key(self, date, time):
+        return f"{self.KEY_PREFIX}:{date.isoformat()}:{time.strftime('%H:%M:%S')}"
+
+    def acquire(self, date, time, owner, ttl):
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        acquired = self._acquire(
+            keys=[self._key(date, time)],
+            args=[owner, int(ttl * 1000), expires_at.timestamp()]
+        )
+        return expires_at if acquired else None
+
+    def release(self, date, time, owner):
+        return bool(self._release(keys=[self._key(date, time)], args=[owner]))
+
+    def get_locks(self, layouts):
+        slots = [
+            (slot_date, slot_time)
+            for slot_date, times in layouts.items()
+            for slot_time in times
+        ]
+        locks = {}
+        if not slots:
+            return locks
+
+        values = self.client.mget([self._key(*slot) for slot in slots])
+        for (slot_date, slot_time), value in zip(slots, values):
+            if value is None:
+                continue
+            expires_ts = float(value.split(b'|', 1)[0])
+            locks.setdefault(slot_date, {})[slot_time] = datetime.fromtimestamp(
+                expires_ts, tz=dt_timezone.utc
+            )
+        return locks
+
+
+@lru_cache(maxsize=None)
+def get_slot_lock_backend():
+    """Retourne l'instance du backend configuré par SLOT_LOCK_BACKEND."""
+    backend_path = getattr(settings, 'SLOT_LOCK_BACKEND', DEFAULT_SLOT_LOCK_BACKEND)
+    return import_string(backend_path)()
+
+
+@receiver(setting_changed)
+def _reset_slot_lock_backend(setting, **kwargs):
+    if setting == 'SLOT_LOCK_BACKEND':
+        get_slot_lock_backend.cache_clear()
+
+
+def get_slot_lock_ttl():
+    """Durée de vie d'un verrou en secondes (setting SLOT_LOCK_TTL)."""
+    return getattr(settings, 'SLOT_LOCK_TTL', DEFAULT_SLOT_LOCK_TTL)
@@ -0,0 +1,72 @@
+"""
+Commande Django pour reconstruire l'historique des agrégats journaliers
+Usage: python manage.py backfill_daily_stats [--start=YYYY-MM-DD] [--end=YYYY-MM-DD]
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.appointments.models import Appointment
+from apps.appointments.rollups import rollup_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit la table DailyClinicStats sur une plage de dates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=str,
+            help='Première date (défaut: date du plus ancien RDV)'
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            help='Dernière date incluse (défaut: hier)'
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Nombre de jours recalculés par lot (défaut: 31)'
+        )
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Date invalide: {value} (format attendu: YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        chunk_days = max(options['chunk_days'], 1)
+
+        if options['end']:
+            end = self._parse_date(options['end'])
+        else:
+            end = timezone.localdate() - timedelta(days=1)
+
+        if options['start']:
+            start = self._parse_date(options['start'])
+        else:
+            start = Appointment.objects.aggregate(first=Min('date'))['first']
+            if start is None:
+                self.stdout.write(self.style.SUCCESS('✅ Aucun RDV à agréger'))
+                return
+
+        if end < start:
+            raise CommandError('La date de fin doit être postérieure à la date de début')
+
+        self.stdout.write(self.style.WARNING('📊 Reconstruction des agrégats journaliers'))
+        self.stdout.write(f'   Plage: {start} → {end}')
+
+        total_days = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+            total_days += rollup_daily_stats(chunk_start, chunk_end)
+            self.stdout.write(f'   {chunk_start} → {chunk_end}')
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {total_days} jours agrégés'))
@@ -0,0 +1,152 @@
+"""
+Commande Django pour mesurer les performances du parcours de réservation
+Usage: python manage.py benchmark_booking [--sizes 10k 100k 1m] [--repeat=50] [--compare=reference.json]
+
+Les jeux de données sont générés dans une base de test jetable (test_<NAME>),
+jamais dans la base configurée ; cache, verrous, throttling et Celery sont
+locaux (isolated_services) pendant toute la mesure. Les volumes 100k / 1m sont prévus pour
+PostgreSQL (--keepdb évite de recréer le schéma entre deux exécutions).
+"""
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+)
+
+from apps.appointments.benchmarks import (
+    DATASET_SIZES, BenchmarkError, compare_results, isolated_services, result_metadata, run_benchmarks
+)
+from apps.users.audit_sink import get_audit_sink
+
+
+class Command(BaseCommand):
+    help = 'Mesure latences et requêtes SQL du parcours de réservation sur des jeux de 10k à 1M RDV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            choices=list(DATASET_SIZES),
+            default=['10k'],
+            help='Jeux de données à mesurer (défaut: 10k)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Exécutions de chaque scénario (défaut: 50)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Graine des données générées (défaut: 42)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Fichier JSON des résultats (défaut: logs/benchmarks/booking-<commit>.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            help='Fichier JSON de référence (commit précédent)'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Hausse du p95 tolérée avant de signaler une régression (défaut: 0.2 = 20%%)'
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Terminer en erreur si une régression est détectée (CI)'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Conserver la base de test entre deux exécutions'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Référence illisible: {e}")
+
+        setup_test_environment(debug=False)
+        try:
+            with isolated_services():
+                results = self._run(options)
+        finally:
+            teardown_test_environment()
+
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'logs', 'benchmarks', f"booking-{results['meta']['commit'] or 'local'}.json"
+        )
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Résultats écrits dans {output}"))
+
+        if baseline is not None:
+            self._report_regressions(baseline, results, options)
+
+    def _run(self, options):
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            results = {
+                'meta': result_metadata(options['repeat'], options['seed']),
+                'datasets': {},
+            }
+            for size in options['sizes']:
+                self.stdout.write(self.style.WARNING(f"📊 Jeu de données {size} ({DATASET_SIZES[size]} RDV)"))
+                call_command('flush', interactive=False, verbosity=0)
+                try:
+                    dataset = run_benchmarks(
+                        DATASET_SIZES[size], repeat=options['repeat'], seed=options['seed'],
+                        stdout=self.stdout
+                    )
+                except BenchmarkError as e:
+                    raise CommandError(str(e))
+                results['datasets'][size] = dataset
+                self._print_dataset(dataset)
+        finally:
+            # Logs d'audit encore en file (ou dans le lot du thread d'écriture) :
+            # à écrire dans la base de test, pas dans la base configurée à l'atexit
+            get_audit_sink().close()
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+        return results
+
+    def _print_dataset(self, dataset):
+        self.stdout.write(f"   {dataset['rows']} RDV générés en {dataset['seed_seconds']} s")
+        self.stdout.write(
+            f"   {'Scénario':<28} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL':>5} {'DB ms':>7}"
+        )
+        for name, result in dataset['scenarios'].items():
+            self.stdout.write(
+                f"   {name:<28} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f} {result['queries']:>5} {result['db_ms']:>7.2f}"
+            )
+
+    def _report_regressions(self, baseline, results, options):
+        regressions = compare_results(baseline, results, tolerance=options['tolerance'])
+        reference = baseline.get('meta', {}).get('commit') or options['compare']
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"✅ Aucune régression par rapport à {reference}"))
+            return
+
+        self.stdout.write(self.style.ERROR(f"❌ {len(regressions)} régression(s) par rapport à {reference}"))
+        for size, name, metric, before, after in regressions:
+            self.stdout.write(f"   [{size}] {name} {metric}: {before} → {after}")
+        if options['fail_on_regression']:
+            raise CommandError('Régression de performance détectée')
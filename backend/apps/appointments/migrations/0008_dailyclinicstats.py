@@ -0,0 +1,114 @@
+# Generated by Django 5.0.14 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0007_appointment_medical_record_appointmentrequest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyClinicStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True, verbose_name="date")),
+                (
+                    "appointments_total",
+                    models.PositiveIntegerField(default=0, verbose_name="total RDV"),
+                ),
+                (
+                    "pending_count",
+                    models.PositiveIntegerField(default=0, verbose_name="en attente"),
+                ),
+                (
+                    "confirmed_count",
+                    models.PositiveIntegerField(default=0, verbose_name="confirmés"),
+                ),
+                (
+                    "completed_count",
+                    models.PositiveIntegerField(default=0, verbose_name="terminés"),
+                ),
+                (
+                    "awaiting_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="en négociation"
+                    ),
+                ),
+                (
+                    "cancelled_count",
+                    models.PositiveIntegerField(default=0, verbose_name="annulés"),
+                ),
+                (
+                    "rejected_count",
+                    models.PositiveIntegerField(default=0, verbose_name="refusés"),
+                ),
+                (
+                    "no_show_count",
+                    models.PositiveIntegerField(default=0, verbose_name="absents"),
+                ),
+                (
+                    "billable_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="RDV facturables"
+                    ),
+                ),
+                (
+                    "general_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="consultations générales"
+                    ),
+                ),
+                (
+                    "specialized_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="consultations spécialisées"
+                    ),
+                ),
+                (
+                    "follow_up_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="consultations de suivi"
+                    ),
+                ),
+                (
+                    "emergency_count",
+                    models.PositiveIntegerField(default=0, verbose_name="urgences"),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=0,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="chiffre d'affaires",
+                    ),
+                ),
+                (
+                    "new_patients",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="nouveaux patients"
+                    ),
+                ),
+                (
+                    "computed_at",
+                    models.DateTimeField(auto_now=True, verbose_name="calculé le"),
+                ),
+            ],
+            options={
+                "verbose_name": "statistiques journalières",
+                "verbose_name_plural": "statistiques journalières",
+                "ordering": ["date"],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0008_dailyclinicstats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["-created_at"], name="appointment_created_b22799_idx"
+            ),
+        ),
+    ]
@@ -42,9 +42,29 @@ def validate_appointment_time(value):
         )
 
 
+def tracked_value_repr(value):
+    """Représentation texte d'une valeur suivie (dates/heures en ISO)."""
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
 class Appointment(models.Model):
     """Rendez-vous médical avec gestion bidirectionnelle."""
     
+    # Champs dont les modifications sont tracées (historique, notifications).
+    # Leurs valeurs sont mémorisées au chargement (from_db) : pendant save(),
+    # tracked_changes expose le diff sans relire la ligne en base.
+    TRACKED_FIELDS = (
+        'patient_first_name', 'patient_last_name', 'patient_email', 'patient_phone',
+        'date', 'time', 'consultation_type', 'status',
+        'reason', 'notes_patient', 'notes_staff',
+        'admin_message', 'patient_message', 'rejection_reason', 'cancellation_reason',
+        'proposed_date', 'proposed_time', 'proposed_consultation_type'
+    )
+    
     class Status(models.TextChoices):
         PENDING = 'pending', _('En attente')
         CONFIRMED = 'confirmed', _('Confirmé')
@@ -161,6 +181,7 @@ class Appointment(models.Model):
             models.Index(fields=['patient', 'date']),  # Recherche par patient
             models.Index(fields=['status', 'date']),  # Filtrage par statut
             models.Index(fields=['patient_email']),  # Recherche par email
+            models.Index(fields=['-created_at']),  # Pagination par curseur (liste)
         ]
         constraints = [
             models.UniqueConstraint(
@@ -206,6 +227,61 @@ class Appointment(models.Model):
     def can_be_cancelled_by_patient(self):
         """Vérifie si le patient peut annuler le RDV (24h avant)."""
         return self.can_be_modified_by_patient()
+    
+    # ------------------------------------------------------------------
+    # Suivi des modifications
+    # ------------------------------------------------------------------
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields(field_names)
+        return instance
+    
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._snapshot_tracked_fields(fields)
+    
+    def _snapshot_tracked_fields(self, field_names=None):
+        """Mémorise les valeurs actuelles des champs suivis (tous par défaut)."""
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for name in self.TRACKED_FIELDS:
+            if field_names is None or name in field_names:
+                loaded[name] = getattr(self, name)
+    
+    def get_tracked_changes(self, fields=None):
+        """
+        Diff des champs suivis depuis le chargement ou la dernière sauvegarde.
+        
+        Returns:
+            Dictionnaire {champ: (ancienne valeur, nouvelle valeur)}, vide pour
+            une instance qui n'a été ni chargée ni sauvegardée
+        """
+        loaded = self.__dict__.get('_loaded_values', {})
+        changes = {}
+        for name, old_value in loaded.items():
+            if fields is not None and name not in fields:
+                continue
+            new_value = getattr(self, name)
+            if tracked_value_repr(old_value) != tracked_value_repr(new_value):
+                changes[name] = (old_value, new_value)
+        return changes
+    
+    @property
+    def tracked_changes(self):
+        """Diff de la sauvegarde en cours (lisible depuis les signals pre/post_save)."""
+        return self.__dict__.get('_tracked_changes') or {}
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        previous = self.__dict__.get('_tracked_changes')
+        self._tracked_changes = self.get_tracked_changes(update_fields)
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            # Restaure le diff d'une sauvegarde englobante (save() imbriqué dans un signal)
+            self._tracked_changes = previous
+        self._snapshot_tracked_fields(update_fields)
 
 
 class AppointmentSlotLock(models.Model):
@@ -434,3 +510,45 @@ class AppointmentRequest(models.Model):
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.access_code}"
+
+
+class DailyClinicStats(models.Model):
+    """
+    Agrégat journalier des RDV et des inscriptions patients.
+    
+    Une ligne par jour écoulé, alimentée par la tâche rollup_daily_clinic_stats
+    et la commande backfill_daily_stats. Les compteurs par type de consultation
+    et le chiffre d'affaires ne portent que sur les RDV facturables (confirmés
+    ou terminés), au tarif en vigueur lors du calcul.
+    """
+    date = models.DateField(_('date'), unique=True)
+    
+    # Compteurs par statut
+    appointments_total = models.PositiveIntegerField(_('total RDV'), default=0)
+    pending_count = models.PositiveIntegerField(_('en attente'), default=0)
+    confirmed_count = models.PositiveIntegerField(_('confirmés'), default=0)
+    completed_count = models.PositiveIntegerField(_('terminés'), default=0)
+    awaiting_count = models.PositiveIntegerField(_('en négociation'), default=0)
+    cancelled_count = models.PositiveIntegerField(_('annulés'), default=0)
+    rejected_count = models.PositiveIntegerField(_('refusés'), default=0)
+    no_show_count = models.PositiveIntegerField(_('absents'), default=0)
+    
+    # RDV facturables par type de consultation
+    billable_count = models.PositiveIntegerField(_('RDV facturables'), default=0)
+    general_count = models.PositiveIntegerField(_('consultations générales'), default=0)
+    specialized_count = models.PositiveIntegerField(_('consultations spécialisées'), default=0)
+    follow_up_count = models.PositiveIntegerField(_('consultations de suivi'), default=0)
+    emergency_count = models.PositiveIntegerField(_('urgences'), default=0)
+    revenue = models.DecimalField(_('chiffre d\'affaires'), max_digits=12, decimal_places=0, default=0)
+    
+    new_patients = models.PositiveIntegerField(_('nouveaux patients'), default=0)
+    
+    computed_at = models.DateTimeField(_('calculé le'), auto_now=True)
+    
+    class Meta:
+        ordering = ['date']
+        verbose_name = _('statistiques journalières')
+        verbose_name_plural = _('statistiques journalières')
+    
+    def __str__(self):
+        return f"Stats {self.date} ({self.appointments_total} RDV)"
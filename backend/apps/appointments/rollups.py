@@ -0,0 +1,157 @@
+"""
+Agrégats journaliers (DailyClinicStats).
+
+Les jours écoulés sont figés dans la table DailyClinicStats : les tendances et
+graphiques historiques lisent quelques centaines de lignes au lieu de
+parcourir toute la table des RDV. Les jours absents de la table (aujourd'hui,
+ou un jour pas encore agrégé) sont calculés à la volée avec la même fonction,
+si bien que la lecture reste exacte même si la tâche Celery a pris du retard.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Appointment, DailyClinicStats
+from .stats import BILLABLE_STATUSES, consultation_price_expression
+
+
+# Colonne de DailyClinicStats alimentée par chaque statut de RDV
+STATUS_COUNT_FIELDS = {
+    'pending': 'pending_count',
+    'confirmed': 'confirmed_count',
+    'completed': 'completed_count',
+    'awaiting_patient_response': 'awaiting_count',
+    'awaiting_admin_response': 'awaiting_count',
+    'modification_pending': 'awaiting_count',
+    'cancelled': 'cancelled_count',
+    'rejected': 'rejected_count',
+    'rejected_by_patient': 'rejected_count',
+    'no_show': 'no_show_count',
+}
+
+# Colonne alimentée par chaque type de consultation (RDV facturables)
+TYPE_COUNT_FIELDS = {
+    'generale': 'general_count',
+    'specialisee': 'specialized_count',
+    'suivi': 'follow_up_count',
+    'urgence': 'emergency_count',
+}
+
+COUNTER_FIELDS = [
+    'appointments_total', *dict.fromkeys(STATUS_COUNT_FIELDS.values()),
+    'billable_count', *TYPE_COUNT_FIELDS.values(), 'revenue', 'new_patients',
+]
+
+# Nombre de jours recalculés à chaque passage de la tâche, pour absorber les
+# changements de statut tardifs (no-show, annulations saisies après coup)
+ROLLUP_LOOKBACK_DAYS = 7
+
+
+def compute_daily_stats(start, end):
+    """
+    Calcule les agrégats de chaque jour de la plage, sans les enregistrer.
+
+    Deux requêtes : RDV regroupés par (date, statut, type) et nouveaux
+    patients regroupés par jour d'inscription.
+
+    Returns:
+        Dictionnaire ordonné {date: DailyClinicStats non sauvegardé}
+    """
+    User = get_user_model()
+
+    stats = {}
+    day = start
+    while day <= end:
+        stats[day] = DailyClinicStats(date=day)
+        day += timedelta(days=1)
+
+    rows = Appointment.objects.filter(
+        date__range=(start, end)
+    ).annotate(
+        price=consultation_price_expression()
+    ).order_by().values('date', 'status', 'consultation_type').annotate(
+        count=Count('id'),
+        amount=Sum('price')
+    )
+    for row in rows:
+        entry = stats[row['date']]
+        entry.appointments_total += row['count']
+        field = STATUS_COUNT_FIELDS.get(row['status'])
+        if field:
+            setattr(entry, field, getattr(entry, field) + row['count'])
+        if row['status'] in BILLABLE_STATUSES:
+            entry.billable_count += row['count']
+            entry.revenue += row['amount'] or 0
+            field = TYPE_COUNT_FIELDS.get(row['consultation_type'])
+            if field:
+                setattr(entry, field, getattr(entry, field) + row['count'])
+
+    tz = timezone.get_current_timezone()
+    signups = User.objects.filter(
+        role=User.Role.PATIENT,
+        created_at__date__range=(start, end)
+    ).annotate(
+        day=TruncDate('created_at', tzinfo=tz)
+    ).order_by().values('day').annotate(count=Count('id'))
+    for row in signups:
+        if row['day'] in stats:
+            stats[row['day']].new_patients = row['count']
+
+    return stats
+
+
+def rollup_daily_stats(start, end):
+    """
+    Recalcule et enregistre les agrégats de la plage (upsert par date).
+
+    Returns:
+        Nombre de jours enregistrés
+    """
+    stats = compute_daily_stats(start, end)
+    with transaction.atomic():
+        DailyClinicStats.objects.bulk_create(
+            list(stats.values()),
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=COUNTER_FIELDS + ['computed_at'],
+        )
+    return len(stats)
+
+
+def get_period_totals(start, end):
+    """
+    Somme des agrégats journaliers d'une plage.
+
+    Lit DailyClinicStats pour les jours déjà agrégés et calcule les autres
+    à la volée (aujourd'hui, jours futurs ou retard de la tâche).
+
+    Returns:
+        Dictionnaire {colonne: total} pour chaque colonne de COUNTER_FIELDS
+    """
+    totals = dict.fromkeys(COUNTER_FIELDS, 0)
+    stored = DailyClinicStats.objects.filter(date__range=(start, end))
+
+    covered = set()
+    for entry in stored:
+        covered.add(entry.date)
+        for field in COUNTER_FIELDS:
+            totals[field] += getattr(entry, field)
+
+    missing = []
+    day = start
+    while day <= end:
+        if day not in covered:
+            missing.append(day)
+        day += timedelta(days=1)
+
+    if missing:
+        computed = compute_daily_stats(min(missing), max(missing))
+        for day in missing:
+            for field in COUNTER_FIELDS:
+                totals[field] += getattr(computed[day], field)
+
+    return totals
@@ -134,6 +134,13 @@ class AvailableSlotsSerializer(serializers.Serializer):
     slots = serializers.ListField(child=serializers.TimeField())
 
 
+class AvailableSlotsRangeSerializer(serializers.Serializer):
+    """Créneaux disponibles sur une plage de dates (vue semaine / mois)."""
+    start = serializers.DateField()
+    end = serializers.DateField()
+    days = AvailableSlotsSerializer(many=True)
+
+
 class SlotLockSerializer(serializers.Serializer):
     date = serializers.DateField()
     time = serializers.TimeField()
@@ -1,51 +1,48 @@
 """
 Signals pour la traçabilité automatique des modifications de RDV.
 """
-from django.db.models.signals import pre_save, post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Appointment, AppointmentHistory
+from apps.content_management.models import ClinicSchedule, ClinicHoliday
+from .models import Appointment, AppointmentHistory, tracked_value_repr
+from .slot_cache import schedule_bitmap_refresh, invalidate_all_bitmaps
+from .stats import invalidate_dashboard_stats
 
 User = get_user_model()
 
-# Stockage temporaire des anciennes valeurs
-_appointment_old_values = {}
 
-
-@receiver(pre_save, sender=Appointment)
-def capture_old_values(sender, instance, **kwargs):
+@receiver(post_save, sender=Appointment)
+def refresh_slot_bitmap_on_save(sender, instance, **kwargs):
     """
-    Capture les valeurs avant modification pour comparaison.
+    Met à jour le bitmap de disponibilité de la date du RDV
+    (et de l'ancienne date en cas de déplacement).
     """
-    if instance.pk:  # Seulement pour les mises à jour, pas les créations
-        try:
-            old_instance = Appointment.objects.get(pk=instance.pk)
-            
-            # Liste des champs à tracer
-            tracked_fields = [
-                'patient_first_name', 'patient_last_name', 'patient_email', 'patient_phone',
-                'date', 'time', 'consultation_type', 'status',
-                'reason', 'notes_patient', 'notes_staff',
-                'admin_message', 'patient_message', 'rejection_reason', 'cancellation_reason',
-                'proposed_date', 'proposed_time', 'proposed_consultation_type'
-            ]
-            
-            # Stocker les anciennes valeurs
-            old_values = {}
-            for field in tracked_fields:
-                value = getattr(old_instance, field, None)
-                if value is not None:
-                    # Convertir les dates/times en string pour JSON
-                    if hasattr(value, 'isoformat'):
-                        old_values[field] = value.isoformat()
-                    else:
-                        old_values[field] = str(value)
-            
-            # Stocker temporairement avec l'ID de l'instance
-            _appointment_old_values[instance.pk] = old_values
-            
-        except Appointment.DoesNotExist:
-            pass
+    old_date, _ = instance.tracked_changes.get('date', (None, None))
+    schedule_bitmap_refresh(instance.date, old_date)
+
+
+@receiver(post_delete, sender=Appointment)
+def refresh_slot_bitmap_on_delete(sender, instance, **kwargs):
+    """Libère le créneau dans le bitmap de disponibilité."""
+    schedule_bitmap_refresh(instance.date)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_dashboard_snapshot(sender, **kwargs):
+    """Les compteurs du dashboard doivent être recalculés."""
+    transaction.on_commit(invalidate_dashboard_stats)
+
+
+@receiver(post_save, sender=ClinicSchedule)
+@receiver(post_delete, sender=ClinicSchedule)
+@receiver(post_save, sender=ClinicHoliday)
+@receiver(post_delete, sender=ClinicHoliday)
+def invalidate_slot_bitmaps(sender, **kwargs):
+    """Les horaires ou jours fériés ont changé : tous les bitmaps sont obsolètes."""
+    invalidate_all_bitmaps()
 
 
 @receiver(post_save, sender=Appointment)
@@ -57,106 +54,53 @@ def track_appointment_changes(sender, instance, created, **kwargs):
     if created:
         return
     
-    # Récupérer les anciennes valeurs
-    old_values = _appointment_old_values.get(instance.pk, {})
-    
-    if not old_values:
+    # Diff calculé par Appointment.save() depuis les valeurs chargées
+    changes = instance.tracked_changes
+    if not changes:
         return
     
-    # Liste des champs à tracer
-    tracked_fields = [
-        'patient_first_name', 'patient_last_name', 'patient_email', 'patient_phone',
-        'date', 'time', 'consultation_type', 'status',
-        'reason', 'notes_patient', 'notes_staff',
-        'admin_message', 'patient_message', 'rejection_reason', 'cancellation_reason',
-        'proposed_date', 'proposed_time', 'proposed_consultation_type'
-    ]
-    
-    # Détecter les changements
-    changes_detected = {}
-    new_values = {}
-    
-    for field in tracked_fields:
-        new_value = getattr(instance, field, None)
-        old_value_str = old_values.get(field)
-        
-        # Convertir la nouvelle valeur en string
-        if new_value is not None:
-            if hasattr(new_value, 'isoformat'):
-                new_value_str = new_value.isoformat()
-            else:
-                new_value_str = str(new_value)
-        else:
-            new_value_str = None
-        
-        # Détecter les changements
-        if old_value_str != new_value_str:
-            changes_detected[field] = {
-                'old': old_value_str,
-                'new': new_value_str
-            }
-            new_values[field] = new_value_str
-    
-    # Créer l'entrée d'historique si des changements ont été détectés
-    if changes_detected:
-        # Déterminer l'acteur et le type d'acteur
-        actor = instance.last_modified_by
-        actor_type = 'system'
-        
-        if actor:
-            if actor.role in ['admin', 'staff', 'doctor']:
-                actor_type = 'admin'
-            elif actor.role == 'patient':
-                actor_type = 'patient'
-        
-        history_data = {
-            'appointment': instance,
-            'action_type': 'modified',
-            'actor': actor,
-            'actor_type': actor_type,
-            'changes_data': changes_detected,
+    changes_detected = {
+        field: {
+            'old': tracked_value_repr(old_value),
+            'new': tracked_value_repr(new_value)
         }
-        
-        # Remplir les champs legacy pour compatibilité
-        if 'date' in changes_detected:
-            # Récupérer l'ancienne date depuis old_values
-            if 'date' in old_values:
-                from datetime import datetime
-                try:
-                    history_data['old_date'] = datetime.fromisoformat(old_values['date']).date()
-                except:
-                    history_data['old_date'] = None
-            history_data['new_date'] = instance.date
-        
-        if 'time' in changes_detected:
-            # Récupérer l'ancienne heure depuis old_values
-            if 'time' in old_values:
-                from datetime import datetime, time as dt_time
-                try:
-                    # Parser le format HH:MM:SS
-                    time_parts = old_values['time'].split(':')
-                    history_data['old_time'] = dt_time(
-                        int(time_parts[0]), 
-                        int(time_parts[1]), 
-                        int(time_parts[2]) if len(time_parts) > 2 else 0
-                    )
-                except:
-                    history_data['old_time'] = None
-            history_data['new_time'] = instance.time
-        
-        if 'consultation_type' in changes_detected:
-            history_data['old_consultation_type'] = old_values.get('consultation_type', '')
-            history_data['new_consultation_type'] = new_values.get('consultation_type', '')
-        
-        if 'status' in changes_detected:
-            history_data['old_status'] = old_values.get('status', '')
-            history_data['new_status'] = new_values.get('status', '')
-        
-        AppointmentHistory.objects.create(**history_data)
-    
-    # Nettoyer le stockage temporaire
-    if instance.pk in _appointment_old_values:
-        del _appointment_old_values[instance.pk]
+        for field, (old_value, new_value) in changes.items()
+    }
+    
+    # Déterminer l'acteur et le type d'acteur
+    actor = instance.last_modified_by
+    actor_type = 'system'
+    
+    if actor:
+        if actor.role in ['admin', 'staff', 'doctor']:
+            actor_type = 'admin'
+        elif actor.role == 'patient':
+            actor_type = 'patient'
+    
+    history_data = {
+        'appointment': instance,
+        'action_type': 'modified',
+        'actor': actor,
+        'actor_type': actor_type,
+        'changes_data': changes_detected,
+    }
+    
+    # Remplir les champs legacy pour compatibilité
+    if 'date' in changes:
+        history_data['old_date'], history_data['new_date'] = changes['date']
+    
+    if 'time' in changes:
+        history_data['old_time'], history_data['new_time'] = changes['time']
+    
+    if 'consultation_type' in changes:
+        history_data['old_consultation_type'] = changes_detected['consultation_type']['old'] or ''
+        history_data['new_consultation_type'] = changes_detected['consultation_type']['new'] or ''
+    
+    if 'status' in changes:
+        history_data['old_status'] = changes_detected['status']['old'] or ''
+        history_data['new_status'] = changes_detected['status']['new'] or ''
+    
+    AppointmentHistory.objects.create(**history_data)
 
 
 @receiver(post_save, sender=Appointment)
@@ -239,12 +183,12 @@ def link_appointment_to_medical_record(sender, instance, created, **kwargs):
     """
     Lie l'appointment au dossier médical et crée le dossier si nécessaire.
     """
-    from apps.users.models import MedicalRecord, Patient
+    from apps.users.models import Patient
+    from apps.users.models_medical import MedicalRecord
     from django.db.models import Q
-    from django.utils import timezone
     
     # Skip if not a consultation or not completed
-    if instance.appointment_type not in ['generale', 'specialisee', 'suivi']:
+    if instance.consultation_type not in ['generale', 'specialisee', 'suivi']:
         return
     
     if instance.status != 'completed':
@@ -257,19 +201,16 @@ def link_appointment_to_medical_record(sender, instance, created, **kwargs):
         Q(phone=instance.patient_phone)
     ).first()
     
-    if not patient:
+    # Le dossier médical est rattaché au compte utilisateur du patient
+    if not patient or not patient.user:
         return
     
     # Get or create medical record
     medical_record, record_created = MedicalRecord.objects.get_or_create(
-        patient=patient,
-        defaults={
-            'created_by': instance.last_modified_by,
-            'consultation_date': instance.date,
-        }
+        patient=patient.user
     )
     
     # Link appointment to medical record
-    if instance.medical_record != medical_record:
+    if instance.medical_record_id != medical_record.pk:
         instance.medical_record = medical_record
         instance.save(update_fields=['medical_record'])
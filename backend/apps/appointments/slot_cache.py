@@ -0,0 +1,187 @@
+"""
+Cache des disponibilités sous forme de bitmap par jour.
+
+Chaque date est stockée dans le cache Django (Redis en production) sous la
+forme d'une entrée compacte :
+- ``times`` : heures de début des créneaux théoriques du jour
+- ``booked`` : bitmap des créneaux occupés par un RDV actif (bit i = times[i])
+- ``locked`` : bitmap des créneaux verrouillés pendant une réservation
+- ``lock_expiry`` : {index: timestamp} d'expiration des verrous
+
+La lecture ne touche pas la base : les verrous expirés sont masqués en
+mémoire. L'écriture (signals RDV, lock_slot / unlock_slot) reconstruit la
+date concernée depuis la base après le commit : deux écritures concurrentes
+convergent ainsi vers l'état réel de la table.
+
+Toute modification des horaires ou des jours fériés incrémente une version
+globale, ce qui invalide l'ensemble des bitmaps.
+"""
+from datetime import date, datetime, time as dt_time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .slots import get_day_layouts, get_slot_occupancy, iter_dates
+
+
+BITMAP_CACHE_PREFIX = 'slots:bitmap'
+BITMAP_VERSION_KEY = 'slots:bitmap:version'
+
+# Les entrées sont réécrites à chaque modification ; le timeout ne sert
+# qu'à borner la durée de vie d'une entrée orpheline.
+BITMAP_TIMEOUT = 60 * 60 * 6  # 6 heures
+
+SLOT_FREE = 'free'
+SLOT_LOCKED = 'locked'
+SLOT_BOOKED = 'booked'
+
+
+def get_bitmap_version():
+    """Retourne la version courante des bitmaps (horaires / fériés)."""
+    version = cache.get(BITMAP_VERSION_KEY)
+    if version is None:
+        cache.add(BITMAP_VERSION_KEY, 1, timeout=None)
+        version = cache.get(BITMAP_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_all_bitmaps():
+    """Invalide tous les bitmaps (changement d'horaires ou de jours fériés)."""
+    try:
+        cache.incr(BITMAP_VERSION_KEY)
+    except ValueError:
+        cache.set(BITMAP_VERSION_KEY, 2, timeout=None)
+
+
+def _bitmap_key(day, version):
+    return f"{BITMAP_CACHE_PREFIX}:{version}:{day.isoformat()}"
+
+
+def encode_day(times, booked, locked):
+    """
+    Encode l'état d'une journée en bitmap.
+
+    Args:
+        times: Heures de début des créneaux théoriques
+        booked: Ensemble des heures occupées par un RDV actif
+        locked: Dictionnaire {heure: expires_at} des verrous valides
+    """
+    entry = {
+        'times': [slot_time.strftime('%H:%M:%S') for slot_time in times],
+        'booked': 0,
+        'locked': 0,
+        'lock_expiry': {},
+    }
+    for index, slot_time in enumerate(times):
+        if slot_time in booked:
+            entry['booked'] |= 1 << index
+        elif slot_time in locked:
+            entry['locked'] |= 1 << index
+            entry['lock_expiry'][index] = locked[slot_time].timestamp()
+    return entry
+
+
+def get_slot_states(entry, now=None):
+    """
+    Décode une entrée en liste [(heure, état)] avec état free/locked/booked.
+
+    Les verrous expirés sont considérés comme libres.
+    """
+    now_ts = (now or timezone.now()).timestamp()
+    locked = entry['locked']
+    for index, expires_at in entry['lock_expiry'].items():
+        if expires_at <= now_ts:
+            locked &= ~(1 << index)
+
+    states = []
+    for index, value in enumerate(entry['times']):
+        if entry['booked'] >> index & 1:
+            state = SLOT_BOOKED
+        elif locked >> index & 1:
+            state = SLOT_LOCKED
+        else:
+            state = SLOT_FREE
+        states.append((dt_time.fromisoformat(value), state))
+    return states
+
+
+def build_bitmaps(start, end):
+    """Construit les bitmaps d'une plage de dates depuis la base (4 requêtes)."""
+    layouts = get_day_layouts(start, end)
+    booked, locked = get_slot_occupancy(start, end, layouts)
+    return {
+        day: encode_day(times, booked.get(day, set()), locked.get(day, {}))
+        for day, times in layouts.items()
+    }
+
+
+def get_day_bitmaps(start, end=None):
+    """
+    Retourne les bitmaps d'une plage, en ne reconstruisant que les dates absentes.
+
+    Returns:
+        Dictionnaire ordonné {date: entrée}
+    """
+    end = end or start
+    version = get_bitmap_version()
+    keys = {_bitmap_key(day, version): day for day in iter_dates(start, end)}
+    cached = cache.get_many(list(keys))
+
+    bitmaps = {day: cached.get(key) for key, day in keys.items()}
+    missing = [day for day, entry in bitmaps.items() if entry is None]
+    if missing:
+        built = build_bitmaps(min(missing), max(missing))
+        for day in missing:
+            # add et non set : un refresh_day_bitmap concurrent (post-commit)
+            # a pu écrire une entrée plus récente que notre lecture de la base
+            key = _bitmap_key(day, version)
+            if cache.add(key, built[day], timeout=BITMAP_TIMEOUT):
+                bitmaps[day] = built[day]
+            else:
+                bitmaps[day] = cache.get(key) or built[day]
+    return bitmaps
+
+
+def get_cached_available_slots(start, end=None):
+    """
+    Équivalent de slots.get_available_slots servi depuis le cache.
+
+    Returns:
+        Dictionnaire ordonné {date: [heures disponibles]}
+    """
+    now = timezone.localtime()
+    today = now.date()
+
+    available = {}
+    for day, entry in get_day_bitmaps(start, end).items():
+        if day < today:
+            available[day] = []
+            continue
+        available[day] = [
+            slot_time
+            for slot_time, state in get_slot_states(entry, now)
+            if state == SLOT_FREE
+            and not (day == today and slot_time <= now.time())
+        ]
+    return available
+
+
+def refresh_day_bitmap(day):
+    """Reconstruit immédiatement le bitmap d'une date depuis la base."""
+    if isinstance(day, str):
+        day = date.fromisoformat(day[:10])
+    elif isinstance(day, datetime):
+        day = day.date()
+    version = get_bitmap_version()
+    cache.set(
+        _bitmap_key(day, version),
+        build_bitmaps(day, day)[day],
+        timeout=BITMAP_TIMEOUT
+    )
+
+
+def schedule_bitmap_refresh(*days):
+    """Reconstruit les bitmaps des dates données après le commit courant."""
+    for day in {day for day in days if day}:
+        transaction.on_commit(lambda day=day: refresh_day_bitmap(day))
@@ -0,0 +1,182 @@
+"""
+Moteur de disponibilité des créneaux.
+
+Les créneaux théoriques sont dérivés de ClinicSchedule (plages matin /
+après-midi, durée de créneau) et ClinicHoliday (y compris les fériés
+récurrents). Les RDV actifs et les verrous non expirés sont ensuite retirés
+à l'aide d'une requête par plage de dates, et non d'une requête par créneau :
+une semaine ou un mois complet se calcule en un nombre constant de requêtes.
+"""
+from collections import defaultdict
+from datetime import date as dt_date, datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.content_management.models import ClinicSchedule, ClinicHoliday
+from .locks import get_slot_lock_backend
+from .models import Appointment
+
+
+# Statuts qui occupent un créneau (cf. contrainte unique_active_appointment_slot)
+ACTIVE_APPOINTMENT_STATUSES = [
+    'pending',
+    'confirmed',
+    'awaiting_patient_response',
+    'awaiting_admin_response',
+    'modification_pending',
+]
+
+# Plage maximale acceptée pour une requête start/end (vue mensuelle + marge)
+MAX_SLOTS_RANGE_DAYS = 62
+
+
+def iter_dates(start, end):
+    """Itère sur les dates de start à end inclus."""
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def get_schedule_times(schedule):
+    """
+    Retourne les heures de début des créneaux d'une journée type.
+
+    Un créneau n'est proposé que s'il se termine avant la fin de sa plage.
+    """
+    if schedule is None or not schedule.is_open:
+        return []
+
+    step = timedelta(minutes=schedule.slot_duration or 30)
+    times = []
+    windows = (
+        (schedule.morning_start, schedule.morning_end),
+        (schedule.afternoon_start, schedule.afternoon_end),
+    )
+    for window_start, window_end in windows:
+        if not window_start or not window_end:
+            continue
+        current = datetime.combine(dt_date.min, window_start)
+        limit = datetime.combine(dt_date.min, window_end)
+        while current + step <= limit:
+            times.append(current.time())
+            current += step
+    return times
+
+
+def get_holiday_checker(start, end):
+    """
+    Charge les jours fériés de la plage en une requête.
+
+    Returns:
+        Fonction date -> bool indiquant si la clinique est fermée ce jour-là
+    """
+    fixed_dates = set()
+    recurring_days = set()
+    holidays = ClinicHoliday.objects.filter(
+        Q(date__range=(start, end)) | Q(is_recurring=True)
+    ).values_list('date', 'is_recurring')
+
+    for holiday_date, is_recurring in holidays:
+        if is_recurring:
+            recurring_days.add((holiday_date.month, holiday_date.day))
+        else:
+            fixed_dates.add(holiday_date)
+
+    def is_holiday(day):
+        return day in fixed_dates or (day.month, day.day) in recurring_days
+
+    return is_holiday
+
+
+def get_day_layouts(start, end):
+    """
+    Calcule les créneaux théoriques de chaque jour de la plage.
+
+    Applique les horaires hebdomadaires et les jours fériés (deux requêtes),
+    sans tenir compte des RDV ni des verrous.
+
+    Returns:
+        Dictionnaire ordonné {date: [heures de début]}
+    """
+    schedules = {
+        schedule.day_of_week: schedule
+        for schedule in ClinicSchedule.objects.all()
+    }
+    is_holiday = get_holiday_checker(start, end)
+
+    layouts = {}
+    for day in iter_dates(start, end):
+        if is_holiday(day):
+            layouts[day] = []
+        else:
+            layouts[day] = get_schedule_times(schedules.get(day.weekday()))
+    return layouts
+
+
+def get_slot_occupancy(start, end, layouts):
+    """
+    Récupère les créneaux occupés sur une plage de dates.
+
+    Une requête pour les RDV actifs ; les verrous valides sont lus en un appel
+    au backend de verrouillage (requête SQL ou MGET Redis).
+
+    Args:
+        start: Première date de la plage
+        end: Dernière date (incluse)
+        layouts: Créneaux théoriques {date: [heures]} (cf. get_day_layouts)
+
+    Returns:
+        Tuple (booked, locked) : booked est un dictionnaire {date: set(heures)},
+        locked un dictionnaire {date: {heure: expires_at}}
+    """
+    booked = defaultdict(set)
+
+    appointments = Appointment.objects.filter(
+        date__range=(start, end),
+        status__in=ACTIVE_APPOINTMENT_STATUSES
+    ).values_list('date', 'time')
+    for slot_date, slot_time in appointments:
+        booked[slot_date].add(slot_time)
+
+    locked = get_slot_lock_backend().get_locks(layouts)
+
+    return booked, locked
+
+
+def get_available_slots(start, end=None):
+    """
+    Calcule les créneaux disponibles pour une date ou une plage de dates.
+
+    Args:
+        start: Première date de la plage
+        end: Dernière date (incluse), par défaut start
+
+    Returns:
+        Dictionnaire ordonné {date: [heures disponibles]}
+    """
+    end = end or start
+    now = timezone.localtime()
+    today = now.date()
+
+    layouts = get_day_layouts(start, end)
+    booked, locked = get_slot_occupancy(start, end, layouts)
+
+    available = {}
+    for day, times in layouts.items():
+        if day < today:
+            available[day] = []
+            continue
+
+        taken = booked.get(day, set()) | set(locked.get(day, {}))
+        slots = []
+        for slot_time in times:
+            if slot_time in taken:
+                continue
+            if day == today and slot_time <= now.time():
+                continue
+            slots.append(slot_time)
+        available[day] = slots
+
+    return available
@@ -0,0 +1,294 @@
+"""
+Statistiques du dashboard admin.
+
+Les compteurs sont calculés par agrégats conditionnels (Count(filter=Q(...)))
+en un seul parcours de la table des RDV, puis mis en cache sous forme
+d'instantané par date. Les signals des RDV invalident l'instantané du jour.
+
+Les séries temporelles des graphiques sont regroupées en SQL par période
+(TruncDay / TruncWeek / TruncMonth) : une requête par série, quelle que soit
+la plage demandée. Le chiffre d'affaires est calculé dans la même requête à
+partir des tarifs ConsultationFee.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import (
+    Case, Count, DecimalField, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Appointment
+
+
+DASHBOARD_STATS_CACHE_PREFIX = 'dashboard:stats'
+DASHBOARD_STATS_TIMEOUT = 60  # secondes
+
+# Hypothèse de capacité pour le taux de remplissage
+SLOTS_PER_WORKING_DAY = 30
+
+BILLABLE_STATUSES = ['confirmed', 'completed']
+
+
+def _dashboard_stats_key(day):
+    return f"{DASHBOARD_STATS_CACHE_PREFIX}:{day.isoformat()}"
+
+
+def _trend(current, previous):
+    """Variation en pourcentage par rapport à la période précédente."""
+    if previous > 0:
+        return ((current - previous) / previous) * 100
+    return 0
+
+
+def _fill_rate(occupied, first_day, last_day):
+    """Taux de remplissage estimé (6 jours ouvrés sur 7)."""
+    working_days = ((last_day - first_day).days + 1) * 6 // 7
+    total_slots = working_days * SLOTS_PER_WORKING_DAY
+    return (occupied / total_slots * 100) if total_slots > 0 else 0
+
+
+def compute_dashboard_stats(today):
+    """
+    Calcule les statistiques du dashboard pour une date.
+
+    Un agrégat unique pour les compteurs du mois en cours, les agrégats
+    journaliers pour le mois précédent, une requête pour les tarifs et une
+    pour les RDV récents.
+    """
+    from apps.content_management.models import ClinicSetting
+    from .rollups import get_period_totals
+    from .serializers import AppointmentSerializer
+
+    # Récupérer les tarifs depuis les paramètres
+    settings = ClinicSetting.objects.first()
+    fee_general = float(settings.fee_general) if settings else 15000
+    fee_specialized = float(settings.fee_specialized) if settings else 25000
+
+    first_day_month = today.replace(day=1)
+    last_month_end = first_day_month - timedelta(days=1)
+    last_month_start = last_month_end.replace(day=1)
+
+    today_q = Q(date=today)
+    month_billable_q = Q(date__gte=first_day_month, status__in=BILLABLE_STATUSES)
+
+    counts = Appointment.objects.aggregate(
+        today_total=Count('id', filter=today_q),
+        today_confirmed=Count('id', filter=today_q & Q(status='confirmed')),
+        today_pending=Count('id', filter=today_q & Q(status='pending')),
+        total_patients=Count('patient_email', distinct=True),
+        new_patients_month=Count(
+            'patient_email', distinct=True,
+            filter=Q(created_at__gte=first_day_month)
+        ),
+        month_billable=Count('id', filter=month_billable_q),
+        month_general=Count('id', filter=month_billable_q & Q(consultation_type='generale')),
+        month_specialized=Count('id', filter=month_billable_q & Q(consultation_type='specialisee')),
+        last_month_patients=Count(
+            'patient_email', distinct=True,
+            filter=Q(created_at__gte=last_month_start, created_at__lte=last_month_end)
+        ),
+    )
+
+    # Mois précédent : lu dans les agrégats journaliers
+    last_month = get_period_totals(last_month_start, last_month_end)
+
+    # Revenus (estimation basée sur les consultations)
+    general_count = counts['month_general']
+    specialized_count = counts['month_specialized']
+    month_revenue = (general_count * fee_general) + (specialized_count * fee_specialized)
+    last_month_revenue = (
+        (last_month['general_count'] * fee_general) +
+        (last_month['specialized_count'] * fee_specialized)
+    )
+
+    # Taux de remplissage
+    fill_rate = _fill_rate(counts['month_billable'], first_day_month, today)
+    last_month_fill_rate = _fill_rate(last_month['billable_count'], last_month_start, last_month_end)
+
+    # RDV récents (derniers 10)
+    recent_appointments = Appointment.objects.all()[:10]
+    recent_appointments_data = list(AppointmentSerializer(recent_appointments, many=True).data)
+
+    today_confirmed = counts['today_confirmed']
+    today_pending = counts['today_pending']
+    new_patients_month = counts['new_patients_month']
+
+    return {
+        'today_appointments': {
+            'total': counts['today_total'],
+            'confirmed': today_confirmed,
+            'pending': today_pending,
+            'subtitle': f"{today_confirmed} confirmés, {today_pending} en attente"
+        },
+        'total_patients': {
+            'total': counts['total_patients'],
+            'new_this_month': new_patients_month,
+            'subtitle': f"{new_patients_month} nouveaux ce mois"
+        },
+        'month_revenue': {
+            'amount': month_revenue,
+            'formatted': f"{month_revenue / 1000000:.1f}M FCFA",
+            'consultations': general_count + specialized_count,
+            'subtitle': f"Sur {general_count + specialized_count} consultations"
+        },
+        'fill_rate': {
+            'rate': round(fill_rate, 0),
+            'formatted': f"{round(fill_rate, 0)}%",
+            'subtitle': "Créneaux occupés"
+        },
+        'trends': {
+            'appointments': round(_trend(counts['month_billable'], last_month['appointments_total']), 0),
+            'patients': round(_trend(new_patients_month, counts['last_month_patients']), 0),
+            'revenue': round(_trend(month_revenue, last_month_revenue), 0),
+            'fill_rate': round(_trend(fill_rate, last_month_fill_rate), 0)
+        },
+        'recent_appointments': recent_appointments_data
+    }
+
+
+def get_dashboard_stats(today=None):
+    """Retourne l'instantané du jour depuis le cache, ou le calcule."""
+    today = today or timezone.now().date()
+    key = _dashboard_stats_key(today)
+
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_dashboard_stats(today)
+        cache.set(key, stats, timeout=DASHBOARD_STATS_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    """Invalide l'instantané du jour (appelé par les signals des RDV)."""
+    cache.delete(_dashboard_stats_key(timezone.now().date()))
+
+
+# ============================================================================
+# SÉRIES TEMPORELLES (GRAPHIQUES)
+# ============================================================================
+
+TIME_SERIES_TRUNCATES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+TIME_SERIES_GROUP_FIELDS = ('consultation_type', 'status')
+
+# Nombre maximal de périodes pour une série (un an au jour près)
+MAX_TIME_SERIES_BUCKETS = 366
+
+
+def period_start(day, granularity):
+    """Premier jour de la période contenant day."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def iter_periods(start, end, granularity):
+    """Itère sur les débuts de période de start à end inclus."""
+    current = period_start(start, granularity)
+    while current <= end:
+        yield current
+        if granularity == 'month':
+            if current.month == 12:
+                current = current.replace(year=current.year + 1, month=1)
+            else:
+                current = current.replace(month=current.month + 1)
+        elif granularity == 'week':
+            current += timedelta(weeks=1)
+        else:
+            current += timedelta(days=1)
+
+
+def consultation_price_expression():
+    """
+    Prix d'un RDV calculé en SQL.
+
+    Sous-requête sur le tarif actif de son type de consultation, avec repli
+    sur ConsultationFee.DEFAULT_PRICES (même règle que ConsultationFee.get_price).
+    """
+    from apps.content_management.models import ConsultationFee
+
+    output_field = DecimalField(max_digits=12, decimal_places=0)
+    fee = ConsultationFee.objects.filter(
+        consultation_type=OuterRef('consultation_type'),
+        is_active=True
+    ).values('price')[:1]
+    default = Case(
+        *[
+            When(consultation_type=consultation_type, then=Value(price))
+            for consultation_type, price in ConsultationFee.DEFAULT_PRICES.items()
+        ],
+        default=Value(0),
+        output_field=output_field
+    )
+    return Coalesce(Subquery(fee, output_field=output_field), default, output_field=output_field)
+
+
+def get_time_series(start, end, granularity='day', group_by=None, statuses=None,
+                    with_revenue=False):
+    """
+    Compte les RDV par période sur une plage de dates, en une requête.
+
+    Args:
+        start: Première date de la plage
+        end: Dernière date (incluse)
+        granularity: 'day', 'week' ou 'month'
+        group_by: Champ de ventilation optionnel ('consultation_type' ou 'status')
+        statuses: Statuts à prendre en compte (tous par défaut)
+        with_revenue: Ajoute le chiffre d'affaires de chaque période
+
+    Returns:
+        Liste ordonnée de périodes {'period', 'count'[, 'revenue'][, group_by]},
+        les périodes sans RDV étant présentes avec des valeurs nulles
+    """
+    if granularity not in TIME_SERIES_TRUNCATES:
+        raise ValueError(f"Granularité inconnue : {granularity}")
+    if group_by is not None and group_by not in TIME_SERIES_GROUP_FIELDS:
+        raise ValueError(f"Ventilation inconnue : {group_by}")
+
+    buckets = {}
+    for period in iter_periods(start, end, granularity):
+        bucket = {'period': period, 'count': 0}
+        if with_revenue:
+            bucket['revenue'] = 0.0
+        if group_by:
+            bucket[group_by] = {}
+        buckets[period] = bucket
+
+    queryset = Appointment.objects.filter(date__range=(start, end))
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    if with_revenue:
+        queryset = queryset.annotate(price=consultation_price_expression())
+
+    fields = ['period'] + ([group_by] if group_by else [])
+    aggregates = {'count': Count('id')}
+    if with_revenue:
+        aggregates['revenue'] = Sum('price')
+
+    rows = queryset.annotate(
+        period=TIME_SERIES_TRUNCATES[granularity]('date')
+    ).order_by().values(*fields).annotate(**aggregates)
+
+    for row in rows:
+        bucket = buckets[period_start(row['period'], granularity)]
+        bucket['count'] += row['count']
+        if with_revenue:
+            bucket['revenue'] += float(row['revenue'] or 0)
+        if group_by:
+            bucket[group_by][row[group_by]] = row['count']
+
+    return list(buckets.values())
+
+
+def get_status_counts():
+    """Nombre de RDV par statut, en une requête."""
+    rows = Appointment.objects.order_by().values('status').annotate(count=Count('id'))
+    return {row['status']: row['count'] for row in rows}
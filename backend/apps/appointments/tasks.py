@@ -14,15 +14,13 @@ def cleanup_expired_slot_locks():
     """
     Nettoie les verrouillages de créneaux expirés
     Exécuté toutes les 15 minutes
-    """
-    from .models import AppointmentSlotLock
     
-    now = timezone.now()
+    Sans effet avec le backend Redis (les clés expirent via leur TTL) :
+    seul le backend base de données a des lignes à purger.
+    """
+    from .locks import get_slot_lock_backend
     
-    # Supprimer les locks expirés
-    deleted_count = AppointmentSlotLock.objects.filter(
-        expires_at__lt=now
-    ).delete()[0]
+    deleted_count = get_slot_lock_backend().cleanup()
     
     if deleted_count > 0:
         logger.info(f"Nettoyage locks: {deleted_count} verrouillages expirés supprimés")
@@ -103,3 +101,29 @@ def mark_past_appointments_completed():
         'completed': updated_count,
         'no_show': noshow_count
     }
+
+
+@shared_task
+def rollup_daily_clinic_stats(lookback_days=None):
+    """
+    Alimente la table DailyClinicStats
+    Exécuté quotidiennement après mark_past_appointments_completed
+    
+    Recalcule les derniers jours écoulés (changements de statut tardifs) et
+    rattrape les jours manqués depuis le dernier agrégat enregistré.
+    """
+    from .models import DailyClinicStats
+    from .rollups import ROLLUP_LOOKBACK_DAYS, rollup_daily_stats
+    
+    yesterday = timezone.localdate() - timedelta(days=1)
+    start = yesterday - timedelta(days=(lookback_days or ROLLUP_LOOKBACK_DAYS) - 1)
+    
+    last = DailyClinicStats.objects.order_by('-date').values_list('date', flat=True).first()
+    if last is not None and last < start:
+        start = last + timedelta(days=1)
+    
+    days_count = rollup_daily_stats(start, yesterday)
+    
+    logger.info(f"Agrégats journaliers: {days_count} jours recalculés ({start} → {yesterday})")
+    
+    return {'days': days_count}
@@ -5,9 +5,9 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.utils import timezone
 from django.db.models import Count, Q
 from datetime import datetime, timedelta, time
-from .models import Appointment, AppointmentSlotLock, AppointmentHistory, AppointmentProposal, AppointmentRequest
+from .models import Appointment, AppointmentHistory, AppointmentProposal, AppointmentRequest
 from .serializers import (
-    AppointmentSerializer, AvailableSlotsSerializer,
+    AppointmentSerializer, AvailableSlotsSerializer, AvailableSlotsRangeSerializer,
     AppointmentRespondSerializer, AppointmentAcceptSerializer,
     AppointmentRejectSerializer, AppointmentCounterProposeSerializer,
     AppointmentModifySerializer, AppointmentCancelSerializer,
@@ -21,24 +21,48 @@ from .emails import (
     send_rejection_email, send_rejection_by_patient_email,
     send_proposal_accepted_email, send_appointment_cancellation
 )
+from .slots import ACTIVE_APPOINTMENT_STATUSES, MAX_SLOTS_RANGE_DAYS
+from .locks import get_slot_lock_backend, get_slot_lock_ttl
+from .slot_cache import get_cached_available_slots, schedule_bitmap_refresh
+from .stats import (
+    BILLABLE_STATUSES, MAX_TIME_SERIES_BUCKETS, TIME_SERIES_GROUP_FIELDS,
+    TIME_SERIES_TRUNCATES, get_dashboard_stats, get_status_counts,
+    get_time_series, iter_periods
+)
 from apps.content_management.models import ClinicSchedule, ClinicHoliday
 from apps.users.permissions import IsStaffOrAdmin, CanViewAppointments
+from config.pagination import AppointmentHistoryPagination, AppointmentPagination
 
 
 class AppointmentViewSet(viewsets.ModelViewSet):
     """ViewSet pour la gestion des rendez-vous."""
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
+    # Requêtes SQL max par action (cf. config.query_budget)
+    query_budget = {'list': 6, 'retrieve': 6, 'history': 6, 'dashboard_stats': 12, 'chart_data': 12}
     
     def get_permissions(self):
-        if self.action in ['create', 'available_slots']:
+        if self.action in ['create', 'available_slots', 'lock_slot', 'unlock_slot']:
             return [AllowAny()]
         elif self.action in ['list', 'retrieve']:
             return [IsAuthenticated(), CanViewAppointments()]
-        elif self.action in ['update', 'partial_update', 'destroy', 'dashboard_stats']:
+        elif self.action in ['update', 'partial_update', 'destroy', 'dashboard_stats', 'time_series']:
             return [IsStaffOrAdmin()]
         return [IsAuthenticated()]
     
+    @property
+    def paginator(self):
+        """
+        Pagination par numéro de page (count, total_pages), dates les plus
+        récentes d'abord ; pagination par curseur sur demande
+        (?pagination=cursor, puis ?cursor=... dans les liens suivants)
+        """
+        if not hasattr(self, '_paginator') and self.request is not None:
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or AppointmentPagination.cursor_query_param in params:
+                self._paginator = AppointmentPagination()
+        return super().paginator
+    
     def get_queryset(self):
         """
         Filtrer les rendez-vous selon le rôle de l'utilisateur
@@ -89,26 +113,59 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def available_slots(self, request):
-        """Retourne les créneaux disponibles pour une date donnée."""
+        """
+        Retourne les créneaux disponibles pour une date (?date=YYYY-MM-DD)
+        ou pour une plage de dates (?start=YYYY-MM-DD&end=YYYY-MM-DD).
+        """
         date_str = request.query_params.get('date')
-        if not date_str:
+        start_str = request.query_params.get('start')
+        end_str = request.query_params.get('end')
+        
+        if not date_str and not (start_str and end_str):
             return Response(
-                {'error': 'Le paramètre date est requis'},
+                {'error': 'Le paramètre date (ou start et end) est requis'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         try:
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            if date_str:
+                start = end = datetime.strptime(date_str, '%Y-%m-%d').date()
+            else:
+                start = datetime.strptime(start_str, '%Y-%m-%d').date()
+                end = datetime.strptime(end_str, '%Y-%m-%d').date()
         except ValueError:
             return Response(
                 {'error': 'Format de date invalide. Utilisez YYYY-MM-DD'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Récupérer les créneaux disponibles
-        slots = self._get_available_slots_for_date(date)
+        if end < start:
+            return Response(
+                {'error': 'La date de fin doit être postérieure à la date de début'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        serializer = AvailableSlotsSerializer({'date': date_str, 'slots': slots})
+        if (end - start).days >= MAX_SLOTS_RANGE_DAYS:
+            return Response(
+                {'error': f'La plage ne peut pas dépasser {MAX_SLOTS_RANGE_DAYS} jours'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Récupérer les créneaux disponibles (bitmaps en cache, base si absents)
+        available = get_cached_available_slots(start, end)
+        
+        if date_str:
+            serializer = AvailableSlotsSerializer({'date': start, 'slots': available[start]})
+            return Response(serializer.data)
+        
+        serializer = AvailableSlotsRangeSerializer({
+            'start': start,
+            'end': end,
+            'days': [
+                {'date': day, 'slots': slots}
+                for day, slots in available.items()
+            ]
+        })
         return Response(serializer.data)
     
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
@@ -124,7 +181,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            date = datetime.strptime(date_str, '%Y-%m-d').date()
+            date = datetime.strptime(date_str, '%Y-%m-%d').date()
             time_obj = datetime.strptime(time_str, '%H:%M').time()
         except ValueError:
             return Response(
@@ -136,25 +193,24 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if Appointment.objects.filter(
             date=date,
             time=time_obj,
-            status__in=['pending', 'confirmed']
+            status__in=ACTIVE_APPOINTMENT_STATUSES
         ).exists():
             return Response(
                 {'error': 'Ce créneau est déjà réservé'},
                 status=status.HTTP_409_CONFLICT
             )
         
-        # Créer ou mettre à jour le lock
-        lock_id = request.data.get('lock_id', f"{request.META.get('REMOTE_ADDR')}_{timezone.now().timestamp()}")
-        expires_at = timezone.now() + timedelta(minutes=5)
-        
-        lock, created = AppointmentSlotLock.objects.update_or_create(
-            date=date,
-            time=time_obj,
-            defaults={
-                'locked_by': lock_id,
-                'expires_at': expires_at
-            }
+        # Verrouiller le créneau (ou prolonger son propre verrou)
+        lock_id = request.data.get('lock_id') or self._get_default_lock_owner(request)
+        expires_at = get_slot_lock_backend().acquire(
+            date, time_obj, lock_id, get_slot_lock_ttl()
         )
+        if expires_at is None:
+            return Response(
+                {'error': 'Ce créneau est en cours de réservation'},
+                status=status.HTTP_409_CONFLICT
+            )
+        schedule_bitmap_refresh(date)
         
         return Response({
             'lock_id': lock_id,
@@ -182,271 +238,97 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        AppointmentSlotLock.objects.filter(date=date, time=time_obj).delete()
+        # Seul le propriétaire du verrou peut le libérer
+        lock_id = request.data.get('lock_id') or self._get_default_lock_owner(request)
+        if get_slot_lock_backend().release(date, time_obj, lock_id):
+            schedule_bitmap_refresh(date)
         
         return Response({'message': 'Créneau déverrouillé'})
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def dashboard_stats(self, request):
-        """Retourne les statistiques pour le dashboard admin."""
-        from apps.content_management.models import ClinicSetting
-        
-        today = timezone.now().date()
-        
-        # Récupérer les tarifs depuis les paramètres
-        settings = ClinicSetting.objects.first()
-        fee_general = float(settings.fee_general) if settings else 15000
-        fee_specialized = float(settings.fee_specialized) if settings else 25000
-        
-        # RDV aujourd'hui
-        today_appointments = Appointment.objects.filter(date=today)
-        today_total = today_appointments.count()
-        today_confirmed = today_appointments.filter(status='confirmed').count()
-        today_pending = today_appointments.filter(status='pending').count()
-        
-        # Patients total
-        total_patients = Appointment.objects.values('patient_email').distinct().count()
-        
-        # Nouveaux patients ce mois
-        first_day_month = today.replace(day=1)
-        new_patients_month = Appointment.objects.filter(
-            created_at__gte=first_day_month
-        ).values('patient_email').distinct().count()
-        
-        # Revenus du mois (estimation basée sur les consultations)
-        month_appointments = Appointment.objects.filter(
-            date__gte=first_day_month,
-            status__in=['confirmed', 'completed']
-        )
-        general_count = month_appointments.filter(consultation_type='generale').count()
-        specialized_count = month_appointments.filter(consultation_type='specialisee').count()
-        
-        # Calcul des revenus avec tarifs dynamiques
-        month_revenue = (general_count * fee_general) + (specialized_count * fee_specialized)
-        
-        # Taux de remplissage (estimation)
-        # Supposons 30 créneaux par jour, 6 jours par semaine
-        days_in_month = (today - first_day_month).days + 1
-        working_days = days_in_month * 6 // 7  # Approximation
-        total_slots = working_days * 30
-        occupied_slots = month_appointments.count()
-        fill_rate = (occupied_slots / total_slots * 100) if total_slots > 0 else 0
-        
-        # RDV récents (derniers 10)
-        recent_appointments = Appointment.objects.all()[:10]
-        recent_appointments_data = AppointmentSerializer(recent_appointments, many=True).data
-        
-        # Calcul des trends (comparaison avec le mois dernier)
-        last_month_start = (first_day_month - timedelta(days=1)).replace(day=1)
-        last_month_end = first_day_month - timedelta(days=1)
-        
-        # Trend RDV
-        last_month_appointments = Appointment.objects.filter(
-            date__gte=last_month_start,
-            date__lte=last_month_end
-        ).count()
-        
-        current_month_appointments = month_appointments.count()
-        
-        appointments_trend = 0
-        if last_month_appointments > 0:
-            appointments_trend = ((current_month_appointments - last_month_appointments) / last_month_appointments) * 100
-        
-        # Trend Patients
-        last_month_patients = Appointment.objects.filter(
-            created_at__gte=last_month_start,
-            created_at__lte=last_month_end
-        ).values('patient_email').distinct().count()
-        
-        patients_trend = 0
-        if last_month_patients > 0:
-            patients_trend = ((new_patients_month - last_month_patients) / last_month_patients) * 100
-        
-        # Trend Revenus
-        last_month_appts = Appointment.objects.filter(
-            date__gte=last_month_start,
-            date__lte=last_month_end,
-            status__in=['confirmed', 'completed']
-        )
-        last_month_general = last_month_appts.filter(consultation_type='generale').count()
-        last_month_specialized = last_month_appts.filter(consultation_type='specialisee').count()
-        last_month_revenue = (last_month_general * fee_general) + (last_month_specialized * fee_specialized)
-        
-        revenue_trend = 0
-        if last_month_revenue > 0:
-            revenue_trend = ((month_revenue - last_month_revenue) / last_month_revenue) * 100
-        
-        # Trend Taux de remplissage
-        last_month_days = (last_month_end - last_month_start).days + 1
-        last_month_working_days = last_month_days * 6 // 7
-        last_month_total_slots = last_month_working_days * 30
-        last_month_occupied = last_month_appts.count()
-        last_month_fill_rate = (last_month_occupied / last_month_total_slots * 100) if last_month_total_slots > 0 else 0
-        
-        fill_rate_trend = 0
-        if last_month_fill_rate > 0:
-            fill_rate_trend = ((fill_rate - last_month_fill_rate) / last_month_fill_rate) * 100
+        """
+        Retourne les statistiques pour le dashboard admin.
         
-        return Response({
-            'today_appointments': {
-                'total': today_total,
-                'confirmed': today_confirmed,
-                'pending': today_pending,
-                'subtitle': f"{today_confirmed} confirmés, {today_pending} en attente"
-            },
-            'total_patients': {
-                'total': total_patients,
-                'new_this_month': new_patients_month,
-                'subtitle': f"{new_patients_month} nouveaux ce mois"
-            },
-            'month_revenue': {
-                'amount': month_revenue,
-                'formatted': f"{month_revenue / 1000000:.1f}M FCFA",
-                'consultations': general_count + specialized_count,
-                'subtitle': f"Sur {general_count + specialized_count} consultations"
-            },
-            'fill_rate': {
-                'rate': round(fill_rate, 0),
-                'formatted': f"{round(fill_rate, 0)}%",
-                'subtitle': "Créneaux occupés"
-            },
-            'trends': {
-                'appointments': round(appointments_trend, 0),
-                'patients': round(patients_trend, 0),
-                'revenue': round(revenue_trend, 0),
-                'fill_rate': round(fill_rate_trend, 0)
-            },
-            'recent_appointments': recent_appointments_data
-        })
+        Instantané mis en cache par date (cf. apps.appointments.stats),
+        invalidé à chaque modification de RDV.
+        """
+        return Response(get_dashboard_stats())
     
     @action(detail=False, methods=['get'], permission_classes=[IsStaffOrAdmin])
     def chart_data(self, request):
-        """Retourne les données pour les graphiques du dashboard."""
-        from apps.content_management.models import ClinicSetting
+        """
+        Retourne les données pour les graphiques du dashboard.
         
+        Trois requêtes au total : les séries sont regroupées par période en SQL
+        (cf. apps.appointments.stats.get_time_series).
+        """
         today = timezone.now().date()
         
-        # Récupérer les tarifs depuis les paramètres
-        settings = ClinicSetting.objects.first()
-        fee_general = float(settings.fee_general) if settings else 15000
-        fee_specialized = float(settings.fee_specialized) if settings else 25000
-        
         # 1. Évolution des RDV (7 derniers jours)
-        appointments_evolution = []
         days_fr = ['Lun', 'Mar', 'Mer', 'Jeu', 'Ven', 'Sam', 'Dim']
+        appointments_evolution = [
+            {
+                'name': days_fr[bucket['period'].weekday()],
+                'rdv': bucket['count']
+            }
+            for bucket in get_time_series(today - timedelta(days=6), today, 'day')
+        ]
         
-        for i in range(6, -1, -1):
-            date = today - timedelta(days=i)
-            count = Appointment.objects.filter(date=date).count()
-            day_name = days_fr[date.weekday()]
-            appointments_evolution.append({
-                'name': day_name,
-                'rdv': count
-            })
-        
-        # 2. Répartition par type de consultation (ce mois)
-        first_day_month = today.replace(day=1)
-        month_appointments = Appointment.objects.filter(
-            date__gte=first_day_month,
-            status__in=['confirmed', 'completed']
-        )
-        
-        # Statistiques par statut pour le graphique "Actions requises"
+        # 2. Statistiques par statut pour le graphique "Actions requises"
+        status_counts = get_status_counts()
         status_distribution = [
             {
                 'name': 'Nouvelles demandes',
-                'value': Appointment.objects.filter(status='pending').count(),
+                'value': status_counts.get('pending', 0),
                 'fill': 'rgba(245, 158, 11, 0.8)',  # Orange vif - ACTION REQUISE
                 'description': 'À traiter en priorité'
             },
             {
                 'name': 'En attente patient',
-                'value': Appointment.objects.filter(status='awaiting_patient_response').count(),
+                'value': status_counts.get('awaiting_patient_response', 0),
                 'fill': 'rgba(59, 130, 246, 0.7)',  # Bleu
                 'description': 'Proposition envoyée'
             },
             {
                 'name': 'Contre-propositions',
-                'value': Appointment.objects.filter(status='awaiting_admin_response').count(),
+                'value': status_counts.get('awaiting_admin_response', 0),
                 'fill': 'rgba(139, 92, 246, 0.7)',  # Violet
                 'description': 'Patient a répondu'
             },
             {
                 'name': 'Confirmés',
-                'value': Appointment.objects.filter(status='confirmed').count(),
+                'value': status_counts.get('confirmed', 0),
                 'fill': 'rgba(16, 185, 129, 0.7)',  # Vert
                 'description': 'RDV validés'
             },
             {
                 'name': 'Annulés/Refusés',
-                'value': Appointment.objects.filter(
-                    status__in=['cancelled', 'rejected', 'rejected_by_patient']
-                ).count(),
+                'value': sum(
+                    status_counts.get(value, 0)
+                    for value in ['cancelled', 'rejected', 'rejected_by_patient']
+                ),
                 'fill': 'rgba(239, 68, 68, 0.6)',  # Rouge
                 'description': 'Terminés sans suite'
             }
         ]
         
-        # 3. Revenus mensuels (6 derniers mois)
-        revenue_data = []
+        # 3. Revenus mensuels (6 derniers mois), tarifs ConsultationFee
         months_fr = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Juin', 'Juil', 'Août', 'Sep', 'Oct', 'Nov', 'Déc']
+        first_month = today.replace(day=1)
+        for _ in range(5):
+            first_month = (first_month - timedelta(days=1)).replace(day=1)
         
-        for i in range(5, -1, -1):
-            # Calculer le premier jour du mois
-            if today.month - i <= 0:
-                month = 12 + (today.month - i)
-                year = today.year - 1
-            else:
-                month = today.month - i
-                year = today.year
-            
-            month_start = today.replace(year=year, month=month, day=1)
-            
-            # Calculer le dernier jour du mois
-            if month == 12:
-                month_end = today.replace(year=year + 1, month=1, day=1) - timedelta(days=1)
-            else:
-                month_end = today.replace(year=year, month=month + 1, day=1) - timedelta(days=1)
-            
-            # Compter les consultations du mois
-            month_appts = Appointment.objects.filter(
-                date__gte=month_start,
-                date__lte=month_end,
-                status__in=['confirmed', 'completed']
-            )
-            
-            general = month_appts.filter(consultation_type='generale').count()
-            specialized = month_appts.filter(consultation_type='specialisee').count()
-            suivi = month_appts.filter(consultation_type='suivi').count()
-            urgence = month_appts.filter(consultation_type='urgence').count()
-            
-            # Calculer le revenu avec tarifs dynamiques
-            # Utiliser ConsultationFee si disponible, sinon fallback sur ClinicSetting
-            from apps.content_management.models import ConsultationFee
-            
-            try:
-                fee_general = ConsultationFee.get_price('generale')
-                fee_specialized = ConsultationFee.get_price('specialisee')
-                fee_suivi = ConsultationFee.get_price('suivi')
-                fee_urgence = ConsultationFee.get_price('urgence')
-            except:
-                # Fallback sur les anciens champs
-                fee_general = float(settings.fee_general) if settings else 15000
-                fee_specialized = float(settings.fee_specialized) if settings else 25000
-                fee_suivi = 10000
-                fee_urgence = 30000
-            
-            revenue = (
-                (general * fee_general) + 
-                (specialized * fee_specialized) +
-                (suivi * fee_suivi) +
-                (urgence * fee_urgence)
+        revenue_data = [
+            {
+                'month': months_fr[bucket['period'].month - 1],
+                'revenue': bucket['revenue']
+            }
+            for bucket in get_time_series(
+                first_month, today, 'month',
+                statuses=BILLABLE_STATUSES, with_revenue=True
             )
-            
-            revenue_data.append({
-                'month': months_fr[month - 1],
-                'revenue': revenue
-            })
+        ]
         
         return Response({
             'appointments_evolution': appointments_evolution,
@@ -454,6 +336,69 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             'revenue_data': revenue_data
         })
     
+    @action(detail=False, methods=['get'], permission_classes=[IsStaffOrAdmin])
+    def time_series(self, request):
+        """
+        Série temporelle générique pour les graphiques.
+        
+        Paramètres :
+        - start, end : plage de dates (YYYY-MM-DD), 30 derniers jours par défaut
+        - granularity : day, week ou month (day par défaut)
+        - group_by : consultation_type ou status (optionnel)
+        - status : liste de statuts séparés par des virgules (optionnel)
+        """
+        today = timezone.now().date()
+        granularity = request.query_params.get('granularity', 'day')
+        group_by = request.query_params.get('group_by') or None
+        status_param = request.query_params.get('status')
+        statuses = [value for value in status_param.split(',') if value] if status_param else None
+        
+        try:
+            end = datetime.strptime(
+                request.query_params.get('end', today.isoformat()), '%Y-%m-%d'
+            ).date()
+            start = datetime.strptime(
+                request.query_params.get('start', (end - timedelta(days=29)).isoformat()),
+                '%Y-%m-%d'
+            ).date()
+        except ValueError:
+            return Response(
+                {'error': 'Format de date invalide. Utilisez YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if granularity not in TIME_SERIES_TRUNCATES:
+            return Response(
+                {'error': 'Granularité invalide. Valeurs acceptées : day, week, month'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if group_by and group_by not in TIME_SERIES_GROUP_FIELDS:
+            return Response(
+                {'error': 'Ventilation invalide. Valeurs acceptées : consultation_type, status'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end < start:
+            return Response(
+                {'error': 'La date de fin doit être postérieure à la date de début'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(list(iter_periods(start, end, granularity))) > MAX_TIME_SERIES_BUCKETS:
+            return Response(
+                {'error': f'Une série est limitée à {MAX_TIME_SERIES_BUCKETS} périodes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        series = get_time_series(
+            start, end, granularity,
+            group_by=group_by, statuses=statuses, with_revenue=True
+        )
+        return Response({
+            'start': start,
+            'end': end,
+            'granularity': granularity,
+            'series': series
+        })
+    
     # ============================================================================
     # NOUVELLES ACTIONS POUR WORKFLOW BIDIRECTIONNEL
     # ============================================================================
@@ -954,19 +899,28 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             )
         
         # Récupérer l'historique
-        history = AppointmentHistory.objects.filter(appointment=appointment).order_by('-created_at')
-        serializer = AppointmentHistorySerializer(history, many=True, context={'request': request})
+        # Récupérer l'historique (pagination par curseur : ?cursor=...)
+        history = AppointmentHistory.objects.filter(appointment=appointment).select_related('actor', 'appointment')
+        paginator = AppointmentHistoryPagination()
+        page = paginator.paginate_queryset(history, request, view=self)
+        serializer = AppointmentHistorySerializer(page, many=True, context={'request': request})
         
         return Response({
             'appointment_id': appointment.id,
-            'history': serializer.data
+            'history': serializer.data,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link()
         })
     
+    def _get_default_lock_owner(self, request):
+        """Identifiant de verrou par défaut : utilisateur connecté ou IP."""
+        if request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{request.META.get('REMOTE_ADDR')}"
+    
     def _get_available_slots_for_date(self, date):
         """Retourne les créneaux disponibles pour une date."""
-        # Logique existante de génération de créneaux
-        # (à implémenter selon la logique métier)
-        return []
+        return get_cached_available_slots(date)[date]
 
 
 # ============================================================================
@@ -77,6 +77,14 @@ class ConsultationFee(models.Model):
         ('urgence', 'Urgence'),
     ]
     
+    # Valeurs par défaut si un type n'est pas configuré
+    DEFAULT_PRICES = {
+        'generale': 15000,
+        'specialisee': 25000,
+        'suivi': 10000,
+        'urgence': 30000,
+    }
+    
     consultation_type = models.CharField(
         max_length=20,
         choices=CONSULTATION_TYPE_CHOICES,
@@ -122,13 +130,7 @@ class ConsultationFee(models.Model):
             return float(fee.price)
         except cls.DoesNotExist:
             # Valeurs par défaut si non configuré
-            defaults = {
-                'generale': 15000,
-                'specialisee': 25000,
-                'suivi': 10000,
-                'urgence': 30000,
-            }
-            return defaults.get(consultation_type, 0)
+            return cls.DEFAULT_PRICES.get(consultation_type, 0)
     
     @classmethod
     def get_all_active_fees(cls):
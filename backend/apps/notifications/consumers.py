@@ -0,0 +1,62 @@
+"""
+Consumer WebSocket des notifications.
+
+Remplace le polling de /notifications/count/ pour les clients connectés :
+à la connexion, le client reçoit ses compteurs, puis chaque nouvelle
+notification et chaque variation de compteur lui est poussée.
+
+Messages envoyés au client :
+- {"type": "unread_count", "unread_count": 5, "total_count": 42}
+- {"type": "notification", "notification": {...}}
+- {"type": "count_delta", "unread_delta": -1, "total_delta": 0}
+
+Une notification poussée est toujours non lue : le client incrémente
+lui-même ses deux compteurs à sa réception.
+"""
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import get_user_group
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """WebSocket authentifié : un groupe par utilisateur."""
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            # 4401 : équivalent WebSocket d'un 401
+            await self.close(code=4401)
+            return
+
+        self.group_name = get_user_group(user.pk)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send_json({'type': 'unread_count', **await self.get_counts(user)})
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        """Le client peut redemander ses compteurs (resynchronisation)."""
+        if content.get('type') == 'sync':
+            await self.send_json({'type': 'unread_count', **await self.get_counts(self.scope['user'])})
+
+    @database_sync_to_async
+    def get_counts(self, user):
+        from .models import Notification
+
+        return Notification.get_counts(user)
+
+    # Handlers des événements de groupe (cf. realtime.py)
+
+    async def notification_created(self, event):
+        await self.send_json({'type': 'notification', 'notification': event['notification']})
+
+    async def notification_count(self, event):
+        await self.send_json({
+            'type': 'count_delta',
+            'unread_delta': event['unread_delta'],
+            'total_delta': event['total_delta'],
+        })
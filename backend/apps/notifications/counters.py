@@ -0,0 +1,104 @@
+"""
+Compteurs de notifications par utilisateur (non lues / total).
+
+Les compteurs vivent dans le cache Django (Redis en production) et sont mis à
+jour par incréments après le commit de chaque écriture : le badge ne fait
+plus de COUNT(*) à chaque requête. Un compteur absent est recalculé depuis
+la base à la lecture suivante.
+
+Les suppressions en cascade (RDV ou utilisateur supprimé) ne passent pas par
+les méthodes du modèle : la tâche reconcile_notification_counters réaligne
+périodiquement tous les compteurs sur la base.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+COUNTERS_CACHE_PREFIX = 'notifications:counts'
+COUNTERS_TIMEOUT = 60 * 60 * 24  # 24 heures
+
+
+def _unread_key(user_id):
+    return f"{COUNTERS_CACHE_PREFIX}:{user_id}:unread"
+
+
+def _total_key(user_id):
+    return f"{COUNTERS_CACHE_PREFIX}:{user_id}:total"
+
+
+def set_counts(user_id, unread_count, total_count):
+    """Enregistre les compteurs d'un utilisateur."""
+    cache.set_many({
+        _unread_key(user_id): unread_count,
+        _total_key(user_id): total_count,
+    }, timeout=COUNTERS_TIMEOUT)
+
+
+def get_counts(user_id):
+    """
+    Retourne les compteurs d'un utilisateur depuis le cache.
+
+    Returns:
+        Dictionnaire {'unread_count', 'total_count'}
+    """
+    unread_key, total_key = _unread_key(user_id), _total_key(user_id)
+    cached = cache.get_many([unread_key, total_key])
+    if unread_key in cached and total_key in cached:
+        return {
+            'unread_count': max(cached[unread_key], 0),
+            'total_count': max(cached[total_key], 0),
+        }
+
+    from .models import Notification
+
+    counts = Notification.count_for_user(user_id)
+    set_counts(user_id, counts['unread_count'], counts['total_count'])
+    return counts
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Compteur absent : il sera recalculé à la prochaine lecture
+        pass
+
+
+def apply_delta(user_id, unread_delta=0, total_delta=0):
+    """Applique une variation aux compteurs d'un utilisateur après le commit."""
+    if not unread_delta and not total_delta:
+        return
+
+    def apply():
+        if unread_delta:
+            _incr(_unread_key(user_id), unread_delta)
+        if total_delta:
+            _incr(_total_key(user_id), total_delta)
+
+    transaction.on_commit(apply)
+
+
+def reconcile_counts(user_ids):
+    """
+    Recalcule les compteurs de plusieurs utilisateurs en une requête.
+
+    Returns:
+        Nombre d'utilisateurs réalignés
+    """
+    from django.db.models import Count, Q
+    from .models import Notification
+
+    user_ids = list(user_ids)
+    counts = {user_id: (0, 0) for user_id in user_ids}
+    rows = Notification.objects.filter(user_id__in=user_ids).order_by().values('user_id').annotate(
+        unread_count=Count('id', filter=Q(is_read=False)),
+        total_count=Count('id')
+    )
+    for row in rows:
+        counts[row['user_id']] = (row['unread_count'], row['total_count'])
+
+    values = {}
+    for user_id, (unread_count, total_count) in counts.items():
+        values[_unread_key(user_id)] = unread_count
+        values[_total_key(user_id)] = total_count
+    cache.set_many(values, timeout=COUNTERS_TIMEOUT)
+    return len(counts)
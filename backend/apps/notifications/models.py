@@ -3,6 +3,15 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 
+from . import counters
+from .realtime import push_count_delta, push_notifications
+
+
+def record_count_change(user_id, unread_delta=0, total_delta=0):
+    """Met à jour les compteurs en cache et diffuse la variation aux WebSockets"""
+    counters.apply_delta(user_id, unread_delta, total_delta)
+    push_count_delta(user_id, unread_delta, total_delta)
+
 
 class Notification(models.Model):
     """
@@ -174,12 +183,20 @@ class Notification(models.Model):
         
         super().save(*args, **kwargs)
     
+    def delete(self, *args, **kwargs):
+        """Supprimer la notification et diffuser la variation des compteurs"""
+        user_id, was_unread = self.user_id, not self.is_read
+        result = super().delete(*args, **kwargs)
+        record_count_change(user_id, unread_delta=-1 if was_unread else 0, total_delta=-1)
+        return result
+    
     def mark_as_read(self):
         """Marquer la notification comme lue"""
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
             self.save(update_fields=['is_read', 'read_at'])
+            record_count_change(self.user_id, unread_delta=-1)
     
     def mark_as_unread(self):
         """Marquer la notification comme non lue"""
@@ -187,6 +204,7 @@ class Notification(models.Model):
             self.is_read = False
             self.read_at = None
             self.save(update_fields=['is_read', 'read_at'])
+            record_count_change(self.user_id, unread_delta=1)
     
     def get_time_ago(self):
         """
@@ -234,20 +252,37 @@ class Notification(models.Model):
     @classmethod
     def get_unread_count(cls, user):
         """Retourner le nombre de notifications non lues pour un utilisateur"""
-        return cls.objects.filter(user=user, is_read=False).count()
+        return counters.get_counts(user.pk)['unread_count']
+    
+    @classmethod
+    def get_counts(cls, user):
+        """Retourner les compteurs non lues / total d'un utilisateur (cache)"""
+        return counters.get_counts(user.pk)
+    
+    @classmethod
+    def count_for_user(cls, user_id):
+        """Calculer les compteurs non lues / total depuis la base (une requête)"""
+        return cls.objects.filter(user_id=user_id).aggregate(
+            unread_count=models.Count('id', filter=models.Q(is_read=False)),
+            total_count=models.Count('id')
+        )
     
     @classmethod
     def mark_all_as_read(cls, user):
         """Marquer toutes les notifications d'un utilisateur comme lues"""
-        return cls.objects.filter(user=user, is_read=False).update(
+        count = cls.objects.filter(user=user, is_read=False).update(
             is_read=True,
             read_at=timezone.now()
         )
+        record_count_change(user.pk, unread_delta=-count)
+        return count
     
     @classmethod
     def delete_all_read(cls, user):
         """Supprimer toutes les notifications lues d'un utilisateur"""
-        return cls.objects.filter(user=user, is_read=True).delete()
+        result = cls.objects.filter(user=user, is_read=True).delete()
+        record_count_change(user.pk, total_delta=-result[0])
+        return result
     
     @classmethod
     def create_notification(cls, user, notification_type, title, message, 
@@ -266,7 +301,7 @@ class Notification(models.Model):
         Returns:
             Notification créée
         """
-        return cls.objects.create(
+        notification = cls.objects.create(
             user=user,
             type=notification_type,
             title=title,
@@ -274,3 +309,47 @@ class Notification(models.Model):
             action_url=action_url,
             related_appointment=related_appointment
         )
+        push_notifications([notification])
+        counters.apply_delta(user.pk, unread_delta=1, total_delta=1)
+        return notification
+    
+    @classmethod
+    def bulk_create_notifications(cls, user_ids, notification_type, title, message,
+                                  action_url='', related_appointment_id=None):
+        """
+        Crée la même notification pour plusieurs utilisateurs en une requête
+        
+        bulk_create ne passe pas par save() : l'icône et la couleur sont
+        donc calculées ici depuis ICON_MAP / COLOR_MAP.
+        
+        Args:
+            user_ids: Identifiants des destinataires
+            notification_type: Type de notification (voir TYPE_CHOICES)
+            title: Titre de la notification
+            message: Message détaillé
+            action_url: URL de redirection (optionnel)
+            related_appointment_id: Identifiant du rendez-vous lié (optionnel)
+        
+        Returns:
+            Liste des notifications créées
+        """
+        icon = cls.ICON_MAP.get(notification_type, 'bell')
+        color = cls.COLOR_MAP.get(notification_type, 'gray')
+        
+        notifications = cls.objects.bulk_create([
+            cls(
+                user_id=user_id,
+                type=notification_type,
+                title=title,
+                message=message,
+                icon=icon,
+                color=color,
+                action_url=action_url,
+                related_appointment_id=related_appointment_id
+            )
+            for user_id in user_ids
+        ])
+        push_notifications(notifications)
+        for notification in notifications:
+            counters.apply_delta(notification.user_id, unread_delta=1, total_delta=1)
+        return notifications
@@ -0,0 +1,70 @@
+"""
+Diffusion temps réel des notifications via Channels.
+
+Chaque utilisateur connecté en WebSocket rejoint le groupe
+``notifications_user_<id>`` (cf. consumers.NotificationConsumer). Les
+événements sont envoyés après le commit de la transaction courante :
+- ``notification.created`` : nouvelle notification sérialisée
+- ``notification.count`` : variation des compteurs non lus / total
+
+Une couche Channels indisponible ne doit jamais faire échouer la requête
+HTTP : les erreurs sont journalisées et le client retombe sur le polling.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def get_user_group(user_id):
+    """Nom du groupe Channels d'un utilisateur."""
+    return f"notifications_user_{user_id}"
+
+
+def _group_send(user_id, event):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(get_user_group(user_id), event)
+    except Exception as e:
+        logger.warning(f"Diffusion WebSocket impossible pour l'utilisateur {user_id}: {e}")
+
+
+def push_notifications(notifications):
+    """Diffuse des notifications nouvellement créées à leurs destinataires."""
+    from .serializers import NotificationListSerializer
+
+    events = [
+        (
+            notification.user_id,
+            {
+                'type': 'notification.created',
+                'notification': dict(NotificationListSerializer(notification).data),
+            }
+        )
+        for notification in notifications
+    ]
+
+    def send():
+        for user_id, event in events:
+            _group_send(user_id, event)
+
+    if events:
+        transaction.on_commit(send)
+
+
+def push_count_delta(user_id, unread_delta=0, total_delta=0):
+    """Diffuse une variation des compteurs de notifications d'un utilisateur."""
+    if not unread_delta and not total_delta:
+        return
+
+    event = {
+        'type': 'notification.count',
+        'unread_delta': unread_delta,
+        'total_delta': total_delta,
+    }
+    transaction.on_commit(lambda: _group_send(user_id, event))
@@ -0,0 +1,10 @@
+"""
+Routes WebSocket de l'app notifications
+"""
+from django.urls import path
+
+from .consumers import NotificationConsumer
+
+websocket_urlpatterns = [
+    path('ws/notifications/', NotificationConsumer.as_asgi()),
+]
@@ -14,13 +14,18 @@ des notifications pour les admins et patients.
 - Proposition acceptée → Notification admin
 """
 
-from django.db.models.signals import post_save, pre_save
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from apps.appointments.models import Appointment
 from .models import Notification
+from .tasks import notify_admins_task
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 def get_admin_users():
@@ -32,6 +37,11 @@ def notify_admins(notification_type, title, message, action_url='', related_appo
     """
     Créer une notification pour tous les admins
     
+    La création est différée après le commit de la transaction courante et
+    confiée à Celery (tasks.notify_admins_task), qui insère toutes les
+    notifications en une requête : l'enregistrement d'un RDV ne paie plus
+    un INSERT par admin.
+    
     Args:
         notification_type: Type de notification
         title: Titre de la notification
@@ -39,17 +49,23 @@ def notify_admins(notification_type, title, message, action_url='', related_appo
         action_url: URL de redirection
         related_appointment: Rendez-vous lié
     """
-    admins = get_admin_users()
-    
-    for admin in admins:
-        Notification.create_notification(
-            user=admin,
-            notification_type=notification_type,
-            title=title,
-            message=message,
-            action_url=action_url,
-            related_appointment=related_appointment
-        )
+    task_kwargs = {
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'action_url': action_url,
+        'related_appointment_id': related_appointment.pk if related_appointment else None,
+    }
+    transaction.on_commit(lambda: _dispatch_notify_admins(task_kwargs))
+
+
+def _dispatch_notify_admins(task_kwargs):
+    """Envoie la tâche à Celery, ou l'exécute sur place si le broker est injoignable."""
+    try:
+        notify_admins_task.delay(**task_kwargs)
+    except Exception as e:
+        logger.warning(f"Broker Celery indisponible, notifications admins créées en synchrone: {e}")
+        notify_admins_task(**task_kwargs)
 
 
 def notify_patient(patient, notification_type, title, message, action_url='', related_appointment=None):
@@ -99,9 +115,8 @@ def appointment_post_save_notification(sender, instance, created, **kwargs):
     
     # 2. RENDEZ-VOUS CONFIRMÉ (par l'admin)
     elif not created and instance.status == 'confirmed':
-        # Vérifier si le statut vient de changer
-        old_instance = Appointment.objects.filter(pk=instance.pk).first()
-        if old_instance and old_instance.status != 'confirmed':
+        # Vérifier si le statut vient de changer (diff calculé par Appointment.save())
+        if 'status' in instance.tracked_changes:
             # Notifier le patient si il a un compte
             if instance.patient:
                 notify_patient(
@@ -196,39 +211,30 @@ def appointment_post_save_notification(sender, instance, created, **kwargs):
 
 
 # Signal pour détecter les changements de date/heure (modification admin)
-@receiver(pre_save, sender=Appointment)
-def appointment_pre_save_notification(sender, instance, **kwargs):
+@receiver(post_save, sender=Appointment)
+def appointment_reschedule_notification(sender, instance, created, **kwargs):
     """
-    Signal déclenché AVANT la sauvegarde d'un rendez-vous
-    
     Détecte les modifications de date/heure par l'admin et notifie le patient
-    """
     
-    # Ignorer si c'est une création
-    if instance.pk is None:
+    S'appuie sur le diff calculé par Appointment.save() (valeurs chargées
+    via from_db) : aucune relecture de la ligne en base.
+    """
+    if created:
         return
     
-    try:
-        # Récupérer l'ancienne version
-        old_instance = Appointment.objects.get(pk=instance.pk)
-        
-        # Vérifier si la date ou l'heure a changé
-        date_changed = old_instance.date != instance.date
-        time_changed = old_instance.time != instance.time
-        
-        # Si modification par l'admin (pas de changement de statut vers modification_pending)
-        if (date_changed or time_changed) and instance.status != 'modification_pending':
-            # Notifier le patient si il a un compte
-            if instance.patient:
-                notify_patient(
-                    patient=instance.patient,
-                    notification_type='appointment_modified',
-                    title='Rendez-vous modifié',
-                    message=f'Votre rendez-vous a été modifié. Nouvelle date : {instance.date.strftime("%d/%m/%Y")} à {instance.time}.',
-                    action_url=f'/patient/appointments/{instance.id}',
-                    related_appointment=instance
-                )
+    changes = instance.tracked_changes
+    date_changed = 'date' in changes
+    time_changed = 'time' in changes
     
-    except Appointment.DoesNotExist:
-        # L'instance n'existe pas encore (création)
-        pass
+    # Si modification par l'admin (pas de changement de statut vers modification_pending)
+    if (date_changed or time_changed) and instance.status != 'modification_pending':
+        # Notifier le patient si il a un compte
+        if instance.patient:
+            notify_patient(
+                patient=instance.patient,
+                notification_type='appointment_modified',
+                title='Rendez-vous modifié',
+                message=f'Votre rendez-vous a été modifié. Nouvelle date : {instance.date.strftime("%d/%m/%Y")} à {instance.time}.',
+                action_url=f'/patient/appointments/{instance.id}',
+                related_appointment=instance
+            )
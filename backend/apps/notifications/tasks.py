@@ -0,0 +1,60 @@
+"""
+Tâches Celery pour l'app notifications
+"""
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def notify_admins_task(notification_type, title, message, action_url='',
+                       related_appointment_id=None):
+    """
+    Crée une notification pour tous les admins actifs
+    Déclenchée après le commit par signals.notify_admins
+    
+    Un INSERT groupé quel que soit le nombre d'admins.
+    """
+    from apps.appointments.models import Appointment
+    from .models import Notification
+    from .signals import get_admin_users
+    
+    # Le RDV a pu être supprimé entre le commit et l'exécution de la tâche
+    if related_appointment_id and not Appointment.objects.filter(pk=related_appointment_id).exists():
+        related_appointment_id = None
+    
+    admin_ids = list(get_admin_users().values_list('id', flat=True))
+    created = Notification.bulk_create_notifications(
+        admin_ids,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        action_url=action_url,
+        related_appointment_id=related_appointment_id
+    )
+    
+    return {'notifications_created': len(created)}
+
+
+@shared_task
+def reconcile_notification_counters(batch_size=500):
+    """
+    Réaligne les compteurs de notifications en cache sur la base
+    Exécuté toutes les heures
+    
+    Corrige les dérives (suppressions en cascade, incréments perdus).
+    """
+    from django.contrib.auth import get_user_model
+    from .counters import reconcile_counts
+    
+    User = get_user_model()
+    user_ids = list(User.objects.filter(is_active=True).values_list('id', flat=True))
+    
+    reconciled = 0
+    for start in range(0, len(user_ids), batch_size):
+        reconciled += reconcile_counts(user_ids[start:start + batch_size])
+    
+    logger.info(f"Compteurs notifications: {reconciled} utilisateurs réalignés")
+    
+    return {'users_reconciled': reconciled}
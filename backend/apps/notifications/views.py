@@ -3,7 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from .models import Notification
+from config.pagination import NotificationPagination
+from .models import Notification, record_count_change
 from .serializers import (
     NotificationSerializer,
     NotificationListSerializer,
@@ -29,6 +30,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     permission_classes = [IsAuthenticated]
     serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
+    query_budget = {'list': 5, 'retrieve': 5}
     
     def get_queryset(self):
         """
@@ -75,6 +78,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """
         Retourner le count des notifications non lues
         
+        Lu depuis les compteurs en cache (cf. counters.py), sans COUNT(*).
+        
         GET /notifications/count/
         
         Response:
@@ -83,14 +88,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
             "total_count": 42
         }
         """
-        user = request.user
-        unread_count = Notification.objects.filter(user=user, is_read=False).count()
-        total_count = Notification.objects.filter(user=user).count()
-        
-        serializer = NotificationCountSerializer({
-            'unread_count': unread_count,
-            'total_count': total_count
-        })
+        serializer = NotificationCountSerializer(Notification.get_counts(request.user))
         
         return Response(serializer.data)
     
@@ -174,6 +172,13 @@ class NotificationViewSet(viewsets.ModelViewSet):
             'count': count
         })
     
+    def perform_update(self, serializer):
+        """Répercuter un changement de is_read (PATCH) sur les compteurs"""
+        was_read = serializer.instance.is_read
+        notification = serializer.save()
+        if notification.is_read != was_read:
+            record_count_change(notification.user_id, unread_delta=-1 if notification.is_read else 1)
+    
     def destroy(self, request, *args, **kwargs):
         """
         Supprimer une notification
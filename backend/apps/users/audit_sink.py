@@ -0,0 +1,180 @@
+"""
+Écriture différée et groupée des logs d'audit.
+
+AuditLog.log() et les middlewares d'audit ne font plus d'INSERT sur le thread
+de la requête : les instances (AuditLog, LoginAttempt) sont placées dans une
+file bornée en mémoire, puis écrites par lots avec bulk_create depuis un
+thread d'arrière-plan.
+
+Garanties :
+- file bornée (AUDIT_BUFFER_SIZE) : la mémoire du worker reste maîtrisée ;
+- contre-pression : si la file reste pleine plus de AUDIT_ENQUEUE_TIMEOUT,
+  l'appelant écrit lui-même son log (comportement synchrone d'origine) ;
+- vidage à l'arrêt : atexit draine la file avant la sortie du processus ;
+  les enfants prefork de Celery sortent par os._exit (sans atexit) : la file
+  est vidée après chaque tâche et à l'arrêt du processus (signaux Celery) ;
+- lot en échec : les logs sont réécrits un par un plutôt que perdus.
+
+Avec AUDIT_ASYNC_WRITES = False (tests), chaque log est écrit immédiatement.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class AuditSink:
+    """File d'écriture des logs d'audit, vidée par un thread dédié."""
+
+    def __init__(self, batch_size=100, flush_interval=2.0, buffer_size=10000,
+                 enqueue_timeout=0.05):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.queue = queue.Queue(maxsize=buffer_size)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def enqueue(self, instance):
+        """Ajoute une instance non sauvegardée à la file d'écriture."""
+        if not getattr(settings, 'AUDIT_ASYNC_WRITES', True):
+            self._write([instance])
+            return
+
+        self._ensure_worker()
+        try:
+            self.queue.put(instance, timeout=self.enqueue_timeout)
+        except queue.Full:
+            # Contre-pression : le thread d'écriture ne suit pas
+            logger.warning("File d'audit pleine, écriture synchrone")
+            self._write([instance])
+
+    def flush(self):
+        """Écrit immédiatement tout le contenu de la file."""
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        self._write(batch)
+        return len(batch)
+
+    def close(self):
+        """Arrête le thread d'écriture et vide la file (appelé à la sortie)."""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def _ensure_worker(self):
+        # Un thread par processus : après un fork (gunicorn, celery), le thread
+        # du parent n'existe pas dans l'enfant
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='audit-sink', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stop.is_set():
+            timeout = max(deadline - time.monotonic(), 0)
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+        self._write(batch)
+
+    def _write(self, batch):
+        if not batch:
+            return
+
+        by_model = defaultdict(list)
+        for instance in batch:
+            by_model[type(instance)].append(instance)
+
+        try:
+            for model, instances in by_model.items():
+                try:
+                    model.objects.bulk_create(instances, batch_size=self.batch_size)
+                except Exception as e:
+                    # bulk_create est atomique : rien n'a été écrit, on isole
+                    # la ou les lignes fautives en écrivant une à une
+                    logger.warning(f"Échec du lot de {len(instances)} logs d'audit, écriture unitaire: {e}")
+                    self._write_each(instances)
+        finally:
+            if threading.current_thread() is self._thread:
+                close_old_connections()
+
+    def _write_each(self, instances):
+        lost = 0
+        for instance in instances:
+            try:
+                instance.save(force_insert=True)
+            except Exception as e:
+                lost += 1
+                error = e
+        if lost:
+            logger.error(f"Erreur d'écriture de {lost} logs d'audit: {error}")
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_audit_sink():
+    """Retourne la file d'audit du processus (créée au premier appel)."""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = AuditSink(
+                    batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 100),
+                    flush_interval=getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2.0),
+                    buffer_size=getattr(settings, 'AUDIT_BUFFER_SIZE', 10000),
+                    enqueue_timeout=getattr(settings, 'AUDIT_ENQUEUE_TIMEOUT', 0.05),
+                )
+                atexit.register(_sink.close)
+    return _sink
+
+
+def _flush_after_task(**kwargs):
+    if _sink is not None:
+        _sink.flush()
+
+
+def _close_on_worker_shutdown(**kwargs):
+    if _sink is not None:
+        _sink.close()
+
+
+def connect_celery_signals():
+    """Vide la file après chaque tâche et à l'arrêt des workers (cf. config.celery)"""
+    from celery.signals import task_postrun, worker_process_shutdown, worker_shutdown
+
+    task_postrun.connect(_flush_after_task, weak=False, dispatch_uid='vida_audit_postrun')
+    worker_process_shutdown.connect(_close_on_worker_shutdown, weak=False, dispatch_uid='vida_audit_process_shutdown')
+    worker_shutdown.connect(_close_on_worker_shutdown, weak=False, dispatch_uid='vida_audit_shutdown')
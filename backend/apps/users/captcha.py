@@ -25,6 +25,10 @@ def verify_hcaptcha(token, remote_ip=None):
             'captcha': 'Le CAPTCHA est requis.'
         })
     
+    # Pile locale de test de charge (config.settings.loadtest) : aucun appel externe
+    if getattr(settings, 'HCAPTCHA_STUB', False):
+        return True
+    
     # En développement, si HCAPTCHA_SECRET_KEY n'est pas défini, skip la validation
     secret_key = getattr(settings, 'HCAPTCHA_SECRET_KEY', None)
     if not secret_key:
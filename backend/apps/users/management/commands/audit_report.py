@@ -1,12 +1,15 @@
 """
 Commande Django pour générer un rapport d'audit
-Usage: python manage.py audit_report [--days=7] [--user=email] [--action=login]
+Usage: python manage.py audit_report [--days=7] [--user=email] [--action=login] [--export=fichier.csv[.gz]]
 """
+from collections import Counter
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db import models
 from datetime import timedelta
 from apps.users.models_audit import AuditLog, LoginAttempt
+from apps.users.audit_export import EXPORT_CHUNK_SIZE, write_csv
+from apps.users.security_counters import get_login_summary
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -41,7 +44,18 @@ class Command(BaseCommand):
         parser.add_argument(
             '--export',
             type=str,
-            help='Exporter vers un fichier CSV'
+            help='Exporter vers un fichier CSV (compressé si le nom finit par .gz)'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Compresser l\'export en gzip'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f'Lignes lues par paquet lors de l\'export (défaut: {EXPORT_CHUNK_SIZE})'
         )
     
     def handle(self, *args, **options):
@@ -71,8 +85,13 @@ class Command(BaseCommand):
         if level:
             logs = logs.filter(level=level)
         
-        # Statistiques
-        total_logs = logs.count()
+        # Statistiques : une seule requête groupée par (action, niveau)
+        actions_counts = Counter()
+        levels_counts = Counter()
+        for stat in logs.order_by().values('action', 'level').annotate(count=models.Count('id')):
+            actions_counts[stat['action']] += stat['count']
+            levels_counts[stat['level']] += stat['count']
+        total_logs = sum(actions_counts.values())
         
         self.stdout.write(self.style.SUCCESS('=' * 80))
         self.stdout.write(self.style.SUCCESS(f'📊 RAPPORT D\'AUDIT - {days} derniers jours'))
@@ -86,30 +105,21 @@ class Command(BaseCommand):
         # Par action
         self.stdout.write('')
         self.stdout.write(self.style.WARNING('🎯 Par type d\'action:'))
-        actions_stats = logs.values('action').annotate(
-            count=models.Count('id')
-        ).order_by('-count')[:10]
-        
-        for stat in actions_stats:
-            action_display = dict(AuditLog.ACTION_CHOICES).get(stat['action'], stat['action'])
-            self.stdout.write(f'   • {action_display}: {stat["count"]}')
+        for action_key, count in actions_counts.most_common(10):
+            action_display = dict(AuditLog.ACTION_CHOICES).get(action_key, action_key)
+            self.stdout.write(f'   • {action_display}: {count}')
         
         # Par niveau
         self.stdout.write('')
         self.stdout.write(self.style.WARNING('⚠️  Par niveau:'))
-        levels_stats = logs.values('level').annotate(
-            count=models.Count('id')
-        ).order_by('-count')
-        
-        for stat in levels_stats:
-            level_display = dict(AuditLog.LEVEL_CHOICES).get(stat['level'], stat['level'])
-            count = stat['count']
+        for level_key, count in levels_counts.most_common():
+            level_display = dict(AuditLog.LEVEL_CHOICES).get(level_key, level_key)
             
-            if stat['level'] == 'critical':
+            if level_key == 'critical':
                 self.stdout.write(self.style.ERROR(f'   • {level_display}: {count}'))
-            elif stat['level'] == 'error':
+            elif level_key == 'error':
                 self.stdout.write(self.style.ERROR(f'   • {level_display}: {count}'))
-            elif stat['level'] == 'warning':
+            elif level_key == 'warning':
                 self.stdout.write(self.style.WARNING(f'   • {level_display}: {count}'))
             else:
                 self.stdout.write(f'   • {level_display}: {count}')
@@ -141,10 +151,11 @@ class Command(BaseCommand):
         # Tentatives de connexion
         self.stdout.write('')
         self.stdout.write(self.style.WARNING('🔐 Tentatives de connexion:'))
-        login_attempts = LoginAttempt.objects.filter(timestamp__gte=start_date)
-        total_attempts = login_attempts.count()
-        successful = login_attempts.filter(success=True).count()
-        failed = login_attempts.filter(success=False).count()
+        # Synthèses horaires (SecurityHourlySummary) + heures non agrégées
+        login_summary = get_login_summary(start_date)
+        total_attempts = login_summary['total']
+        successful = login_summary['successful']
+        failed = login_summary['failed']
         
         self.stdout.write(f'   • Total: {total_attempts}')
         self.stdout.write(self.style.SUCCESS(f'   • Réussies: {successful}'))
@@ -157,45 +168,36 @@ class Command(BaseCommand):
         if failed > 0:
             self.stdout.write('')
             self.stdout.write(self.style.ERROR('❌ Échecs de connexion récents:'))
-            recent_failures = login_attempts.filter(success=False).order_by('-timestamp')[:5]
+            recent_failures = LoginAttempt.objects.filter(
+                timestamp__gte=start_date, success=False
+            ).order_by('-timestamp')[:5]
             
             for attempt in recent_failures:
                 self.stdout.write(
                     f'   • {attempt.timestamp.strftime("%Y-%m-%d %H:%M:%S")} - '
                     f'{attempt.username} - {attempt.ip_address} - {attempt.failure_reason}'
                 )
+            
+            self.stdout.write('')
+            self.stdout.write(self.style.ERROR('🚫 IPs avec le plus d\'échecs:'))
+            for ip_address, count in login_summary['top_failed_ips']:
+                self.stdout.write(f'   • {ip_address}: {count} échecs')
+            
+            self.stdout.write('')
+            self.stdout.write(self.style.ERROR('🚫 Identifiants avec le plus d\'échecs:'))
+            for username, count in login_summary['top_failed_usernames']:
+                self.stdout.write(f'   • {username}: {count} échecs')
         
         # Export CSV
         if export_file:
-            self._export_csv(logs, export_file)
+            compress = options['gzip'] or export_file.endswith('.gz')
+            exported = write_csv(
+                logs, export_file,
+                chunk_size=max(options['chunk_size'], 1),
+                compress=compress
+            )
             self.stdout.write('')
-            self.stdout.write(self.style.SUCCESS(f'✅ Rapport exporté vers: {export_file}'))
+            self.stdout.write(self.style.SUCCESS(f'✅ {exported} lignes exportées vers: {export_file}'))
         
         self.stdout.write('')
         self.stdout.write(self.style.SUCCESS('=' * 80))
-    
-    def _export_csv(self, logs, filename):
-        """Exporter les logs vers un fichier CSV"""
-        import csv
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            # Header
-            writer.writerow([
-                'Timestamp', 'User', 'Action', 'Level', 'Description',
-                'IP Address', 'User Agent', 'Request Path'
-            ])
-            
-            # Données
-            for log in logs:
-                writer.writerow([
-                    log.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                    log.username or 'Anonyme',
-                    log.get_action_display(),
-                    log.get_level_display(),
-                    log.description,
-                    log.ip_address or '',
-                    log.user_agent or '',
-                    log.request_path or ''
-                ])
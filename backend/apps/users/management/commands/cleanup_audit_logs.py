@@ -6,6 +6,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from apps.users.models_audit import AuditLog, LoginAttempt
+from apps.users.partitioning import purge_audit_logs
 
 
 class Command(BaseCommand):
@@ -54,14 +55,18 @@ class Command(BaseCommand):
                 self.stdout.write('Annulé')
                 return
         
-        # Suppression
+        # Suppression (partitions expirées détachées puis supprimées sur PostgreSQL)
         if audit_count > 0:
-            audit_logs.delete()
+            _, dropped = purge_audit_logs(AuditLog, cutoff_date)
             self.stdout.write(self.style.SUCCESS(f'✅ {audit_count} logs d\'audit supprimés'))
+            for name in dropped:
+                self.stdout.write(f'   Partition supprimée: {name}')
         
         if login_count > 0:
-            login_attempts.delete()
+            _, dropped = purge_audit_logs(LoginAttempt, cutoff_date)
             self.stdout.write(self.style.SUCCESS(f'✅ {login_count} tentatives de connexion supprimées'))
+            for name in dropped:
+                self.stdout.write(f'   Partition supprimée: {name}')
         
         if audit_count + login_count == 0:
             self.stdout.write(self.style.SUCCESS('✅ Aucun log à supprimer'))
@@ -0,0 +1,32 @@
+"""
+Commande Django pour créer les partitions mensuelles des tables d'audit
+Usage: python manage.py create_audit_partitions [--months=3]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.users.partitioning import create_audit_partitions
+
+
+class Command(BaseCommand):
+    help = 'Crée les partitions mensuelles à venir de audit_log et login_attempt (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=getattr(settings, 'AUDIT_PARTITION_MONTHS_AHEAD', 3),
+            help='Nombre de mois à créer après le mois courant (défaut: AUDIT_PARTITION_MONTHS_AHEAD)'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('⚠️  Partitionnement disponible uniquement sur PostgreSQL'))
+            return
+
+        created = create_audit_partitions(months_ahead=max(options['months'], 0))
+
+        for name in created:
+            self.stdout.write(f'   {name}')
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(created)} partitions créées'))
@@ -0,0 +1,55 @@
+"""
+Commande Django pour exporter les métriques de performance
+Usage: python manage.py export_metrics [--textfile=/var/lib/node_exporter/vida.prom] [--summary]
+"""
+from django.core.management.base import BaseCommand
+
+from config.metrics import collect, render, route_summary, write_textfile
+
+
+class Command(BaseCommand):
+    help = 'Exporte les métriques Prometheus (fichier texte node-exporter) ou affiche les routes les plus coûteuses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--textfile',
+            type=str,
+            help='Fichier .prom à écrire (textfile collector de node-exporter)'
+        )
+        parser.add_argument(
+            '--summary',
+            action='store_true',
+            help='Afficher p50 / p95 / p99 par route, routes les plus coûteuses d\'abord'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Nombre de routes affichées avec --summary (défaut: 20)'
+        )
+
+    def handle(self, *args, **options):
+        if options['textfile']:
+            write_textfile(options['textfile'])
+            self.stdout.write(self.style.SUCCESS(f"✅ Métriques écrites dans {options['textfile']}"))
+
+        if options['summary']:
+            self._print_summary(route_summary(collect())[:options['top']])
+        elif not options['textfile']:
+            self.stdout.write(render(collect()))
+
+    def _print_summary(self, rows):
+        if not rows:
+            self.stdout.write(self.style.WARNING('⚠️  Aucune requête mesurée (METRICS_DIR non configuré ?)'))
+            return
+
+        self.stdout.write(
+            f"{'Route':<45} {'Méthode':<7} {'Requêtes':>9} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'DB ms':>7} {'SQL':>5}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['route'][:45]:<45} {row['method']:<7} {row['count']:>9} "
+                f"{row['p50'] * 1000:>8.1f} {row['p95'] * 1000:>8.1f} {row['p99'] * 1000:>8.1f} "
+                f"{row['db_mean'] * 1000:>7.1f} {row['queries_mean']:>5.1f}"
+            )
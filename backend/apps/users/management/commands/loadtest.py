@@ -0,0 +1,202 @@
+"""
+Commande Django pour générer une charge mixte contre un serveur local
+Usage: python manage.py loadtest --password=<mot de passe> [--url=http://127.0.0.1:8000]
+                                 [--concurrency=50] [--duration=120]
+                                 [--mix=anonymous_booking=4,patient_notifications=3] [--create-accounts]
+
+Cible prévue : la pile locale DJANGO_ENV=loadtest (cf. config.settings.loadtest).
+--create-accounts crée des comptes patient, staff et admin : refusé hors de
+cette pile (HCAPTCHA_STUB), pour ne jamais en créer dans une base réelle.
+"""
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from config.load_generator import DEFAULT_MIX, PERSONA_ROLES, parse_mix, run_load
+
+User = get_user_model()
+
+ACCOUNT_EMAIL = 'loadtest-{role}-{index}@loadtest.vida.local'
+
+
+class Command(BaseCommand):
+    help = 'Simule un trafic mixte (réservations, notifications, dashboard, exports) et mesure débit, erreurs et 429'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            type=str,
+            default='http://127.0.0.1:8000',
+            help='Serveur cible (défaut: http://127.0.0.1:8000)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=10,
+            help='Utilisateurs virtuels simultanés (défaut: 10)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=60,
+            help='Durée du test en secondes (défaut: 60)'
+        )
+        parser.add_argument(
+            '--ramp-up',
+            type=float,
+            default=0,
+            help='Durée de montée en charge en secondes (défaut: 0)'
+        )
+        parser.add_argument(
+            '--mix',
+            type=str,
+            default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+            help='Pondération des parcours (défaut: %(default)s)'
+        )
+        parser.add_argument(
+            '--think-time',
+            type=float,
+            default=1.0,
+            help='Pause moyenne entre deux parcours d\'un utilisateur, en secondes (défaut: 1.0)'
+        )
+        parser.add_argument(
+            '--client-ips',
+            type=int,
+            help='Nombre d\'IP simulées via X-Forwarded-For (défaut: une par utilisateur, 0: aucune)'
+        )
+        parser.add_argument(
+            '--accounts',
+            type=int,
+            default=10,
+            help='Comptes par rôle (patient, staff, admin) utilisés par les parcours connectés (défaut: 10)'
+        )
+        parser.add_argument(
+            '--create-accounts',
+            action='store_true',
+            help='Créer ou réinitialiser les comptes de test (pile DJANGO_ENV=loadtest uniquement)'
+        )
+        parser.add_argument(
+            '--password',
+            type=str,
+            required=True,
+            help='Mot de passe des comptes de test'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Délai maximum d\'une requête en secondes (défaut: 30)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Graine du tirage des parcours (reproductibilité)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Fichier JSON du rapport'
+        )
+        parser.add_argument(
+            '--max-error-rate',
+            type=float,
+            help='Terminer en erreur au-delà de ce taux d\'erreurs (ex: 0.01)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['concurrency'] < 1 or options['duration'] <= 0:
+            raise CommandError('--concurrency et --duration doivent être positifs')
+        if options['create_accounts'] and not getattr(settings, 'HCAPTCHA_STUB', False):
+            raise CommandError(
+                '--create-accounts est réservé à la pile de test de charge (DJANGO_ENV=loadtest)'
+            )
+
+        roles = sorted({PERSONA_ROLES[name] for name, weight in mix.items() if weight and PERSONA_ROLES[name]})
+        accounts = self._get_accounts(roles, options)
+
+        self.stdout.write(self.style.WARNING(
+            f"🚀 {options['concurrency']} utilisateurs virtuels pendant {options['duration']:g} s → {options['url']}"
+        ))
+        report = asyncio.run(run_load(
+            options['url'],
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            mix=mix,
+            accounts=accounts,
+            client_ips=options['client_ips'],
+            think_time=options['think_time'],
+            ramp_up=options['ramp_up'],
+            seed=options['seed'],
+            timeout=options['timeout'],
+        ))
+        self._print_report(report)
+
+        if options['output']:
+            report['meta'] = {
+                'url': options['url'],
+                'concurrency': options['concurrency'],
+                'duration': options['duration'],
+                'mix': mix,
+                'think_time': options['think_time'],
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            Path(options['output']).parent.mkdir(parents=True, exist_ok=True)
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Rapport écrit dans {options['output']}"))
+
+        if options['max_error_rate'] is not None and report['error_rate'] > options['max_error_rate']:
+            raise CommandError(
+                f"Taux d'erreurs {report['error_rate']:.2%} supérieur à {options['max_error_rate']:.2%}"
+            )
+
+    def _get_accounts(self, roles, options):
+        """Comptes loadtest-<rôle>-<n>@loadtest.vida.local, créés si demandé"""
+        accounts = {}
+        for role in roles:
+            emails = [ACCOUNT_EMAIL.format(role=role, index=index) for index in range(options['accounts'])]
+            if options['create_accounts']:
+                for email in emails:
+                    user, _ = User.objects.get_or_create(email=email, defaults={
+                        'first_name': 'Charge',
+                        'last_name': role.capitalize(),
+                        'role': role,
+                    })
+                    user.set_password(options['password'])
+                    user.save(update_fields=['password'])
+                self.stdout.write(f"   {len(emails)} comptes {role} prêts")
+            elif not User.objects.filter(email__in=emails).exists():
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️  Aucun compte {role} de test (relancer avec --create-accounts)"
+                ))
+            accounts[role] = [(email, options['password']) for email in emails]
+        return accounts
+
+    def _print_report(self, report):
+        self.stdout.write(
+            f"\n{'Étape':<40} {'Req.':>6} {'OK':>6} {'429':>5} {'4xx':>5} {'5xx':>5} {'Échecs':>6} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for step, row in report['steps'].items():
+            self.stdout.write(
+                f"{step[:40]:<40} {row['requests']:>6} {row['ok']:>6} {row['throttled']:>5} "
+                f"{row['client_errors']:>5} {row['server_errors']:>5} {row['failures']:>6} "
+                f"{row.get('p50_ms', 0):>8.1f} {row.get('p95_ms', 0):>8.1f} {row.get('p99_ms', 0):>8.1f}"
+            )
+
+        self.stdout.write(
+            f"\n📊 {report['requests']} requêtes en {report['duration_s']} s "
+            f"({report['throughput_rps']} req/s), erreurs {report['error_rate']:.2%}, "
+            f"429 {report['throttled']} ({report['throttled_rate']:.2%})"
+        )
+        if report['retry_after_max_s'] is not None:
+            self.stdout.write(f"   Retry-After maximum : {report['retry_after_max_s']} s")
@@ -0,0 +1,123 @@
+"""
+Commande Django pour consulter les profils des requêtes lentes
+Usage: python manage.py profiles [--route=appointments-list] [--summary] [--show=<fichier>] [--purge]
+"""
+import os
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.profiling import get_profiles_dir, load_profiles, load_stacks, summarize_stacks
+from config.query_budget import fingerprint
+
+
+class Command(BaseCommand):
+    help = 'Liste et résume les profils enregistrés par ProfilingMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--route',
+            type=str,
+            help='Ne retenir que les profils de cette route (nom d\'URL)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Nombre de profils listés (défaut: 20)'
+        )
+        parser.add_argument(
+            '--summary',
+            action='store_true',
+            help='Agréger les profils retenus : frames les plus coûteuses et requêtes SQL'
+        )
+        parser.add_argument(
+            '--show',
+            type=str,
+            help='Résumer un seul profil (nom du fichier .json)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Nombre de frames / requêtes affichées (défaut: 15)'
+        )
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='Supprimer les profils retenus'
+        )
+
+    def handle(self, *args, **options):
+        profiles = load_profiles()
+        if options['route']:
+            profiles = [p for p in profiles if p.get('route') == options['route']]
+        if options['show']:
+            profiles = [p for p in profiles if os.path.basename(p['path']) == options['show']]
+            if not profiles:
+                raise CommandError(f"Profil introuvable: {options['show']}")
+
+        if not profiles:
+            self.stdout.write(self.style.WARNING(f"⚠️  Aucun profil dans {get_profiles_dir()}"))
+            return
+
+        if options['purge']:
+            self._purge(profiles)
+        elif options['summary'] or options['show']:
+            self._print_summary(profiles, options['top'])
+        else:
+            self._print_list(profiles[:options['limit']])
+
+    def _print_list(self, profiles):
+        self.stdout.write(
+            f"{'Date':<19} {'Route':<35} {'Méthode':<7} {'Statut':>6} {'ms':>8} "
+            f"{'Éch.':>6} {'SQL':>5} {'SQL ms':>8}  Fichier"
+        )
+        for profile in profiles:
+            self.stdout.write(
+                f"{profile.get('timestamp', ''):<19} {(profile.get('route') or 'unresolved')[:35]:<35} "
+                f"{profile.get('method', ''):<7} {profile.get('status', ''):>6} "
+                f"{profile['duration_ms']:>8.0f} {profile['samples']:>6} {profile['query_count']:>5} "
+                f"{profile['query_ms']:>8.1f}  {os.path.basename(profile['path'])}"
+            )
+
+    def _print_summary(self, profiles, top):
+        stacks = Counter()
+        for profile in profiles:
+            if self._has_stacks(profile):
+                stacks.update(load_stacks(profile))
+        total = sum(stacks.values()) or 1
+        durations = sorted(p['duration_ms'] for p in profiles)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"📊 {len(profiles)} profil(s), {sum(stacks.values())} échantillons, "
+            f"durée médiane {durations[len(durations) // 2]:.0f} ms, max {durations[-1]:.0f} ms"
+        ))
+
+        own, cumulative = summarize_stacks(stacks, top)
+        for title, rows in (('Temps propre', own), ('Temps cumulé', cumulative)):
+            self.stdout.write(f"\n{title}:")
+            for frame, count in rows:
+                self.stdout.write(f"  {count / total * 100:5.1f}%  {count:>6}  {frame}")
+
+        queries = {}
+        for profile in profiles:
+            for entry in profile.get('queries', []):
+                key = fingerprint(entry['sql'])
+                count, duration = queries.get(key, (0, 0.0))
+                queries[key] = (count + 1, duration + entry['ms'])
+        if queries:
+            self.stdout.write("\nRequêtes SQL (temps cumulé):")
+            for sql, (count, duration) in sorted(queries.items(), key=lambda item: -item[1][1])[:top]:
+                self.stdout.write(f"  {duration:>9.1f} ms  {count:>5}x  {sql[:150]}")
+
+    def _has_stacks(self, profile):
+        return os.path.isfile(os.path.join(os.path.dirname(profile['path']), profile.get('collapsed', '')))
+
+    def _purge(self, profiles):
+        for profile in profiles:
+            base = profile['path'][:-len('.json')]
+            for path in (f"{base}.json", f"{base}.collapsed"):
+                if os.path.exists(path):
+                    os.unlink(path)
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(profiles)} profil(s) supprimé(s)"))
@@ -1,6 +1,7 @@
 """
 Middleware pour extraire JWT token depuis httpOnly cookie
 """
+from channels.db import database_sync_to_async
 from django.conf import settings
 
 
@@ -24,3 +25,37 @@ class JWTCookieMiddleware:
         
         response = self.get_response(request)
         return response
+
+
+class JWTCookieAuthMiddleware:
+    """
+    Équivalent WebSocket de JWTCookieMiddleware pour Channels
+    
+    Authentifie la connexion avec le JWT du cookie httpOnly (les navigateurs
+    ne permettent pas d'ajouter un header Authorization à un WebSocket).
+    À placer dans un AuthMiddlewareStack, qui fournit scope['cookies'].
+    """
+    
+    def __init__(self, inner):
+        self.inner = inner
+    
+    async def __call__(self, scope, receive, send):
+        access_token = scope.get('cookies', {}).get(settings.SIMPLE_JWT['AUTH_COOKIE'])
+        if access_token:
+            user = await get_user_from_token(access_token)
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await self.inner(scope, receive, send)
+
+
+@database_sync_to_async
+def get_user_from_token(raw_token):
+    """Retourne l'utilisateur d'un access token valide, sinon None"""
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+    
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
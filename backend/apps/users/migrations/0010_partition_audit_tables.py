@@ -0,0 +1,84 @@
+"""
+Partitionnement mensuel de audit_log et login_attempt (PostgreSQL).
+
+La table existante est renommée, recréée à l'identique en table partitionnée
+par plage sur ``timestamp``, puis ses lignes y sont recopiées. La clé primaire
+devient (id, timestamp) : PostgreSQL impose la clé de partition dans toute
+contrainte d'unicité ; la séquence d'identité garantit toujours l'unicité
+de l'id côté Django.
+
+Sans effet sur les autres bases.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations
+
+from apps.users.partitioning import (
+    add_months, create_default_partition, create_partition, month_start, PARTITION_KEY,
+)
+
+
+def partition_table(schema_editor, model):
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+    legacy = f"{table}_legacy"
+    months_ahead = getattr(settings, 'AUDIT_PARTITION_MONTHS_AHEAD', 3)
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {quote(table)} ("
+            f"LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+            f"INCLUDING CONSTRAINTS INCLUDING STORAGE"
+            f") PARTITION BY RANGE ({quote(PARTITION_KEY)})"
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, {quote(PARTITION_KEY)})"
+        )
+
+        # Une partition par mois, du plus ancien log jusqu'aux mois à venir
+        cursor.execute(f"SELECT MIN({quote(PARTITION_KEY)}) FROM {quote(legacy)}")
+        oldest = cursor.fetchone()[0]
+        current = month_start(datetime.now(dt_timezone.utc))
+        month = month_start(oldest) if oldest else current
+        while month <= add_months(current, months_ahead):
+            create_partition(cursor, table, month)
+            month = add_months(month, 1)
+        create_default_partition(cursor, table)
+
+        cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+            f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {quote(table)}",
+            [table]
+        )
+        cursor.execute(f"DROP TABLE {quote(legacy)}")
+
+    # Index et clés étrangères recréés sous les noms générés par Django
+    for field in model._meta.local_fields:
+        if field.remote_field and field.db_constraint:
+            schema_editor.execute(
+                schema_editor._create_fk_sql(model, field, "_fk_%(to_table)s_%(to_column)s")
+            )
+    for sql in schema_editor._model_indexes_sql(model):
+        schema_editor.execute(sql)
+
+
+def partition_audit_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name in ('AuditLog', 'LoginAttempt'):
+        partition_table(schema_editor, apps.get_model('users', model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0009_audit_timestamp_default"),
+    ]
+
+    operations = [
+        # Le schéma vu par Django est inchangé : pas de retour arrière nécessaire
+        migrations.RunPython(partition_audit_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.14 on 2026-10-18 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0010_partition_audit_tables"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SecurityHourlySummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField(help_text="Début de l'heure agrégée")),
+                ("ip_address", models.GenericIPAddressField(help_text="Adresse IP")),
+                (
+                    "username",
+                    models.CharField(
+                        blank=True, help_text="Email/username utilisé", max_length=255
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Nombre de tentatives"
+                    ),
+                ),
+                (
+                    "failed_count",
+                    models.PositiveIntegerField(default=0, help_text="Nombre d'échecs"),
+                ),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Synthèse horaire de sécurité",
+                "verbose_name_plural": "Synthèses horaires de sécurité",
+                "db_table": "security_hourly_summary",
+                "ordering": ["-hour"],
+                "indexes": [
+                    models.Index(
+                        fields=["ip_address", "-hour"],
+                        name="security_ho_ip_addr_99b7e8_idx",
+                    ),
+                    models.Index(
+                        fields=["username", "-hour"],
+                        name="security_ho_usernam_0ac0b3_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="securityhourlysummary",
+            constraint=models.UniqueConstraint(
+                fields=("hour", "ip_address", "username"),
+                name="security_summary_unique_key",
+            ),
+        ),
+    ]
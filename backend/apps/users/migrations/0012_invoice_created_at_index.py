@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0011_security_hourly_summary"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(
+                fields=["-created_at"], name="users_invoi_created_d824a1_idx"
+            ),
+        ),
+    ]
@@ -188,7 +188,7 @@ class Patient(models.Model):
 
 
 # Import des modèles d'audit
-from .models_audit import AuditLog, LoginAttempt
+from .models_audit import AuditLog, LoginAttempt, SecurityHourlySummary
 
 
 class Invoice(models.Model):
@@ -237,6 +237,9 @@ class Invoice(models.Model):
         verbose_name = "Facture"
         verbose_name_plural = "Factures"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+        ]
     
     def __str__(self):
         return f"Facture #{self.invoice_number} - {self.amount} XAF"
@@ -313,4 +316,4 @@ class Payment(models.Model):
         return f"Paiement #{self.id} - {self.amount} XAF"
 
 
-__all__ = ['User', 'EmailVerificationToken', 'PasswordResetToken', 'Patient', 'AuditLog', 'LoginAttempt', 'Invoice', 'Payment']
+__all__ = ['User', 'EmailVerificationToken', 'PasswordResetToken', 'Patient', 'AuditLog', 'LoginAttempt', 'SecurityHourlySummary', 'Invoice', 'Payment']
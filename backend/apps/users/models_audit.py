@@ -2,6 +2,7 @@
 Modèles pour l'audit trail (traçabilité des actions)
 """
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -152,8 +153,10 @@ class AuditLog(models.Model):
     )
     
     # Quand
+    # Horodaté à la création de l'instance, pas à l'écriture différée du lot
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         db_index=True,
         help_text="Date et heure de l'action"
     )
@@ -181,6 +184,9 @@ class AuditLog(models.Model):
         """
         Méthode helper pour créer un log d'audit
         
+        L'écriture est différée et groupée (cf. apps.users.audit_sink) :
+        l'instance retournée n'est pas encore en base.
+        
         Usage:
             AuditLog.log(
                 action='login',
@@ -214,7 +220,11 @@ class AuditLog(models.Model):
             log_data['request_path'] = request.path[:500]
             log_data['request_method'] = request.method
         
-        return cls.objects.create(**log_data)
+        from .audit_sink import get_audit_sink
+        
+        audit_log = cls(**log_data)
+        get_audit_sink().enqueue(audit_log)
+        return audit_log
     
     @staticmethod
     def _get_client_ip(request):
@@ -260,7 +270,8 @@ class LoginAttempt(models.Model):
     )
     
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         db_index=True
     )
     
@@ -279,3 +290,52 @@ class LoginAttempt(models.Model):
     def __str__(self):
         status = '✅' if self.success else '❌'
         return f"{status} {self.username} - {self.ip_address} - {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+class SecurityHourlySummary(models.Model):
+    """
+    Agrégat horaire des tentatives de connexion par (IP, identifiant)
+    Alimenté par la tâche rollup_security_summary (cf. apps.users.security_counters)
+    """
+    
+    hour = models.DateTimeField(
+        help_text="Début de l'heure agrégée"
+    )
+    ip_address = models.GenericIPAddressField(
+        help_text="Adresse IP"
+    )
+    username = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Email/username utilisé"
+    )
+    
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Nombre de tentatives"
+    )
+    failed_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Nombre d'échecs"
+    )
+    
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'security_hourly_summary'
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'ip_address', 'username'],
+                name='security_summary_unique_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['ip_address', '-hour']),
+            models.Index(fields=['username', '-hour']),
+        ]
+        verbose_name = 'Synthèse horaire de sécurité'
+        verbose_name_plural = 'Synthèses horaires de sécurité'
+    
+    def __str__(self):
+        return f"{self.hour.strftime('%Y-%m-%d %H:00')} - {self.ip_address} - {self.username} ({self.failed_count}/{self.attempts})"
@@ -0,0 +1,225 @@
+"""
+Partitionnement mensuel des tables d'audit (PostgreSQL uniquement).
+
+Les tables audit_log et login_attempt sont partitionnées par plage sur
+``timestamp`` (cf. migration 0010_partition_audit_tables) : une partition
+par mois, nommée ``<table>_AAAA_MM``, plus une partition ``<table>_default``
+qui reçoit les lignes hors plage si une partition manque.
+
+- create_audit_partitions() crée à l'avance les partitions des mois à venir
+  (commande create_audit_partitions, tâche mensuelle) ;
+- purge_audit_logs() détache puis supprime les partitions entièrement
+  antérieures à la date limite : la rétention devient une opération sur les
+  métadonnées au lieu d'un DELETE ligne à ligne.
+
+Sur les autres bases (SQLite en développement et en tests), les tables ne
+sont pas partitionnées et la purge retombe sur un DELETE classique.
+"""
+import logging
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ('audit_log', 'login_attempt')
+PARTITION_KEY = 'timestamp'
+
+
+def month_start(value):
+    """Premier jour du mois d'une date ou d'un datetime (UTC)."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(dt_timezone.utc)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month, count):
+    """Décale un premier jour de mois de ``count`` mois."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    """Nom de la partition mensuelle d'une table."""
+    return f"{table}_{month:%Y_%m}"
+
+
+def partition_bounds(month):
+    """Bornes [début, fin) d'une partition mensuelle, en UTC."""
+    end = add_months(month, 1)
+    return (
+        datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc),
+        datetime(end.year, end.month, 1, tzinfo=dt_timezone.utc),
+    )
+
+
+def is_partitioned(table):
+    """Indique si une table est partitionnée sur la base courante."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table):
+    """
+    Liste les partitions mensuelles d'une table.
+
+    Returns:
+        Liste triée de tuples (nom, premier jour du mois)
+    """
+    pattern = re.compile(rf'^{re.escape(table)}_(\d{{4}})_(\d{{2}})$')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)",
+            [table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(cursor, table, month):
+    """
+    Crée la partition mensuelle d'une table si elle n'existe pas.
+
+    Si la partition par défaut contient déjà des lignes du mois (tâche
+    mensuelle manquée), PostgreSQL refuse la création : la partition par
+    défaut est détachée, les lignes du mois y sont déplacées vers la
+    nouvelle partition, puis elle est rattachée. À appeler dans une
+    transaction.
+    """
+    quote = connection.ops.quote_name
+    name = partition_name(table, month)
+    default = table + '_default'
+    start, end = partition_bounds(month)
+
+    cursor.execute("SELECT to_regclass(%s), to_regclass(%s)", [name, default])
+    exists, has_default = cursor.fetchone()
+    if exists:
+        return
+
+    bounds = [start, end]
+    move_rows = False
+    if has_default:
+        cursor.execute(
+            f"SELECT 1 FROM {quote(default)} "
+            f"WHERE {quote(PARTITION_KEY)} >= %s AND {quote(PARTITION_KEY)} < %s LIMIT 1",
+            bounds
+        )
+        move_rows = cursor.fetchone() is not None
+
+    if move_rows:
+        cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(default)}")
+    cursor.execute(
+        f"CREATE TABLE {quote(name)} "
+        f"PARTITION OF {quote(table)} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    if move_rows:
+        cursor.execute(
+            f"INSERT INTO {quote(name)} SELECT * FROM {quote(default)} "
+            f"WHERE {quote(PARTITION_KEY)} >= %s AND {quote(PARTITION_KEY)} < %s",
+            bounds
+        )
+        moved = cursor.rowcount
+        cursor.execute(
+            f"DELETE FROM {quote(default)} "
+            f"WHERE {quote(PARTITION_KEY)} >= %s AND {quote(PARTITION_KEY)} < %s",
+            bounds
+        )
+        cursor.execute(f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(default)} DEFAULT")
+        logger.warning(f"{moved} lignes de {default} déplacées vers {name}")
+
+
+def create_default_partition(cursor, table):
+    """Crée la partition par défaut (lignes hors des partitions mensuelles)."""
+    quote = connection.ops.quote_name
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {quote(table + '_default')} "
+        f"PARTITION OF {quote(table)} DEFAULT"
+    )
+
+
+def create_audit_partitions(months_ahead=None, start=None):
+    """
+    Crée les partitions du mois de ``start`` (défaut: mois courant) et des
+    ``months_ahead`` mois suivants pour chaque table d'audit partitionnée.
+
+    Returns:
+        Liste des noms de partitions créées
+    """
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'AUDIT_PARTITION_MONTHS_AHEAD', 3)
+    first_month = month_start(start or datetime.now(dt_timezone.utc))
+
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(table):
+            continue
+        existing = {name for name, _ in list_partitions(table)}
+        with transaction.atomic(), connection.cursor() as cursor:
+            for offset in range(months_ahead + 1):
+                month = add_months(first_month, offset)
+                if partition_name(table, month) in existing:
+                    continue
+                create_partition(cursor, table, month)
+                created.append(partition_name(table, month))
+    return created
+
+
+def drop_partitions_before(table, cutoff):
+    """
+    Détache puis supprime les partitions dont toutes les lignes sont
+    antérieures à ``cutoff``.
+
+    Returns:
+        Liste des noms de partitions supprimées
+    """
+    quote = connection.ops.quote_name
+    dropped = []
+    for name, month in list_partitions(table):
+        if partition_bounds(month)[1] > cutoff:
+            break
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            cursor.execute(f"DROP TABLE {quote(name)}")
+        dropped.append(name)
+    if dropped:
+        logger.info(f"Partitions d'audit supprimées ({table}): {', '.join(dropped)}")
+    return dropped
+
+
+def purge_audit_logs(model, cutoff):
+    """
+    Supprime les lignes d'un modèle d'audit antérieures à ``cutoff``.
+
+    Sur une table partitionnée, les partitions complètes sont détachées et
+    supprimées ; seul le reliquat (mois de la date limite, partition par
+    défaut) passe par un DELETE, limité à ces partitions par l'élagage.
+
+    Returns:
+        Tuple (lignes supprimées par DELETE, partitions supprimées)
+    """
+    table = model._meta.db_table
+    dropped = drop_partitions_before(table, cutoff) if is_partitioned(table) else []
+    deleted = model.objects.filter(timestamp__lt=cutoff).delete()[0]
+    return deleted, dropped
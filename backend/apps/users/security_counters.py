@@ -0,0 +1,234 @@
+"""
+Compteurs de sécurité : connexions et throttling par IP / identifiant.
+
+Deux niveaux d'agrégation remplacent les parcours de LoginAttempt :
+
+- fenêtres glissantes dans le cache (Redis en production) : un compteur par
+  tranche de BUCKET_SECONDS, la fenêtre est la somme des tranches récentes
+  (un seul get_many). Utilisées pour les décisions en temps réel : détection
+  de force brute, DynamicRateThrottle.is_suspicious_behavior ;
+- table SecurityHourlySummary : tentatives et échecs par (heure, IP,
+  identifiant), recalculés chaque heure depuis LoginAttempt par la tâche
+  rollup_security_summary. Utilisée par le rapport d'audit ; les heures pas
+  encore agrégées sont calculées à la volée.
+"""
+import hashlib
+import math
+import re
+import time
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models_audit import LoginAttempt, SecurityHourlySummary
+
+COUNTERS_CACHE_PREFIX = 'security'
+BUCKET_SECONDS = 300  # 5 minutes par tranche
+MAX_WINDOW_SECONDS = 3600  # Fenêtre glissante la plus longue
+COUNTERS_TIMEOUT = MAX_WINDOW_SECONDS + BUCKET_SECONDS
+
+# Heures recalculées à chaque passage de la tâche (écritures d'audit différées) ;
+# les heures manquées depuis la dernière synthèse sont rattrapées en plus
+SUMMARY_LOOKBACK_HOURS = 3
+
+_SAFE_VALUE = re.compile(r'^[\w.@:+-]{1,100}$')
+
+
+def _key(event, dimension, value, bucket):
+    value = str(value)
+    if not _SAFE_VALUE.match(value):
+        value = hashlib.sha1(value.encode('utf-8')).hexdigest()
+    return f"{COUNTERS_CACHE_PREFIX}:{event}:{dimension}:{value}:{bucket}"
+
+
+def record_event(event, dimension, value, now=None):
+    """Incrémente le compteur glissant d'un événement (ex: 'login_failed', 'ip', '1.2.3.4')."""
+    if not value:
+        return
+    key = _key(event, dimension, value, int((now or time.time()) // BUCKET_SECONDS))
+    cache.add(key, 0, COUNTERS_TIMEOUT)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Tranche expirée entre add et incr
+        pass
+
+
+def get_window_count(event, dimension, value, window=MAX_WINDOW_SECONDS, now=None):
+    """Nombre d'événements sur les ``window`` dernières secondes (max 1 heure)."""
+    if not value:
+        return 0
+    current = int((now or time.time()) // BUCKET_SECONDS)
+    buckets = math.ceil(min(window, MAX_WINDOW_SECONDS) / BUCKET_SECONDS)
+    keys = [_key(event, dimension, value, bucket) for bucket in range(current - buckets + 1, current + 1)]
+    return sum(cache.get_many(keys).values())
+
+
+def record_login_attempt(ip_address, username, success):
+    """Comptabilise une tentative de connexion par IP et par identifiant."""
+    event = 'login_success' if success else 'login_failed'
+    record_event(event, 'ip', ip_address)
+    record_event(event, 'username', (username or '').strip().lower())
+
+
+def get_failed_logins(ip_address=None, username=None, window=None):
+    """Échecs de connexion récents d'une IP ou d'un identifiant."""
+    if window is None:
+        window = getattr(settings, 'SECURITY_BRUTE_FORCE_WINDOW', 900)
+    if ip_address:
+        return get_window_count('login_failed', 'ip', ip_address, window)
+    return get_window_count('login_failed', 'username', (username or '').strip().lower(), window)
+
+
+def is_brute_force(ip_address=None, username=None):
+    """Indique si une IP ou un identifiant dépasse le seuil d'échecs de connexion."""
+    if ip_address and get_failed_logins(ip_address=ip_address) >= getattr(
+        settings, 'SECURITY_BRUTE_FORCE_IP_THRESHOLD', 20
+    ):
+        return True
+    if username and get_failed_logins(username=username) >= getattr(
+        settings, 'SECURITY_BRUTE_FORCE_USERNAME_THRESHOLD', 10
+    ):
+        return True
+    return False
+
+
+def floor_hour(value):
+    """Début de l'heure (UTC) contenant ``value``."""
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def compute_hourly_summary(start, end):
+    """
+    Calcule les synthèses horaires de [start, end), sans les enregistrer.
+
+    Une requête : LoginAttempt regroupées par (heure, IP, identifiant).
+
+    Returns:
+        Liste de SecurityHourlySummary non sauvegardés
+    """
+    rows = LoginAttempt.objects.filter(
+        timestamp__gte=start, timestamp__lt=end
+    ).annotate(
+        hour=TruncHour('timestamp', tzinfo=dt_timezone.utc)
+    ).order_by().values('hour', 'ip_address', 'username').annotate(
+        total=Count('id'),
+        failed=Count('id', filter=Q(success=False))
+    )
+    return [
+        SecurityHourlySummary(
+            hour=row['hour'],
+            ip_address=row['ip_address'],
+            username=row['username'],
+            attempts=row['total'],
+            failed_count=row['failed'],
+        )
+        for row in rows
+    ]
+
+
+def rollup_security_summary(start=None, end=None):
+    """
+    Recalcule et enregistre les synthèses horaires (upsert).
+
+    Par défaut : les SUMMARY_LOOKBACK_HOURS dernières heures révolues, plus
+    les heures manquées depuis la dernière synthèse enregistrée (tâche
+    interrompue) ou depuis la plus ancienne tentative au premier passage.
+    get_login_summary suppose toutes les heures antérieures à la dernière
+    synthèse couvertes.
+
+    Returns:
+        Nombre de lignes enregistrées
+    """
+    if end is None:
+        end = floor_hour(timezone.now())
+    if start is None:
+        start = end - timedelta(hours=SUMMARY_LOOKBACK_HOURS)
+        last = SecurityHourlySummary.objects.aggregate(last=Max('hour'))['last']
+        if last is not None:
+            start = min(start, last + timedelta(hours=1))
+        else:
+            oldest = LoginAttempt.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+            if oldest is not None:
+                start = min(start, floor_hour(oldest))
+
+    entries = compute_hourly_summary(start, end)
+    with transaction.atomic():
+        SecurityHourlySummary.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['hour', 'ip_address', 'username'],
+            update_fields=['attempts', 'failed_count', 'computed_at'],
+        )
+    return len(entries)
+
+
+def _group_attempts(queryset, attempts, failed):
+    return queryset.order_by().values('ip_address', 'username').annotate(
+        attempts_total=attempts, failed_total=failed
+    )
+
+
+def get_login_summary(start, end=None, top=10):
+    """
+    Synthèse des tentatives de connexion de [start, end).
+
+    Les heures complètes déjà agrégées sont lues dans SecurityHourlySummary ;
+    le début d'heure partiel et les heures suivant la dernière synthèse
+    (heure en cours, retard de la tâche) sont calculés sur LoginAttempt.
+
+    Returns:
+        Dictionnaire {'total', 'successful', 'failed',
+        'top_failed_ips', 'top_failed_usernames'} ; les classements sont
+        des listes de tuples (valeur, échecs)
+    """
+    if end is None:
+        end = timezone.now()
+    first_hour = floor_hour(start)
+    if first_hour < start:
+        first_hour += timedelta(hours=1)
+    first_hour = min(first_hour, end)
+    last_stored = SecurityHourlySummary.objects.filter(
+        hour__gte=first_hour, hour__lt=floor_hour(end)
+    ).aggregate(last=Max('hour'))['last']
+    live_from = last_stored + timedelta(hours=1) if last_stored else first_hour
+
+    groups = [
+        _group_attempts(
+            SecurityHourlySummary.objects.filter(hour__gte=first_hour, hour__lt=live_from),
+            Sum('attempts'), Sum('failed_count')
+        ),
+        _group_attempts(
+            LoginAttempt.objects.filter(
+                Q(timestamp__gte=start, timestamp__lt=first_hour)
+                | Q(timestamp__gte=live_from, timestamp__lt=end)
+            ),
+            Count('id'), Count('id', filter=Q(success=False))
+        ),
+    ]
+
+    total = failed = 0
+    failed_by_ip = Counter()
+    failed_by_username = Counter()
+    for rows in groups:
+        for row in rows:
+            total += row['attempts_total']
+            failed += row['failed_total']
+            if row['failed_total']:
+                failed_by_ip[row['ip_address']] += row['failed_total']
+                if row['username']:
+                    failed_by_username[row['username']] += row['failed_total']
+
+    return {
+        'total': total,
+        'successful': total - failed,
+        'failed': failed,
+        'top_failed_ips': failed_by_ip.most_common(top),
+        'top_failed_usernames': failed_by_username.most_common(top),
+    }
@@ -5,7 +5,7 @@ from django.db import models
 from .validators import calculate_password_strength
 from .captcha import HCaptchaMixin
 from .sanitizers import sanitize_text_input
-from .models import Patient, Invoice, Payment
+from .models import Patient, Invoice, Payment, AuditLog
 from drf_spectacular.utils import extend_schema_field, extend_schema_serializer, OpenApiExample
 
 User = get_user_model()
@@ -292,3 +292,19 @@ class PaymentCreateSerializer(serializers.ModelSerializer):
             })
         
         return attrs
+
+
+class AuditLogSerializer(serializers.ModelSerializer):
+    """Serializer en lecture seule des logs d'audit (administrateurs)."""
+    action_display = serializers.CharField(source='get_action_display', read_only=True)
+    level_display = serializers.CharField(source='get_level_display', read_only=True)
+    
+    class Meta:
+        model = AuditLog
+        fields = [
+            'id', 'timestamp', 'user', 'username',
+            'action', 'action_display', 'level', 'level_display',
+            'description', 'changes', 'ip_address', 'user_agent',
+            'request_path', 'request_method', 'extra_data'
+        ]
+        read_only_fields = fields
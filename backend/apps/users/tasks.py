@@ -219,20 +219,76 @@ def cleanup_old_audit_logs():
     """
     Nettoie les logs d'audit de plus de 90 jours
     Exécuté mensuellement
+    
+    Sur PostgreSQL, les partitions mensuelles expirées sont détachées puis
+    supprimées (cf. apps.users.partitioning) au lieu d'un DELETE ligne à ligne.
     """
     from .models_audit import AuditLog, LoginAttempt
+    from .partitioning import purge_audit_logs
     
     cutoff_date = timezone.now() - timedelta(days=90)
     
     # Supprimer les logs d'audit
-    audit_deleted = AuditLog.objects.filter(timestamp__lt=cutoff_date).delete()[0]
+    audit_deleted, audit_dropped = purge_audit_logs(AuditLog, cutoff_date)
     
     # Supprimer les tentatives de connexion
-    login_deleted = LoginAttempt.objects.filter(timestamp__lt=cutoff_date).delete()[0]
+    login_deleted, login_dropped = purge_audit_logs(LoginAttempt, cutoff_date)
     
-    logger.info(f"Logs d'audit nettoyés: {audit_deleted} audit logs, {login_deleted} login attempts")
+    logger.info(
+        f"Logs d'audit nettoyés: {audit_deleted} audit logs, {login_deleted} login attempts, "
+        f"{len(audit_dropped) + len(login_dropped)} partitions supprimées"
+    )
     
     return {
         'audit_logs_deleted': audit_deleted,
-        'login_attempts_deleted': login_deleted
+        'login_attempts_deleted': login_deleted,
+        'partitions_dropped': audit_dropped + login_dropped
     }
+
+
+@shared_task
+def create_audit_partitions():
+    """
+    Crée à l'avance les partitions mensuelles des tables d'audit
+    Exécuté mensuellement (sans effet hors PostgreSQL)
+    """
+    from .partitioning import create_audit_partitions as create_partitions
+    
+    created = create_partitions()
+    if created:
+        logger.info(f"Partitions d'audit créées: {', '.join(created)}")
+    
+    return {'partitions_created': created}
+
+
+@shared_task
+def rollup_security_summary():
+    """
+    Agrège les tentatives de connexion des dernières heures révolues
+    dans SecurityHourlySummary
+    Exécuté toutes les heures
+    """
+    from .security_counters import rollup_security_summary as rollup
+    
+    rows = rollup()
+    logger.info(f"Synthèse de sécurité horaire: {rows} lignes")
+    
+    return {'rows': rows}
+
+
+@shared_task
+def write_metrics_textfile():
+    """
+    Écrit les métriques Prometheus dans METRICS_TEXTFILE (textfile collector
+    de node-exporter)
+    Exécuté toutes les minutes (sans effet si METRICS_TEXTFILE est vide)
+    """
+    from django.conf import settings
+    from config.metrics import write_textfile
+    
+    path = getattr(settings, 'METRICS_TEXTFILE', '')
+    if not path:
+        return {'written': False}
+    
+    write_textfile(path)
+    return {'written': True, 'path': path}
@@ -20,6 +20,7 @@ from .views_medical import (
     MedicalRecordVersionViewSet
 )
 from .views_billing import InvoiceViewSet, PaymentViewSet
+from .views_audit import AuditExportView, AuditLogListView
 
 # Router pour les ViewSets
 router = DefaultRouter()
@@ -56,6 +57,10 @@ urlpatterns = [
     # Email
     path('verify-email/', VerifyEmailView.as_view(), name='verify_email'),
     
+    # Audit (administrateurs)
+    path('audit/logs/', AuditLogListView.as_view(), name='audit_logs'),
+    path('audit/export/', AuditExportView.as_view(), name='audit_export'),
+    
     # Patients et Medical (ViewSets)
     path('', include(router.urls)),
 ]
@@ -0,0 +1,142 @@
+"""
+Vues API pour les logs d'audit (administrateurs)
+"""
+from datetime import timedelta
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.pagination import AuditLogPagination
+
+from .audit_export import iter_csv_chunks
+from .models_audit import AuditLog
+from .permissions import IsAdmin
+from .serializers import AuditLogSerializer
+
+MAX_EXPORT_DAYS = 366
+
+
+def filter_audit_logs(request, logs):
+    """
+    Applique les filtres user / action / level de la requête
+
+    Returns:
+        Tuple (queryset, réponse d'erreur ou None)
+    """
+    user_email = request.query_params.get('user')
+    if user_email:
+        logs = logs.filter(user__email=user_email)
+
+    action = request.query_params.get('action')
+    if action:
+        logs = logs.filter(action=action)
+
+    level = request.query_params.get('level')
+    if level:
+        if level not in dict(AuditLog.LEVEL_CHOICES):
+            return logs, Response({'error': f'Niveau invalide: {level}'}, status=status.HTTP_400_BAD_REQUEST)
+        logs = logs.filter(level=level)
+
+    return logs, None
+
+
+@extend_schema(
+    summary="Liste des logs d'audit",
+    description="""
+    Logs d'audit du plus récent au plus ancien, paginés par curseur : le coût
+    d'une page ne dépend pas de sa profondeur. `count=estimated` ajoute un
+    total estimé.
+    """,
+    tags=["Audit"],
+    parameters=[
+        OpenApiParameter('user', str, description="Filtrer par email utilisateur"),
+        OpenApiParameter('action', str, description="Filtrer par type d'action"),
+        OpenApiParameter('level', str, description="Filtrer par niveau"),
+        OpenApiParameter('count', str, description="'estimated' pour inclure un total estimé"),
+    ],
+)
+class AuditLogListView(ListAPIView):
+    """
+    Liste paginée des logs d'audit
+    
+    GET /api/v1/auth/audit/logs/?level=critical&cursor=...
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+    serializer_class = AuditLogSerializer
+    pagination_class = AuditLogPagination
+    query_budget = 5
+
+    queryset = AuditLog.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        logs, error = filter_audit_logs(request, self.get_queryset())
+        if error:
+            return error
+
+        page = self.paginate_queryset(logs)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+@extend_schema(
+    summary="Export CSV des logs d'audit",
+    description="""
+    Exporte les logs d'audit en CSV, diffusé en flux continu (mémoire
+    constante quel que soit le volume). `gzip=1` renvoie un fichier .csv.gz.
+    """,
+    tags=["Audit"],
+    parameters=[
+        OpenApiParameter('days', int, description="Nombre de jours exportés (défaut: 7, max: 366)"),
+        OpenApiParameter('user', str, description="Filtrer par email utilisateur"),
+        OpenApiParameter('action', str, description="Filtrer par type d'action"),
+        OpenApiParameter('level', str, description="Filtrer par niveau"),
+        OpenApiParameter('gzip', bool, description="Compresser l'export en gzip"),
+    ],
+    responses={
+        200: OpenApiResponse(description="Fichier CSV"),
+        400: OpenApiResponse(description="Paramètres invalides"),
+        403: OpenApiResponse(description="Réservé aux administrateurs"),
+    }
+)
+class AuditExportView(APIView):
+    """
+    Export CSV en streaming des logs d'audit
+    
+    GET /api/v1/auth/audit/export/?days=30&level=warning&gzip=1
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response({'error': 'days doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= MAX_EXPORT_DAYS:
+            return Response(
+                {'error': f'days doit être compris entre 1 et {MAX_EXPORT_DAYS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        logs, error = filter_audit_logs(request, AuditLog.objects.filter(
+            timestamp__gte=timezone.now() - timedelta(days=days)
+        ))
+        if error:
+            return error
+
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        filename = f"audit_{timezone.localdate():%Y%m%d}_{days}j.csv"
+        if compress:
+            filename += '.gz'
+
+        response = StreamingHttpResponse(
+            iter_csv_chunks(logs, compress=compress),
+            content_type='application/gzip' if compress else 'text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
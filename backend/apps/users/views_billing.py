@@ -9,6 +9,8 @@ from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.db import models
 
+from config.pagination import InvoicePagination
+
 from .models import Invoice, Payment
 from .serializers import (
     InvoiceSerializer,
@@ -34,6 +36,8 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     
     serializer_class = InvoiceSerializer
     permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+    pagination_class = InvoicePagination
+    query_budget = {'list': 6, 'retrieve': 7}
     
     def get_serializer_class(self):
         if self.action == 'create':
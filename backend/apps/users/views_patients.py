@@ -14,6 +14,7 @@ from .models import User
 from .serializers import UserSerializer
 from .permissions import IsStaffOrAdmin
 from apps.appointments.models import Appointment
+from apps.appointments.rollups import get_period_totals
 
 
 class PatientViewSet(viewsets.ModelViewSet):
@@ -35,6 +36,7 @@ class PatientViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, IsStaffOrAdmin]
     http_method_names = ['get', 'patch', 'head', 'options']  # Autoriser GET et PATCH uniquement
+    query_budget = {'list': 6, 'retrieve': 5, 'appointments': 6}
     
     def get_queryset(self):
         """
@@ -97,11 +99,12 @@ class PatientViewSet(viewsets.ModelViewSet):
         # Sérialiser les RDV
         from apps.appointments.serializers import AppointmentSerializer
         serializer = AppointmentSerializer(appointments, many=True)
+        data = serializer.data
         
         return Response({
             'patient': UserSerializer(patient).data,
-            'appointments': serializer.data,
-            'total': appointments.count()
+            'appointments': data,
+            'total': len(data)
         })
     
     @action(detail=False, methods=['get'])
@@ -110,24 +113,22 @@ class PatientViewSet(viewsets.ModelViewSet):
         Statistiques globales sur les patients
         """
         now = timezone.now()
+        today = timezone.localdate()
         
-        # Total patients
-        total_patients = User.objects.filter(role=User.Role.PATIENT).count()
-        
-        # Nouveaux patients ce mois
-        first_day_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        new_patients_this_month = User.objects.filter(
-            role=User.Role.PATIENT,
-            created_at__gte=first_day_of_month
-        ).count()
+        # Total patients et nouveaux patients ce mois (un seul agrégat)
+        first_day_of_month = today.replace(day=1)
+        counts = User.objects.filter(role=User.Role.PATIENT).aggregate(
+            total=Count('id'),
+            new_this_month=Count('id', filter=Q(created_at__date__gte=first_day_of_month))
+        )
+        total_patients = counts['total']
+        new_patients_this_month = counts['new_this_month']
         
-        # Nouveaux patients le mois dernier (pour trend)
-        first_day_last_month = (first_day_of_month - timedelta(days=1)).replace(day=1)
-        new_patients_last_month = User.objects.filter(
-            role=User.Role.PATIENT,
-            created_at__gte=first_day_last_month,
-            created_at__lt=first_day_of_month
-        ).count()
+        # Nouveaux patients le mois dernier (pour trend), lus dans les agrégats journaliers
+        last_month_end = first_day_of_month - timedelta(days=1)
+        new_patients_last_month = get_period_totals(
+            last_month_end.replace(day=1), last_month_end
+        )['new_patients']
         
         # Patients actifs (avec RDV dans les 6 derniers mois)
         six_months_ago = now - timedelta(days=180)
@@ -145,10 +146,7 @@ class PatientViewSet(viewsets.ModelViewSet):
         
         # Trends (comparaison avec le mois dernier)
         # Total patients le mois dernier
-        total_patients_last_month = User.objects.filter(
-            role=User.Role.PATIENT,
-            created_at__lt=first_day_of_month
-        ).count()
+        total_patients_last_month = total_patients - new_patients_this_month
         
         # Calcul des trends en pourcentage
         total_trend = round(
@@ -27,6 +27,7 @@ from .serializers import (
 )
 from .validators import calculate_password_strength
 from .captcha import verify_hcaptcha
+from config.rate_limit import GCRAThrottleMixin
 
 User = get_user_model()
 
@@ -34,7 +35,7 @@ User = get_user_model()
 security_logger = logging.getLogger('apps.users')
 
 
-class LoginRateThrottle(AnonRateThrottle):
+class LoginRateThrottle(GCRAThrottleMixin, AnonRateThrottle):
     """Rate limiting spécifique pour login : 5 tentatives / 15 min"""
     scope = 'login'  # Utilise le scope défini dans settings
 
@@ -1,10 +1,13 @@
 """
 Rate limiting avancé (FIX #29)
 Combine IP + utilisateur, whitelist/blacklist, alertes
+Comptage GCRA à état constant (cf. config.rate_limit)
 """
-from rest_framework.throttling import SimpleRateThrottle, AnonRateThrottle, UserRateThrottle
 from django.core.cache import cache
 from django.conf import settings
+from config.ip_matcher import get_ip_list, temporary_blacklist
+from config.rate_limit import GCRARateThrottle, get_rate_limit_backend
+from apps.users.security_counters import get_failed_logins, get_window_count, record_event
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,11 +31,10 @@ class WhitelistMixin:
     
     def is_whitelisted(self, request):
         """Vérifie si l'IP ou l'utilisateur est en whitelist"""
-        # Whitelist d'IPs
-        whitelisted_ips = getattr(settings, 'THROTTLE_WHITELIST_IPS', [])
+        # Whitelist d'IPs (IPs et réseaux CIDR, compilée une fois)
         client_ip = self.get_client_ip(request)
         
-        if client_ip in whitelisted_ips:
+        if client_ip in get_ip_list('THROTTLE_WHITELIST_IPS'):
             return True
         
         # Whitelist d'utilisateurs
@@ -49,11 +51,10 @@ class BlacklistMixin:
     
     def is_blacklisted(self, request):
         """Vérifie si l'IP ou l'utilisateur est en blacklist"""
-        # Blacklist d'IPs
-        blacklisted_ips = getattr(settings, 'THROTTLE_BLACKLIST_IPS', [])
+        # Blacklist d'IPs : settings (IPs et réseaux CIDR) + blacklist temporaire
         client_ip = self.get_client_ip(request)
         
-        if client_ip in blacklisted_ips:
+        if client_ip in get_ip_list('THROTTLE_BLACKLIST_IPS') or temporary_blacklist.contains_ip(client_ip):
             logger.warning(
                 f"Blacklisted IP attempted access: {client_ip}",
                 extra={'ip': client_ip, 'path': request.path}
@@ -63,7 +64,7 @@ class BlacklistMixin:
         # Blacklist d'utilisateurs
         if request.user and request.user.is_authenticated:
             blacklisted_users = getattr(settings, 'THROTTLE_BLACKLIST_USERS', [])
-            if request.user.email in blacklisted_users:
+            if request.user.email in blacklisted_users or temporary_blacklist.contains_identifier(request.user.email):
                 logger.warning(
                     f"Blacklisted user attempted access: {request.user.email}",
                     extra={'user': request.user.email, 'path': request.path}
@@ -78,6 +79,9 @@ class AlertMixin:
     
     def send_alert(self, request, identifier):
         """Envoie une alerte si le rate limit est dépassé"""
+        # Compteur glissant des refus (lu par DynamicRateThrottle)
+        record_event('throttled', 'ident', get_throttle_ident(request))
+        
         # Vérifier si une alerte a déjà été envoyée récemment
         alert_key = f'throttle_alert:{identifier}'
         if cache.get(alert_key):
@@ -102,7 +106,7 @@ class AlertMixin:
         # self.send_notification(identifier, request)
 
 
-class CombinedRateThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, AlertMixin, SimpleRateThrottle):
+class CombinedRateThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, AlertMixin, GCRARateThrottle):
     """
     Rate limiting combiné : IP + Utilisateur
     
@@ -134,7 +138,7 @@ class CombinedRateThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, Alert
         """Appelé quand le rate limit est dépassé"""
         # Envoyer une alerte
         if hasattr(self, '_request'):
-            identifier = self.get_ident()
+            identifier = self.get_ident(self._request)
             self.send_alert(self._request, identifier)
         
         return super().throttle_failure()
@@ -145,7 +149,7 @@ class CombinedRateThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, Alert
         return super().allow_request(request, view)
 
 
-class StrictIPThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, AlertMixin, SimpleRateThrottle):
+class StrictIPThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, AlertMixin, GCRARateThrottle):
     """
     Rate limiting strict par IP uniquement
     
@@ -172,7 +176,7 @@ class StrictIPThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, AlertMixi
     
     def throttle_failure(self):
         if hasattr(self, '_request'):
-            identifier = self.get_ident()
+            identifier = self.get_ident(self._request)
             self.send_alert(self._request, identifier)
         return super().throttle_failure()
     
@@ -181,7 +185,7 @@ class StrictIPThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, AlertMixi
         return super().allow_request(request, view)
 
 
-class PerEndpointThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, SimpleRateThrottle):
+class PerEndpointThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, GCRARateThrottle):
     """
     Rate limiting par endpoint
     
@@ -215,7 +219,7 @@ class PerEndpointThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, Simple
         return self.rate
 
 
-class DynamicRateThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, SimpleRateThrottle):
+class DynamicRateThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, GCRARateThrottle):
     """
     Rate limiting dynamique basé sur le comportement
     
@@ -245,30 +249,30 @@ class DynamicRateThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, Simple
     
     def get_rate(self):
         """Ajuste le rate selon le comportement"""
-        if not hasattr(self, '_request'):
-            return self.rate
-        
-        request = self._request
+        rate = super().get_rate()
+        request = getattr(self, '_request', None)
+        if request is None or rate is None:
+            return rate
         
         # Vérifier si comportement suspect
         if self.is_suspicious_behavior(request):
-            # Réduire la limite de moitié
-            rate, period = self.rate.split('/')
-            reduced_rate = int(int(rate) / 2)
+            # Réduire la limite de moitié (toujours depuis le rate configuré)
+            num, period = rate.split('/')
+            reduced_rate = max(int(num) // 2, 1)
             return f'{reduced_rate}/{period}'
         
-        return self.rate
+        return rate
     
     def is_suspicious_behavior(self, request):
-        """Détecte un comportement suspect"""
-        # Vérifier le nombre d'erreurs récentes
-        if request.user and request.user.is_authenticated:
-            ident = f'user_{request.user.pk}'
-        else:
-            ident = self.get_client_ip(request)
+        """
+        Détecte un comportement suspect
         
-        error_key = f'throttle_errors:{ident}'
-        error_count = cache.get(error_key, 0)
+        Lit les compteurs glissants (apps.users.security_counters) : refus de
+        throttling de l'identifiant et échecs de connexion de l'IP sur la
+        dernière heure, sans parcourir LoginAttempt.
+        """
+        error_count = get_window_count('throttled', 'ident', get_throttle_ident(request))
+        error_count += get_failed_logins(ip_address=self.get_client_ip(request), window=3600)
         
         # Si plus de 10 erreurs dans la dernière heure
         if error_count > 10:
@@ -277,11 +281,14 @@ class DynamicRateThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, Simple
         return False
     
     def allow_request(self, request, view):
+        # __init__ évalue le rate sans requête : le réévaluer pour celle-ci
         self._request = request
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
         return super().allow_request(request, view)
 
 
-class BurstProtectionThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, SimpleRateThrottle):
+class BurstProtectionThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, GCRARateThrottle):
     """
     Protection contre les bursts (pics de requêtes)
     
@@ -312,69 +319,59 @@ class BurstProtectionThrottle(IPAddressMixin, WhitelistMixin, BlacklistMixin, Si
 
 # Fonctions utilitaires
 
+def get_throttle_ident(request):
+    """Identifiant de throttling : user_<id> si authentifié, sinon l'IP"""
+    if request.user and request.user.is_authenticated:
+        return f'user_{request.user.pk}'
+    return IPAddressMixin().get_client_ip(request)
+
+
 def add_to_blacklist(identifier, duration=3600):
     """
-    Ajoute une IP ou un email à la blacklist temporaire
+    Ajoute une IP, un réseau CIDR ou un email à la blacklist temporaire
     
     Args:
-        identifier: IP ou email
+        identifier: IP, réseau CIDR ou email
         duration: Durée en secondes (défaut: 1 heure)
     """
-    key = f'blacklist_temp:{identifier}'
-    cache.set(key, True, duration)
+    temporary_blacklist.add(identifier, duration)
     logger.warning(f"Added to temporary blacklist: {identifier} for {duration}s")
 
 
 def remove_from_blacklist(identifier):
-    """Retire une IP ou un email de la blacklist temporaire"""
-    key = f'blacklist_temp:{identifier}'
-    cache.delete(key)
+    """Retire une IP, un réseau CIDR ou un email de la blacklist temporaire"""
+    temporary_blacklist.remove(identifier)
     logger.info(f"Removed from temporary blacklist: {identifier}")
 
 
 def is_temporarily_blacklisted(identifier):
-    """Vérifie si un identifier est temporairement blacklisté"""
-    key = f'blacklist_temp:{identifier}'
-    return cache.get(key, False)
+    """Vérifie si un identifier (IP ou email) est temporairement blacklisté"""
+    return temporary_blacklist.contains_ip(identifier) or temporary_blacklist.contains_identifier(identifier)
 
 
 def get_throttle_status(identifier):
     """
-    Récupère le statut de throttling pour un identifier
+    Récupère le statut de throttling (CombinedRateThrottle) pour un identifier
+    
+    Lecture seule de l'état GCRA : aucune requête n'est consommée.
     
     Returns:
         dict: {
-            'requests': int,  # Nombre de requêtes
+            'requests': int,  # Requêtes comptées dans la fenêtre
             'limit': int,     # Limite
             'remaining': int, # Requêtes restantes
-            'reset_time': int # Timestamp de reset
+            'reset_time': int # Timestamp auquel le quota est complet
         }
     """
-    # Chercher dans le cache
-    cache_key = f'throttle_combined:{identifier}'
-    history = cache.get(cache_key, [])
-    
-    if not history:
-        return {
-            'requests': 0,
-            'limit': 0,
-            'remaining': 0,
-            'reset_time': 0
-        }
-    
-    # Calculer les stats
-    import time
-    now = time.time()
-    
-    # Filtrer les requêtes dans la fenêtre
-    window = 3600  # 1 heure
-    recent = [t for t in history if now - t < window]
+    throttle = CombinedRateThrottle()
+    cache_key = throttle.cache_format % {'scope': throttle.scope, 'ident': identifier}
+    status = get_rate_limit_backend().get_status(cache_key, throttle.num_requests, throttle.duration)
     
     return {
-        'requests': len(recent),
-        'limit': 100,  # À récupérer depuis settings
-        'remaining': max(0, 100 - len(recent)),
-        'reset_time': int(min(recent) + window) if recent else 0
+        'requests': throttle.num_requests - status['remaining'],
+        'limit': throttle.num_requests,
+        'remaining': status['remaining'],
+        'reset_time': status['reset_time']
     }
 
 
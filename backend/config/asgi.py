@@ -7,6 +7,7 @@ import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
+from channels.security.websocket import OriginValidator
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
@@ -14,12 +15,19 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 # is populated before importing code that may import ORM models.
 django_asgi_app = get_asgi_application()
 
+from django.conf import settings  # noqa: E402
+from apps.notifications.routing import websocket_urlpatterns  # noqa: E402
+from apps.users.middleware import JWTCookieAuthMiddleware  # noqa: E402
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    # WebSocket routes will be added here
-    # "websocket": AuthMiddlewareStack(
-    #     URLRouter(
-    #         # websocket_urlpatterns
-    #     )
-    # ),
+    # WebSocket authentifié par le cookie JWT, mêmes origines que CORS
+    "websocket": OriginValidator(
+        AuthMiddlewareStack(
+            JWTCookieAuthMiddleware(
+                URLRouter(websocket_urlpatterns)
+            )
+        ),
+        getattr(settings, "CORS_ALLOWED_ORIGINS", []),
+    ),
 })
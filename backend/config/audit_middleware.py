@@ -1,17 +1,38 @@
 """
 Middleware pour l'audit trail automatique
 """
-import json
 import logging
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.deprecation import MiddlewareMixin
+from apps.users.audit_sink import get_audit_sink
 from apps.users.models_audit import AuditLog, LoginAttempt
+from apps.users.security_counters import is_brute_force, record_login_attempt
+from config.json_validators import get_request_json
 
 logger = logging.getLogger(__name__)
 
 
+def get_login_email(request):
+    """
+    Email soumis à la connexion, lu dans le JSON déjà décodé par le
+    parser DRF (le flux du corps est alors consommé : request.body n'est
+    plus lisible)
+    """
+    try:
+        data = get_request_json(request)
+    except Exception:
+        return ''
+    if isinstance(data, dict):
+        return data.get('email', '') or ''
+    return ''
+
+
 class AuditMiddleware(MiddlewareMixin):
     """
     Middleware pour logger automatiquement certaines actions
+    
+    Les logs sont mis en file (audit_sink) : pas d'INSERT sur le thread de la requête.
     """
     
     # Actions à logger automatiquement
@@ -114,23 +135,17 @@ class AuditMiddleware(MiddlewareMixin):
         """Logger une tentative de connexion"""
         try:
             # Récupérer l'email depuis le body
-            username = ''
-            if hasattr(request, 'data'):
-                username = request.data.get('email', '')
-            elif request.body:
-                try:
-                    data = json.loads(request.body)
-                    username = data.get('email', '')
-                except:
-                    pass
+            username = get_login_email(request)
             
-            LoginAttempt.objects.create(
+            ip_address = self._get_client_ip(request)
+            get_audit_sink().enqueue(LoginAttempt(
                 username=username,
-                ip_address=self._get_client_ip(request),
+                ip_address=ip_address,
                 user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
                 success=success,
                 failure_reason=failure_reason
-            )
+            ))
+            record_login_attempt(ip_address, username, success)
         except Exception as e:
             logger.error(f"Erreur lors du logging de tentative de connexion: {e}")
     
@@ -174,15 +189,7 @@ class FailedLoginMiddleware(MiddlewareMixin):
         """Logger un échec de connexion"""
         
         # Récupérer l'email
-        username = ''
-        if hasattr(request, 'data'):
-            username = request.data.get('email', '')
-        elif request.body:
-            try:
-                data = json.loads(request.body)
-                username = data.get('email', '')
-            except:
-                pass
+        username = get_login_email(request)
         
         # Déterminer la raison
         failure_reason = 'Identifiants invalides'
@@ -192,13 +199,15 @@ class FailedLoginMiddleware(MiddlewareMixin):
             failure_reason = 'Trop de tentatives (rate limiting)'
         
         # Créer le log de tentative
-        LoginAttempt.objects.create(
+        ip_address = self._get_client_ip(request)
+        get_audit_sink().enqueue(LoginAttempt(
             username=username,
-            ip_address=self._get_client_ip(request),
+            ip_address=ip_address,
             user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
             success=False,
             failure_reason=failure_reason
-        )
+        ))
+        record_login_attempt(ip_address, username, success=False)
         
         # Créer le log d'audit
         AuditLog.log(
@@ -209,6 +218,28 @@ class FailedLoginMiddleware(MiddlewareMixin):
             username=username,
             failure_reason=failure_reason
         )
+        
+        # Force brute : compteurs glissants, une alerte par fenêtre
+        if is_brute_force(ip_address=ip_address, username=username):
+            self._log_brute_force(request, ip_address, username)
+    
+    def _log_brute_force(self, request, ip_address, username):
+        """Logger une suspicion de force brute (au plus une fois par fenêtre)"""
+        window = getattr(settings, 'SECURITY_BRUTE_FORCE_WINDOW', 900)
+        if not cache.add(f'security:brute_force_alert:{ip_address}', True, window):
+            return
+        
+        logger.warning(
+            f"Brute force suspected: {ip_address}",
+            extra={'ip': ip_address, 'username': username}
+        )
+        AuditLog.log(
+            action='suspicious_activity',
+            description=f'Suspicion de force brute depuis {ip_address}',
+            level='critical',
+            request=request,
+            username=username
+        )
     
     @staticmethod
     def _get_client_ip(request):
@@ -0,0 +1,50 @@
+"""
+Backends de cache instrumentés : hits / misses comptés par requête ou tâche
+(cf. config.metrics). Le comportement du cache est inchangé.
+"""
+from django.core.cache.backends.locmem import LocMemCache
+
+from config.metrics import record_cache_access
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    """
+    Compte les lectures trouvées ou absentes du cache
+
+    get_many de BaseCache (LocMemCache) repasse par get ; les backends qui
+    lisent plusieurs clés en un aller-retour ajoutent BulkCacheMetricsMixin.
+    """
+
+    def get(self, key, default=None, version=None, **kwargs):
+        value = super().get(key, _MISSING, version=version, **kwargs)
+        if value is _MISSING:
+            record_cache_access(0, 1)
+            return default
+        record_cache_access(1, 0)
+        return value
+
+
+class BulkCacheMetricsMixin(CacheMetricsMixin):
+    """Compte aussi les lectures groupées (get_many en un aller-retour)"""
+
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        values = super().get_many(keys, *args, **kwargs)
+        record_cache_access(len(values), len(keys) - len(values))
+        return values
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    """LocMemCache (développement, tests) avec métriques"""
+
+
+try:
+    from django_redis.cache import RedisCache
+except ImportError:  # Dépendance de production
+    RedisCache = None
+
+if RedisCache is not None:
+    class InstrumentedRedisCache(BulkCacheMetricsMixin, RedisCache):
+        """RedisCache (django-redis) avec métriques"""
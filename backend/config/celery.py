@@ -12,6 +12,16 @@ app = Celery("vida")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
+# Durée, temps en base et requêtes SQL par tâche (cf. config.metrics)
+from config.metrics import connect_celery_signals  # noqa: E402
+
+connect_celery_signals()
+
+# Vidage de la file d'audit : les enfants prefork sortent sans atexit (cf. apps.users.audit_sink)
+from apps.users.audit_sink import connect_celery_signals as connect_audit_signals  # noqa: E402
+
+connect_audit_signals()
+
 
 # Configuration des tâches périodiques
 app.conf.beat_schedule = {
@@ -45,6 +55,18 @@ app.conf.beat_schedule = {
         'schedule': crontab(hour=0, minute=0),
     },
     
+    # Agrégats journaliers (DailyClinicStats) - tous les jours à 0h15
+    'rollup-daily-clinic-stats': {
+        'task': 'apps.appointments.tasks.rollup_daily_clinic_stats',
+        'schedule': crontab(hour=0, minute=15),
+    },
+    
+    # Réalignement des compteurs de notifications - toutes les heures
+    'reconcile-notification-counters': {
+        'task': 'apps.notifications.tasks.reconcile_notification_counters',
+        'schedule': crontab(minute=5),
+    },
+    
     # Backup automatique de la base de données - tous les jours à 2h du matin
     'backup-database': {
         'task': 'apps.users.tasks.backup_database',
@@ -56,6 +78,24 @@ app.conf.beat_schedule = {
         'task': 'apps.users.tasks.cleanup_old_audit_logs',
         'schedule': crontab(hour=3, minute=0, day_of_month=1),
     },
+    
+    # Création des partitions d'audit à venir - le 20 de chaque mois à 4h
+    'create-audit-partitions': {
+        'task': 'apps.users.tasks.create_audit_partitions',
+        'schedule': crontab(hour=4, minute=0, day_of_month=20),
+    },
+    
+    # Synthèse horaire des tentatives de connexion - toutes les heures à la minute 10
+    'rollup-security-summary': {
+        'task': 'apps.users.tasks.rollup_security_summary',
+        'schedule': crontab(minute=10),
+    },
+    
+    # Export des métriques pour node-exporter (si METRICS_TEXTFILE) - toutes les minutes
+    'write-metrics-textfile': {
+        'task': 'apps.users.tasks.write_metrics_textfile',
+        'schedule': crontab(),
+    },
 }
 
 
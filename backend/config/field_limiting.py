@@ -7,6 +7,8 @@ from rest_framework import serializers
 from django.conf import settings
 import logging
 
+from config.json_validators import get_request_json
+
 logger = logging.getLogger(__name__)
 
 
@@ -136,7 +138,10 @@ class RequestComplexityMiddleware:
     """
     Middleware pour valider la complexité des requêtes
     
-    Vérifie que les requêtes POST/PUT/PATCH ne sont pas trop complexes
+    Vérifie que les requêtes POST/PUT/PATCH ne sont pas trop complexes.
+    Le corps JSON est décodé une seule fois (get_request_json) et la mesure
+    de complexité faite pendant le décodage est réutilisée : pas de second
+    parcours de l'arbre, et le parser DRF ne re-décode pas le corps.
     """
     
     def __init__(self, get_response):
@@ -148,27 +153,32 @@ class RequestComplexityMiddleware:
         # Valider uniquement les requêtes avec body
         if request.method in ['POST', 'PUT', 'PATCH']:
             try:
-                # Récupérer les données
-                if hasattr(request, 'data'):
-                    data = request.data
-                elif request.content_type == 'application/json':
-                    import json
-                    data = json.loads(request.body)
-                else:
-                    data = None
-                
-                # Valider la complexité
-                if data:
-                    validate_request_complexity(data, self.max_keys, self.max_depth)
+                if get_request_json(request) is not None:
+                    self.check_complexity(request.json_complexity)
             
             except ValidationError:
-                # Laisser passer, sera géré par le serializer
+                # Laisser passer, sera géré par le parser / le serializer
                 pass
             except Exception as e:
                 logger.warning(f"Error validating request complexity: {e}")
         
         response = self.get_response(request)
         return response
+    
+    def check_complexity(self, complexity):
+        """
+        Applique MAX_REQUEST_KEYS / MAX_REQUEST_DEPTH à la mesure de
+        complexité (mêmes limites que validate_request_complexity : 
+        max_depth niveaux de conteneurs imbriqués, plus leurs valeurs)
+        """
+        if complexity.depth > self.max_depth + 1:
+            raise ValidationError({
+                'detail': f'Profondeur de requête trop importante (max: {self.max_depth})'
+            })
+        if complexity.widest > self.max_keys:
+            raise ValidationError({
+                'detail': f'Trop de clés dans la requête (max: {self.max_keys}, actuel: {complexity.widest})'
+            })
 
 
 class SparseFieldsetMixin:
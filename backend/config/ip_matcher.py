@@ -0,0 +1,205 @@
+"""
+Listes d'IPs compilées pour le throttling (whitelist / blacklist)
+
+Les entrées (IP seules ou réseaux CIDR, IPv4 et IPv6) sont converties une
+fois en intervalles d'entiers triés et fusionnés : une recherche est une
+dichotomie en O(log n), quelle que soit la taille des plages listées
+(NAT d'opérateurs, scanners cloud...).
+
+- THROTTLE_WHITELIST_IPS / THROTTLE_BLACKLIST_IPS : compilées au premier
+  usage, recompilées si le setting change (override_settings en tests) ;
+- blacklist temporaire (add_to_blacklist) : entrées partagées dans le cache
+  avec un numéro de version ; chaque processus ne recompile sa copie locale
+  que lorsque la version change ou qu'une entrée expire.
+"""
+import ipaddress
+import logging
+import threading
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+TEMPORARY_BLACKLIST_ENTRIES_KEY = 'blacklist_temp:entries'
+TEMPORARY_BLACKLIST_VERSION_KEY = 'blacklist_temp:version'
+TEMPORARY_BLACKLIST_LOCK_KEY = 'blacklist_temp:lock'
+TEMPORARY_BLACKLIST_LOCK_TIMEOUT = 5  # secondes
+
+
+def parse_network(entry):
+    """Convertit une IP ou un réseau CIDR en ip_network (None si invalide)."""
+    try:
+        return ipaddress.ip_network(str(entry).strip(), strict=False)
+    except ValueError:
+        return None
+
+
+def parse_address(value):
+    """Convertit une IP en ip_address ; les IPv4 mappées en IPv6 sont ramenées en IPv4."""
+    try:
+        address = ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return None
+    if address.version == 6 and address.ipv4_mapped:
+        return address.ipv4_mapped
+    return address
+
+
+class IPRangeSet:
+    """
+    Ensemble d'IPs et de réseaux, stocké en intervalles disjoints triés.
+
+    Usage:
+        ranges = IPRangeSet(['10.0.0.0/8', '203.0.113.7', '2001:db8::/32'])
+        '10.1.2.3' in ranges  # True
+    """
+
+    def __init__(self, entries=()):
+        intervals = {4: [], 6: []}
+        for entry in entries:
+            network = parse_network(entry)
+            if network is None:
+                logger.warning(f"Entrée IP/CIDR invalide ignorée: {entry!r}")
+                continue
+            intervals[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+
+        self._starts = {}
+        self._ends = {}
+        for version, ranges in intervals.items():
+            merged = []
+            for start, end in sorted(ranges):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            self._starts[version] = [start for start, _ in merged]
+            self._ends[version] = [end for _, end in merged]
+
+    def __contains__(self, value):
+        address = value if isinstance(value, (ipaddress.IPv4Address, ipaddress.IPv6Address)) else parse_address(value)
+        if address is None:
+            return False
+        starts = self._starts[address.version]
+        index = bisect_right(starts, int(address)) - 1
+        return index >= 0 and int(address) <= self._ends[address.version][index]
+
+    def __len__(self):
+        return len(self._starts[4]) + len(self._starts[6])
+
+
+_static_lists = {}
+_static_lock = threading.Lock()
+
+
+def get_ip_list(setting_name):
+    """Retourne la liste compilée d'un setting (THROTTLE_WHITELIST_IPS...)."""
+    compiled = _static_lists.get(setting_name)
+    if compiled is None:
+        with _static_lock:
+            compiled = _static_lists.get(setting_name)
+            if compiled is None:
+                compiled = IPRangeSet(getattr(settings, setting_name, []))
+                _static_lists[setting_name] = compiled
+    return compiled
+
+
+@receiver(setting_changed)
+def _reset_static_lists(setting, **kwargs):
+    _static_lists.pop(setting, None)
+
+
+class TemporaryBlacklist:
+    """
+    Blacklist temporaire partagée entre processus via le cache.
+
+    Le cache contient {identifiant: expiration} (IPs, réseaux ou emails) et
+    un numéro de version incrémenté à chaque modification. Les modifications
+    (lecture, mise à jour, réécriture du dictionnaire) sont sérialisées entre
+    processus par un verrou posé avec cache.add. Une vérification
+    coûte une lecture de la version ; la copie locale compilée n'est
+    reconstruite que si la version a changé ou si une entrée a expiré.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ranges = IPRangeSet()
+        self._identifiers = frozenset()
+        self._next_expiry = None
+
+    def add(self, identifier, duration):
+        with self._update() as entries:
+            entries[str(identifier)] = time.time() + duration
+
+    def remove(self, identifier):
+        with self._update() as entries:
+            entries.pop(str(identifier), None)
+
+    def contains_ip(self, ip_address):
+        self._refresh()
+        return ip_address in self._ranges
+
+    def contains_identifier(self, identifier):
+        self._refresh()
+        return str(identifier) in self._identifiers
+
+    @contextmanager
+    def _update(self):
+        # Sans verrou, deux workers qui modifient la liste en même temps
+        # réécrivent chacun leur copie et l'une des entrées est perdue
+        acquired = False
+        deadline = time.monotonic() + TEMPORARY_BLACKLIST_LOCK_TIMEOUT
+        while not acquired:
+            acquired = cache.add(TEMPORARY_BLACKLIST_LOCK_KEY, 1, TEMPORARY_BLACKLIST_LOCK_TIMEOUT)
+            if not acquired:
+                if time.monotonic() >= deadline:
+                    # Verrou expiré côté cache mais pas encore purgé : on écrit quand même
+                    logger.warning("Verrou de la blacklist temporaire non obtenu, écriture sans verrou")
+                    break
+                time.sleep(0.01)
+        try:
+            entries = self._load_entries()
+            before = dict(entries)
+            yield entries
+            if entries != before:
+                self._store_entries(entries)
+        finally:
+            if acquired:
+                cache.delete(TEMPORARY_BLACKLIST_LOCK_KEY)
+
+    def _load_entries(self):
+        now = time.time()
+        entries = cache.get(TEMPORARY_BLACKLIST_ENTRIES_KEY) or {}
+        return {identifier: expires for identifier, expires in entries.items() if expires > now}
+
+    def _store_entries(self, entries):
+        timeout = max(entries.values()) - time.time() if entries else None
+        cache.set(TEMPORARY_BLACKLIST_ENTRIES_KEY, entries, timeout)
+        cache.add(TEMPORARY_BLACKLIST_VERSION_KEY, 0, None)
+        cache.incr(TEMPORARY_BLACKLIST_VERSION_KEY)
+
+    def _refresh(self):
+        version = cache.get(TEMPORARY_BLACKLIST_VERSION_KEY)
+        expired = self._next_expiry is not None and time.time() >= self._next_expiry
+        if version == self._version and not expired:
+            return
+
+        with self._lock:
+            entries = self._load_entries()
+            self._ranges = IPRangeSet(
+                identifier for identifier in entries if parse_network(identifier) is not None
+            )
+            self._identifiers = frozenset(entries)
+            self._next_expiry = min(entries.values()) if entries else None
+            self._version = version
+
+
+temporary_blacklist = TemporaryBlacklist()
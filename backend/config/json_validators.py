@@ -1,94 +1,240 @@
 """
 Validateurs JSON stricts pour sécuriser les entrées
+
+Le corps JSON d'une requête est décodé une seule fois (parse_json_body) :
+profondeur et nombre d'éléments sont contrôlés pendant le décodage par
+l'object_pairs_hook de json.loads, qui interrompt le parsing dès qu'une
+limite est dépassée, sans parcours de l'arbre a posteriori. Les tableaux
+n'ayant pas de hook, un corps trop long pour respecter la limite d'éléments
+est d'abord pré-contrôlé sur le texte (virgules hors chaînes), avant toute
+construction des objets Python. Le résultat est
+attaché à la requête Django (parsed_json / json_complexity) : le parser DRF,
+les middlewares d'audit et de complexité le réutilisent sans re-décoder.
 """
 import json
+import re
+from collections import namedtuple
 from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import JSONParser
 from rest_framework.renderers import JSONRenderer
 from django.conf import settings
 
 
+# Statistiques d'un document JSON : profondeur, nombre total d'éléments
+# (paires clé/valeur et éléments de tableaux), taille du plus grand conteneur
+JSONComplexity = namedtuple('JSONComplexity', ['depth', 'elements', 'widest'])
+
+
+class JSONLimitExceeded(ValueError):
+    """Limite de profondeur ou de taille dépassée pendant le décodage"""
+
+
+# Chaînes JSON (échappements compris), retirées avant de compter les virgules
+_JSON_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+def _check_separators(text, max_size):
+    """
+    Rejette un document dont les séparateurs dépassent déjà la limite
+
+    Chaque virgule hors chaîne sépare deux éléments d'un même conteneur :
+    leur nombre minore le nombre d'éléments. Un élément occupant au moins
+    deux caractères avec son séparateur, les documents courts sont ignorés.
+    """
+    if max_size is None or len(text) <= 2 * max_size:
+        return
+    if _JSON_STRING.sub('', text).count(',') > max_size:
+        raise JSONLimitExceeded(f'JSON trop volumineux (max: {max_size} éléments)')
+
+
+class _ComplexityTracker:
+    """
+    Mesure la complexité d'un document pendant json.loads.
+
+    object_pairs_hook est appelé à la fermeture de chaque objet, des plus
+    profonds aux plus externes : la hauteur de chaque objet est mémorisée
+    (par id) et les tableaux, sans hook, sont mesurés une seule fois quand
+    leur conteneur se ferme.
+    """
+
+    def __init__(self, max_depth, max_size):
+        self.max_depth = max_depth
+        self.max_size = max_size
+        self.heights = {}
+        self.elements = 0
+        self.widest = 0
+
+    def _count(self, size):
+        self.elements += size
+        self.widest = max(self.widest, size)
+        if self.max_size is not None and self.elements > self.max_size:
+            raise JSONLimitExceeded(f'JSON trop volumineux (max: {self.max_size} éléments)')
+
+    def _check_height(self, height):
+        if self.max_depth is not None and height > self.max_depth:
+            raise JSONLimitExceeded(f'JSON trop profond (max: {self.max_depth} niveaux)')
+
+    def _height(self, value):
+        if isinstance(value, dict):
+            return self.heights.get(id(value), 0)
+        if isinstance(value, list):
+            return self._visit_list(value)
+        return 0
+
+    def _visit_list(self, items):
+        """
+        Hauteur d'un tableau, parcouru sans récursion
+
+        Les tableaux imbriqués sont empilés avec leur niveau : la profondeur
+        est contrôlée à la descente, avant d'en visiter le contenu.
+        """
+        height = 0
+        stack = [(items, 0)]
+        while stack:
+            current, level = stack.pop()
+            self._count(len(current))
+            if not current:
+                height = max(height, level)
+                continue
+            for item in current:
+                if isinstance(item, list):
+                    self._check_height(level + 1)
+                    stack.append((item, level + 1))
+                else:
+                    height = max(height, level + 1 + self.heights.get(id(item), 0))
+        self._check_height(height)
+        return height
+
+    def object_pairs_hook(self, pairs):
+        self._count(len(pairs))
+        height = max((self._height(value) for _, value in pairs), default=-1) + 1
+        self._check_height(height)
+        obj = dict(pairs)
+        self.heights[id(obj)] = height
+        return obj
+
+    def finish(self, data):
+        return JSONComplexity(self._height(data), self.elements, self.widest)
+
+
+def get_json_limits():
+    """Limites (profondeur, éléments) appliquées aux corps de requête JSON"""
+    return (
+        getattr(settings, 'JSON_MAX_DEPTH', 10),
+        getattr(settings, 'JSON_MAX_ELEMENTS', 1000),
+    )
+
+
+def parse_json(text, max_depth=None, max_size=None):
+    """
+    Décode un document JSON en contrôlant sa complexité au fil du décodage
+
+    Returns:
+        Tuple (données, JSONComplexity)
+
+    Raises:
+        json.JSONDecodeError: JSON invalide
+        JSONLimitExceeded: profondeur ou nombre d'éléments dépassé
+    """
+    _check_separators(text, max_size)
+    tracker = _ComplexityTracker(max_depth, max_size)
+    try:
+        data = json.loads(text, object_pairs_hook=tracker.object_pairs_hook)
+        return data, tracker.finish(data)
+    except RecursionError:
+        raise JSONLimitExceeded(f'JSON trop profond (max: {max_depth} niveaux)')
+
+
+def parse_json_body(body, encoding=None):
+    """
+    Décode un corps de requête JSON avec les limites configurées
+
+    Returns:
+        Tuple (données, JSONComplexity)
+
+    Raises:
+        ValidationError: corps vide, encodage ou JSON invalide, limite dépassée
+    """
+    try:
+        decoded = body.decode(encoding or settings.DEFAULT_CHARSET)
+    except UnicodeDecodeError as e:
+        raise ValidationError({
+            'detail': 'Encodage invalide',
+            'error': str(e)
+        })
+
+    # Vérifier que ce n'est pas vide
+    if not decoded.strip():
+        raise ValidationError({'detail': 'Le corps de la requête ne peut pas être vide'})
+
+    max_depth, max_size = get_json_limits()
+    try:
+        return parse_json(decoded, max_depth=max_depth, max_size=max_size)
+    except json.JSONDecodeError as e:
+        raise ValidationError({
+            'detail': 'JSON invalide',
+            'error': str(e),
+            'line': e.lineno,
+            'column': e.colno
+        })
+    except JSONLimitExceeded as e:
+        raise ValidationError({'detail': str(e)})
+
+
+def _attach(request, data, complexity):
+    request.parsed_json = data
+    request.json_complexity = complexity
+
+
+def get_request_json(request):
+    """
+    Retourne le corps JSON d'une requête (Django ou DRF), décodé une seule fois
+
+    Returns:
+        Données décodées, ou None si la requête n'est pas du JSON
+
+    Raises:
+        ValidationError: JSON invalide ou trop complexe
+    """
+    django_request = getattr(request, '_request', request)
+    if hasattr(django_request, 'parsed_json'):
+        return django_request.parsed_json
+
+    if django_request.content_type != 'application/json' or not django_request.body:
+        return None
+
+    data, complexity = parse_json_body(django_request.body, django_request.encoding)
+    _attach(django_request, data, complexity)
+    return data
+
+
 class StrictJSONParser(JSONParser):
     """
     Parser JSON strict qui rejette les JSON malformés
+    
+    Réutilise le JSON déjà décodé par un middleware (get_request_json) et
+    attache son résultat à la requête Django pour les couches suivantes.
     """
     
     def parse(self, stream, media_type=None, parser_context=None):
         """
-        Parse le JSON avec validation stricte
+        Parse le JSON avec validation stricte (profondeur et taille
+        contrôlées pendant le décodage)
         """
         parser_context = parser_context or {}
         encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        request = parser_context.get('request')
+        django_request = getattr(request, '_request', None)
         
-        try:
-            decoded_stream = stream.read().decode(encoding)
-            
-            # Vérifier que ce n'est pas vide
-            if not decoded_stream.strip():
-                raise ValidationError({'detail': 'Le corps de la requête ne peut pas être vide'})
-            
-            # Parser avec strict=True pour rejeter les duplicates de clés
-            data = json.loads(decoded_stream, strict=True)
-            
-            # Vérifier la profondeur maximale
-            self._check_depth(data, max_depth=10)
-            
-            # Vérifier la taille maximale
-            self._check_size(data, max_size=1000)
-            
-            return data
-            
-        except json.JSONDecodeError as e:
-            raise ValidationError({
-                'detail': 'JSON invalide',
-                'error': str(e),
-                'line': e.lineno,
-                'column': e.colno
-            })
-        except UnicodeDecodeError as e:
-            raise ValidationError({
-                'detail': 'Encodage invalide',
-                'error': str(e)
-            })
-    
-    def _check_depth(self, obj, current_depth=0, max_depth=10):
-        """
-        Vérifier la profondeur maximale du JSON (protection contre DoS)
-        """
-        if current_depth > max_depth:
-            raise ValidationError({
-                'detail': f'JSON trop profond (max: {max_depth} niveaux)'
-            })
+        if django_request is not None and hasattr(django_request, 'parsed_json'):
+            return django_request.parsed_json
         
-        if isinstance(obj, dict):
-            for value in obj.values():
-                self._check_depth(value, current_depth + 1, max_depth)
-        elif isinstance(obj, list):
-            for item in obj:
-                self._check_depth(item, current_depth + 1, max_depth)
-    
-    def _check_size(self, obj, current_count=0, max_size=1000):
-        """
-        Vérifier le nombre maximal d'éléments (protection contre DoS)
-        """
-        if isinstance(obj, dict):
-            current_count += len(obj)
-            if current_count > max_size:
-                raise ValidationError({
-                    'detail': f'JSON trop volumineux (max: {max_size} éléments)'
-                })
-            for value in obj.values():
-                current_count = self._check_size(value, current_count, max_size)
-        elif isinstance(obj, list):
-            current_count += len(obj)
-            if current_count > max_size:
-                raise ValidationError({
-                    'detail': f'JSON trop volumineux (max: {max_size} éléments)'
-                })
-            for item in obj:
-                current_count = self._check_size(item, current_count, max_size)
+        data, complexity = parse_json_body(stream.read(), encoding)
         
-        return current_count
+        if django_request is not None:
+            _attach(django_request, data, complexity)
+        
+        return data
 
 
 class SafeJSONRenderer(JSONRenderer):
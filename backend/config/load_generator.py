@@ -0,0 +1,454 @@
+"""
+Génération de charge : trafic mixte et réaliste contre un serveur local
+
+Des utilisateurs virtuels (coroutines asyncio) enchaînent des parcours tirés
+au sort selon une pondération :
+- anonymous_booking : créneaux disponibles, verrouillage, création du RDV ;
+- patient_notifications : connexion puis lecture des notifications ;
+- staff_dashboard : statistiques et graphiques du dashboard ;
+- admin_audit_export : export CSV (streaming) des logs d'audit.
+
+Chaque utilisateur virtuel garde sa connexion HTTP/1.1 (keep-alive) et ses
+cookies (JWT httpOnly), et se présente avec sa propre adresse IP
+(X-Forwarded-For dans 198.18.0.0/15, plage réservée aux bancs de test) :
+les throttles par IP (config.throttling, config.advanced_throttling) voient
+autant de clients distincts, comme en production derrière le proxy.
+
+Le rapport donne le débit, le taux d'erreurs (5xx et échecs réseau) et les
+429 par étape, avec les percentiles de latence.
+
+Cible prévue : la pile locale config.settings.loadtest (hCaptcha et SMTP
+remplacés par des doublures), cf. la commande loadtest.
+"""
+import asyncio
+import ipaddress
+import json
+import random
+import ssl
+import statistics
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.cookies import CookieError, SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.urls import reverse
+
+DEFAULT_MIX = {
+    'anonymous_booking': 4,
+    'patient_notifications': 3,
+    'staff_dashboard': 2,
+    'admin_audit_export': 1,
+}
+
+# Persona -> rôle du compte utilisé (None : anonyme)
+PERSONA_ROLES = {
+    'anonymous_booking': None,
+    'patient_notifications': 'patient',
+    'staff_dashboard': 'staff',
+    'admin_audit_export': 'admin',
+}
+
+CLIENT_NETWORK = ipaddress.ip_network('198.18.0.0/15')
+CAPTCHA_TOKEN = 'loadtest-captcha'
+BOOKING_HORIZON_DAYS = 14
+PERCENTILES = (50, 95, 99)
+
+
+class LoadTestError(Exception):
+    """Échec réseau ou réponse HTTP illisible"""
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body or b'null')
+
+
+class HTTPClient:
+    """
+    Client HTTP/1.1 asyncio minimal : une connexion keep-alive, un jeu de cookies
+
+    Gère Content-Length et Transfer-Encoding: chunked (réponses en streaming).
+    Une connexion fermée par le serveur est rouverte une fois.
+    """
+
+    def __init__(self, base_url, headers=None, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self.prefix = parts.path.rstrip('/')
+        self.host_header = parts.netloc
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.cookies = {}
+        self._reader = None
+        self._writer = None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+            self._reader = self._writer = None
+
+    async def request(self, method, path, params=None, json_body=None, send_cookies=True):
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        body = b''
+        headers = {
+            'Host': self.host_header,
+            'Accept': 'application/json',
+            'Connection': 'keep-alive',
+            **self.headers,
+        }
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        if body or method not in ('GET', 'HEAD'):
+            headers['Content-Length'] = str(len(body))
+        if send_cookies and self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+
+        head = f"{method} {self.prefix}{path} HTTP/1.1\r\n" + ''.join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        ) + '\r\n'
+        payload = head.encode('latin-1') + body
+
+        for attempt in (1, 2):
+            reused = self._writer is not None
+            try:
+                return await asyncio.wait_for(self._exchange(payload), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                await self.close()
+                if attempt == 2 or not reused:
+                    raise LoadTestError(f'{method} {path}: {e!r}') from e
+            except (OSError, asyncio.TimeoutError) as e:
+                await self.close()
+                raise LoadTestError(f'{method} {path}: {e!r}') from e
+            except LoadTestError:
+                await self.close()
+                raise
+
+    async def _exchange(self, payload):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl
+            )
+        self._writer.write(payload)
+        await self._writer.drain()
+
+        status_line = await self._reader.readuntil(b'\r\n')
+        try:
+            status = int(status_line.split(b' ', 2)[1])
+        except (IndexError, ValueError):
+            raise LoadTestError(f'Ligne de statut invalide: {status_line!r}')
+
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'set-cookie':
+                self._store_cookie(value)
+            headers[name] = value
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked()
+        elif 'content-length' in headers:
+            body = await self._reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self._reader.read()
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return Response(status, headers, body)
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self._reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size == 0:
+                # Trailers éventuels jusqu'à la ligne vide
+                while await self._reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return b''.join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readexactly(2)
+
+    def _store_cookie(self, value):
+        cookie = SimpleCookie()
+        try:
+            cookie.load(value)
+        except CookieError:
+            return
+        for name, morsel in cookie.items():
+            if morsel['max-age'] == '0' or not morsel.value:
+                self.cookies.pop(name, None)
+            else:
+                self.cookies[name] = morsel.value
+
+
+class LoadStats:
+    """Latences et statuts par étape (« persona:étape »)"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.retry_after = []
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, step, response, elapsed):
+        self.latencies[step].append(elapsed)
+        self.statuses[step][response.status] += 1
+        if response.status == 429 and response.headers.get('retry-after', '').isdigit():
+            self.retry_after.append(int(response.headers['retry-after']))
+
+    def record_error(self, step, elapsed=None):
+        """Échec réseau (elapsed mesuré) ou réponse illisible"""
+        if elapsed is not None:
+            self.latencies[step].append(elapsed)
+        self.errors[step] += 1
+
+    def _step_summary(self, step):
+        statuses = self.statuses[step]
+        latencies = sorted(value * 1000 for value in self.latencies[step])
+        total = len(latencies)
+        summary = {
+            'requests': total,
+            'ok': sum(count for code, count in statuses.items() if code < 400),
+            'throttled': statuses.get(429, 0),
+            'client_errors': sum(count for code, count in statuses.items() if 400 <= code < 500 and code != 429),
+            'server_errors': sum(count for code, count in statuses.items() if code >= 500),
+            'failures': self.errors.get(step, 0),
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        }
+        if total > 1:
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            for percentile in PERCENTILES:
+                summary[f'p{percentile}_ms'] = round(cuts[percentile - 1], 2)
+        elif total == 1:
+            for percentile in PERCENTILES:
+                summary[f'p{percentile}_ms'] = round(latencies[0], 2)
+        return summary
+
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        steps = {step: self._step_summary(step) for step in sorted(set(self.latencies) | set(self.errors))}
+        total = sum(step['requests'] for step in steps.values())
+        failed = sum(step['server_errors'] + step['failures'] for step in steps.values())
+        throttled = sum(step['throttled'] for step in steps.values())
+        return {
+            'duration_s': round(elapsed, 2),
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+            'error_rate': round(failed / total, 4) if total else 0,
+            'throttled': throttled,
+            'throttled_rate': round(throttled / total, 4) if total else 0,
+            'retry_after_max_s': max(self.retry_after, default=None),
+            'steps': steps,
+        }
+
+
+class VirtualUser:
+    """Un client simulé : sa connexion, ses cookies, son IP et son compte"""
+
+    def __init__(self, index, base_url, stats, rng, accounts=None, client_ip=None, timeout=30):
+        headers = {'User-Agent': 'vida-loadtest/1.0'}
+        if client_ip:
+            headers['X-Forwarded-For'] = client_ip
+        self.index = index
+        self.client = HTTPClient(base_url, headers=headers, timeout=timeout)
+        self.stats = stats
+        self.rng = rng
+        self.accounts = accounts or {}
+        self.logged_in_as = None
+
+    async def call(self, step, method, path, params=None, json_body=None, anonymous=False):
+        """Requête chronométrée (sans cookies si ``anonymous``) ; None en cas d'échec réseau"""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, path, params=params, json_body=json_body, send_cookies=not anonymous
+            )
+        except LoadTestError:
+            self.stats.record_error(step, time.perf_counter() - start)
+            return None
+        self.stats.record(step, response, time.perf_counter() - start)
+        return response
+
+    async def login(self, persona, role):
+        """Connexion (cookies JWT) avec le compte attribué au rôle, une fois par compte"""
+        accounts = self.accounts.get(role) or []
+        if not accounts:
+            return False
+        email, password = accounts[self.index % len(accounts)]
+        if self.logged_in_as == email:
+            return True
+        response = await self.call(f'{persona}:login', 'POST', reverse('token_obtain_pair'), json_body={
+            'email': email, 'password': password, 'captcha': CAPTCHA_TOKEN,
+        })
+        if response is not None and response.status == 200:
+            self.logged_in_as = email
+            return True
+        return False
+
+
+
+async def anonymous_booking(user):
+    """Visiteur : créneaux d'un jour, verrouillage puis création du RDV"""
+    day = date.today() + timedelta(days=user.rng.randint(1, BOOKING_HORIZON_DAYS))
+    response = await user.call(
+        'anonymous_booking:available_slots', 'GET', reverse('appointments-available-slots'),
+        params={'date': day.isoformat()}, anonymous=True
+    )
+    if response is None or response.status != 200:
+        return
+    slots = response.json().get('slots') or []
+    if not slots:
+        return
+    slot_time = user.rng.choice(slots)[:5]
+    slot = {'date': day.isoformat(), 'time': slot_time, 'lock_id': f'loadtest-{user.index}'}
+
+    response = await user.call(
+        'anonymous_booking:lock_slot', 'POST', reverse('appointments-lock-slot'),
+        json_body=slot, anonymous=True
+    )
+    if response is None or response.status != 200:
+        return
+
+    response = await user.call('anonymous_booking:create', 'POST', reverse('appointments-list'), json_body={
+        'patient_first_name': 'Charge',
+        'patient_last_name': f'Visiteur{user.index}',
+        'patient_email': f'visiteur{user.index}@loadtest.vida.local',
+        'patient_phone': '06 123 45 67',
+        'date': slot['date'],
+        'time': slot_time,
+        'consultation_type': 'generale',
+        'reason': 'Test de charge',
+        'captcha': CAPTCHA_TOKEN,
+    }, anonymous=True)
+    if response is None or response.status != 201:
+        await user.call(
+            'anonymous_booking:unlock_slot', 'POST', reverse('appointments-unlock-slot'),
+            json_body=slot, anonymous=True
+        )
+
+
+async def patient_notifications(user):
+    """Patient : liste des notifications et compteur de non-lues"""
+    if not await user.login('patient_notifications', 'patient'):
+        return
+    await user.call('patient_notifications:list', 'GET', reverse('notification-list'))
+    await user.call('patient_notifications:count', 'GET', reverse('notification-count'))
+
+
+async def staff_dashboard(user):
+    """Personnel : rafraîchissement du dashboard"""
+    if not await user.login('staff_dashboard', 'staff'):
+        return
+    await user.call('staff_dashboard:dashboard_stats', 'GET', reverse('appointments-dashboard-stats'))
+    await user.call('staff_dashboard:chart_data', 'GET', reverse('appointments-chart-data'))
+
+
+async def admin_audit_export(user):
+    """Administrateur : export CSV des logs d'audit de la semaine"""
+    if not await user.login('admin_audit_export', 'admin'):
+        return
+    await user.call('admin_audit_export:export', 'GET', reverse('audit_export'), params={'days': 7})
+
+
+PERSONAS = {
+    'anonymous_booking': anonymous_booking,
+    'patient_notifications': patient_notifications,
+    'staff_dashboard': staff_dashboard,
+    'admin_audit_export': admin_audit_export,
+}
+
+
+def parse_mix(value):
+    """
+    Pondération des parcours depuis « persona=poids,... »
+
+    Raises:
+        ValueError: persona inconnu ou poids invalide
+    """
+    mix = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in PERSONAS:
+            raise ValueError(f'Parcours inconnu: {name} (choix: {", ".join(PERSONAS)})')
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f'Poids négatif pour {name}')
+    if not any(mix.values()):
+        raise ValueError('Aucun parcours avec un poids positif')
+    return mix
+
+
+def client_ip(index, count):
+    """IP synthétique du client ``index`` (``count`` adresses distinctes)"""
+    return str(CLIENT_NETWORK[1 + index % count])
+
+
+async def _run_user(user, mix, deadline, think_time):
+    names = list(mix)
+    weights = list(mix.values())
+    try:
+        while time.perf_counter() < deadline:
+            persona = user.rng.choices(names, weights=weights)[0]
+            try:
+                await PERSONAS[persona](user)
+            except ValueError:
+                user.stats.record_error(f'{persona}:invalid_response')
+            if think_time:
+                await asyncio.sleep(min(user.rng.expovariate(1 / think_time), deadline - time.perf_counter()))
+    finally:
+        await user.client.close()
+
+
+async def run_load(base_url, concurrency=10, duration=60, mix=None, accounts=None,
+                   client_ips=None, think_time=1.0, ramp_up=0, seed=None, timeout=30):
+    """
+    Lance ``concurrency`` utilisateurs virtuels pendant ``duration`` secondes
+
+    Args:
+        accounts: {rôle: [(email, mot de passe), ...]} pour les parcours connectés
+        client_ips: nombre d'IP simulées (défaut : une par utilisateur, 0 : aucune)
+        think_time: pause moyenne entre deux parcours (secondes, loi exponentielle)
+        ramp_up: durée de montée en charge (démarrages étalés)
+
+    Returns:
+        Rapport (cf. LoadStats.report)
+    """
+    mix = mix or DEFAULT_MIX
+    client_ips = concurrency if client_ips is None else client_ips
+    stats = LoadStats()
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + duration
+
+    async def start(index):
+        if ramp_up:
+            await asyncio.sleep(ramp_up * index / concurrency)
+        user = VirtualUser(
+            index, base_url, stats, random.Random(rng.random()), accounts=accounts,
+            client_ip=client_ip(index, client_ips) if client_ips else None, timeout=timeout
+        )
+        await _run_user(user, mix, deadline, think_time)
+
+    await asyncio.gather(*(start(index) for index in range(concurrency)))
+    stats.finished = time.perf_counter()
+    return stats.report()
@@ -0,0 +1,513 @@
+"""
+Métriques de performance au format Prometheus (sans dépendance externe)
+
+Par route (nom d'URL résolu) et méthode : durée de la requête, temps passé
+en base, nombre de requêtes SQL (cf. config.query_budget), hits / misses du
+cache et taille de la réponse. Les tâches Celery sont mesurées de la même
+façon (durée, temps en base, requêtes SQL) par nom de tâche.
+
+Les valeurs sont agrégées dans des histogrammes à seaux fixes : p50 / p95 /
+p99 s'obtiennent avec histogram_quantile() côté Prometheus, ou localement
+avec la commande ``export_metrics --summary``.
+
+Exposition :
+- vue metrics_view (GET /metrics), réservée à METRICS_ALLOWED_IPS ou au
+  jeton METRICS_TOKEN ;
+- fichier texte pour le textfile collector de node-exporter :
+  ``export_metrics --textfile`` ou tâche périodique (METRICS_TEXTFILE).
+
+Avec plusieurs processus (workers gunicorn, Celery), définir METRICS_DIR :
+chaque processus y écrit périodiquement un instantané de ses compteurs
+(METRICS_FLUSH_INTERVAL) et l'exposition additionne les instantanés. Les
+instantanés des processus terminés sont supprimés à la collecte.
+"""
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from config.ip_matcher import get_ip_list
+from config.query_budget import record_queries
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TASK_LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Metric:
+    """Métrique nommée avec étiquettes ; valeurs protégées par un verrou"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def snapshot(self):
+        """Copie sérialisable en JSON : {'type', 'help', 'samples': [[étiquettes, valeur]]}"""
+        with self._lock:
+            samples = [[list(key), self._copy(value)] for key, value in self._values.items()]
+        return {'type': self.kind, 'help': self.documentation, 'labels': list(self.labelnames), 'samples': samples}
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(Metric):
+    """Compteur monotone"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    """Histogramme à seaux fixes (comptes par seau, somme, total)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot['buckets'] = list(self.buckets)
+        return snapshot
+
+    def _copy(self, value):
+        return {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+
+
+class MetricsRegistry:
+    """Ensemble des métriques d'un processus"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+
+def merge_snapshots(snapshots):
+    """Additionne des instantanés de plusieurs processus"""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, 'samples': {}})
+            for labels, value in metric['samples']:
+                key = tuple(labels)
+                current = target['samples'].get(key)
+                if current is None:
+                    target['samples'][key] = value if metric['type'] == 'counter' else {
+                        'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']
+                    }
+                elif metric['type'] == 'counter':
+                    target['samples'][key] = current + value
+                else:
+                    current['buckets'] = [a + b for a, b in zip(current['buckets'], value['buckets'])]
+                    current['sum'] += value['sum']
+                    current['count'] += value['count']
+    for metric in merged.values():
+        metric['samples'] = [[list(key), value] for key, value in metric['samples'].items()]
+    return merged
+
+
+def render(snapshot):
+    """Format d'exposition texte Prometheus (version 0.0.4)"""
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric['samples'], key=lambda sample: sample[0]):
+            pairs = list(zip(metric['labels'], labels))
+            if metric['type'] == 'counter':
+                lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'], value['buckets']):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{_format_labels(pairs + [('le', _format_value(float(bound)))])} {cumulative}"
+                )
+            lines.append(f"{name}_bucket{_format_labels(pairs + [('le', '+Inf')])} {value['count']}")
+            lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(pairs)} {value['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def histogram_quantile(quantile, buckets, counts, total):
+    """
+    Estime un quantile depuis les seaux (interpolation linéaire, comme
+    histogram_quantile de Prometheus). Les valeurs au-delà du dernier seau
+    sont ramenées à sa borne.
+    """
+    if not total:
+        return None
+    rank = quantile * total
+    cumulative = 0
+    lower = 0.0
+    for bound, count in zip(buckets, counts):
+        if count and cumulative + count >= rank:
+            return lower + (bound - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = bound
+    return float(buckets[-1])
+
+
+def route_summary(snapshot):
+    """
+    Synthèse par route (toutes réponses confondues), routes les plus
+    coûteuses (temps cumulé) d'abord
+
+    Returns:
+        Liste de dictionnaires {'route', 'method', 'count', 'total', 'p50',
+        'p95', 'p99', 'db_mean', 'queries_mean'} (durées en secondes)
+    """
+    def grouped(name, label_count):
+        metric = snapshot.get(name)
+        groups = {}
+        if metric is None:
+            return groups, ()
+        for labels, value in metric['samples']:
+            key = tuple(labels[:label_count])
+            group = groups.setdefault(key, {'buckets': [0] * len(metric['buckets']), 'sum': 0.0, 'count': 0})
+            group['buckets'] = [a + b for a, b in zip(group['buckets'], value['buckets'])]
+            group['sum'] += value['sum']
+            group['count'] += value['count']
+        return groups, metric['buckets']
+
+    durations, buckets = grouped(REQUEST_DURATION.name, 2)
+    db_times, _ = grouped(REQUEST_DB_DURATION.name, 2)
+    queries, _ = grouped(REQUEST_QUERIES.name, 2)
+
+    rows = []
+    for (route, method), value in durations.items():
+        db = db_times.get((route, method))
+        query = queries.get((route, method))
+        rows.append({
+            'route': route,
+            'method': method,
+            'count': value['count'],
+            'total': value['sum'],
+            'p50': histogram_quantile(0.5, buckets, value['buckets'], value['count']),
+            'p95': histogram_quantile(0.95, buckets, value['buckets'], value['count']),
+            'p99': histogram_quantile(0.99, buckets, value['buckets'], value['count']),
+            'db_mean': db['sum'] / db['count'] if db and db['count'] else 0.0,
+            'queries_mean': query['sum'] / query['count'] if query and query['count'] else 0.0,
+        })
+    return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    'vida_http_request_duration_seconds', "Durée des requêtes HTTP",
+    ('route', 'method', 'status'), LATENCY_BUCKETS
+))
+REQUEST_DB_DURATION = registry.register(Histogram(
+    'vida_http_request_db_seconds', "Temps passé en base par requête HTTP",
+    ('route', 'method'), LATENCY_BUCKETS
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    'vida_http_request_queries', "Requêtes SQL par requête HTTP",
+    ('route', 'method'), QUERY_COUNT_BUCKETS
+))
+RESPONSE_SIZE = registry.register(Histogram(
+    'vida_http_response_size_bytes', "Taille des réponses HTTP",
+    ('route', 'method'), SIZE_BUCKETS
+))
+CACHE_OPERATIONS = registry.register(Counter(
+    'vida_cache_operations_total', "Lectures du cache par route ou tâche",
+    ('route', 'result')
+))
+TASK_DURATION = registry.register(Histogram(
+    'vida_celery_task_duration_seconds', "Durée des tâches Celery",
+    ('task', 'state'), TASK_LATENCY_BUCKETS
+))
+TASK_DB_DURATION = registry.register(Histogram(
+    'vida_celery_task_db_seconds', "Temps passé en base par tâche Celery",
+    ('task',), TASK_LATENCY_BUCKETS
+))
+TASK_QUERIES = registry.register(Histogram(
+    'vida_celery_task_queries', "Requêtes SQL par tâche Celery",
+    ('task',), QUERY_COUNT_BUCKETS
+))
+
+
+# ---------------------------------------------------------------------------
+# Cache : hits / misses de la requête ou tâche courante
+# ---------------------------------------------------------------------------
+
+_cache_stats = ContextVar('cache_stats', default=None)
+
+
+def record_cache_access(hits, misses):
+    """Appelé par les backends de cache instrumentés (config.cache_backends)"""
+    stats = _cache_stats.get()
+    if stats is not None:
+        stats[0] += hits
+        stats[1] += misses
+
+
+def _record_cache_stats(route, stats):
+    if stats[0]:
+        CACHE_OPERATIONS.inc(stats[0], route=route, result='hit')
+    if stats[1]:
+        CACHE_OPERATIONS.inc(stats[1], route=route, result='miss')
+
+
+# ---------------------------------------------------------------------------
+# Instantanés multi-processus
+# ---------------------------------------------------------------------------
+
+_last_flush = 0.0
+_flush_lock = threading.Lock()
+
+
+def _snapshot_path(directory, pid=None):
+    return os.path.join(directory, f"{pid or os.getpid()}.json")
+
+
+def _write_atomic(path, content):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _process_alive(pid):
+    """Le processus existe-t-il encore ? (toujours vrai sous Windows)"""
+    if os.name == 'nt':
+        # os.kill(pid, 0) y termine le processus au lieu de le sonder
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def flush(force=False):
+    """Écrit l'instantané du processus dans METRICS_DIR (au plus toutes les METRICS_FLUSH_INTERVAL s)"""
+    global _last_flush
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        return False
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 10):
+        return False
+    with _flush_lock:
+        _last_flush = now
+        try:
+            os.makedirs(directory, exist_ok=True)
+            _write_atomic(_snapshot_path(directory), json.dumps(registry.snapshot()))
+        except OSError as e:
+            logger.warning(f"Écriture des métriques impossible dans {directory}: {e}")
+            return False
+    return True
+
+
+def collect():
+    """Instantané de tous les processus (METRICS_DIR) ou du processus courant"""
+    directory = getattr(settings, 'METRICS_DIR', None)
+    snapshots = [registry.snapshot()]
+    if directory and os.path.isdir(directory):
+        own = _snapshot_path(directory)
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if not filename.endswith('.json') or path == own:
+                continue
+            pid = filename[:-len('.json')]
+            if pid.isdigit() and not _process_alive(int(pid)):
+                # Worker terminé : ses compteurs ne sont plus additionnés
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return merge_snapshots(snapshots)
+
+
+def write_textfile(path):
+    """Écrit l'exposition Prometheus dans un fichier (textfile collector de node-exporter)"""
+    _write_atomic(path, render(collect()))
+
+
+# ---------------------------------------------------------------------------
+# Requêtes HTTP
+# ---------------------------------------------------------------------------
+
+def get_route(request):
+    """Nom de la route résolue (cardinalité bornée) ; 'unresolved' pour les 404"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    """
+    Mesure chaque requête HTTP par route
+
+    À placer en tête de MIDDLEWARE (avant QueryBudgetMiddleware, dont les
+    statistiques SQL sont reprises via request.query_stats).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cache_stats = [0, 0]
+        token = _cache_stats.set(cache_stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _cache_stats.reset(token)
+        duration = time.perf_counter() - start
+
+        route = get_route(request)
+        method = request.method
+        REQUEST_DURATION.observe(duration, route=route, method=method, status=f"{response.status_code // 100}xx")
+
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            REQUEST_DB_DURATION.observe(stats.duration, route=route, method=method)
+            REQUEST_QUERIES.observe(stats.count, route=route, method=method)
+
+        if not response.streaming:
+            RESPONSE_SIZE.observe(len(response.content), route=route, method=method)
+
+        _record_cache_stats(route, cache_stats)
+        flush()
+        return response
+
+
+def metrics_view(request):
+    """
+    Exposition Prometheus (GET /metrics)
+
+    Accès : IP dans METRICS_ALLOWED_IPS (vide par défaut, boucle locale en
+    développement), ou en-tête ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorized = bool(token) and hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(), f'Bearer {token}'.encode()
+    )
+    if not authorized and request.META.get('REMOTE_ADDR') not in get_ip_list('METRICS_ALLOWED_IPS'):
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
+
+
+# ---------------------------------------------------------------------------
+# Tâches Celery
+# ---------------------------------------------------------------------------
+
+_running_tasks = {}
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    stack = ExitStack()
+    stats = stack.enter_context(record_queries())
+    cache_stats = [0, 0]
+    token = _cache_stats.set(cache_stats)
+    _running_tasks[task_id] = (stack, stats, cache_stats, token, time.perf_counter())
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    running = _running_tasks.pop(task_id, None)
+    if running is None:
+        return
+    stack, stats, cache_stats, token, start = running
+    stack.close()
+    try:
+        _cache_stats.reset(token)
+    except ValueError:
+        # Contexte différent (pool de threads) : rien à restaurer
+        pass
+
+    name = getattr(task, 'name', 'unknown')
+    TASK_DURATION.observe(time.perf_counter() - start, task=name, state=state or 'UNKNOWN')
+    TASK_DB_DURATION.observe(stats.duration, task=name)
+    TASK_QUERIES.observe(stats.count, task=name)
+    _record_cache_stats(f"task:{name}", cache_stats)
+    flush()
+
+
+def connect_celery_signals():
+    """Branche la mesure des tâches sur les signaux Celery (cf. config.celery)"""
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_task_prerun, weak=False, dispatch_uid='vida_metrics_prerun')
+    task_postrun.connect(_task_postrun, weak=False, dispatch_uid='vida_metrics_postrun')
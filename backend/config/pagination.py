@@ -1,9 +1,71 @@
 """
 Pagination personnalisée pour l'API
+
+- PageNumberPagination (Standard/Large/Small) : COUNT(*) et OFFSET à chaque
+  page, adaptée aux listes courtes ;
+- KeysetPagination : pagination par curseur sur un ordre indexé, pour les
+  grandes listes en ajout seul (logs d'audit, notifications, historique,
+  factures). Une page coûte un parcours d'index borné par page_size, quelle
+  que soit sa profondeur ; le total est optionnel (?count=estimated) et
+  estimé par PostgreSQL (pg_class.reltuples / planificateur).
 """
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
+# En dessous de ce nombre de lignes estimées, un COUNT(*) exact reste bon marché
+EXACT_COUNT_THRESHOLD = 1000
+
+
+def _reltuples(connection, table):
+    """Lignes estimées d'une table (partitions incluses) d'après pg_class"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)
+            FROM pg_class c
+            WHERE c.oid = %s::regclass
+               OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+            """,
+            [table, table]
+        )
+        return int(cursor.fetchone()[0])
+
+
+def _planner_rows(connection, queryset):
+    """Lignes estimées par le planificateur pour un queryset filtré"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_count(queryset):
+    """
+    Nombre de lignes d'un queryset, estimé sans COUNT(*) sur PostgreSQL
+
+    - queryset non filtré : pg_class.reltuples (mis à jour par ANALYZE) ;
+    - queryset filtré : estimation du planificateur (EXPLAIN) ;
+    - petites tables et autres bases : COUNT(*) exact.
+
+    Returns:
+        Tuple (nombre, estimé)
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        if queryset.query.where:
+            estimate = _planner_rows(connection, queryset)
+        else:
+            estimate = _reltuples(connection, queryset.model._meta.db_table)
+        if estimate >= EXACT_COUNT_THRESHOLD:
+            return estimate, True
+    return queryset.count(), False
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     """
@@ -63,3 +125,86 @@ class SmallResultsSetPagination(PageNumberPagination):
             'page_size': self.page_size,
             'results': data
         })
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Pagination par curseur (keyset) pour les grandes listes
+
+    L'ordre doit suivre un index existant, la clé primaire en dernier pour
+    départager les égalités. Seul le premier champ entre dans le curseur (les
+    égalités sur ce champ sont franchies par OFFSET) : il doit être immuable
+    et quasi unique, typiquement une date de création. Le total n'est calculé que sur demande
+    (?count=estimated), et seulement pour la première page.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        self.count_is_estimate = False
+        first_page = self.cursor_query_param not in request.query_params
+        if first_page and request.query_params.get(self.count_query_param) == 'estimated':
+            self.count, self.count_is_estimate = estimate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.page_size,
+            'results': data
+        }
+        if self.count is not None:
+            payload = {'count': self.count, 'count_is_estimate': self.count_is_estimate, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'].update({
+            'count': {'type': 'integer', 'nullable': True},
+            'count_is_estimate': {'type': 'boolean'},
+            'page_size': {'type': 'integer'},
+        })
+        return response_schema
+
+
+class NotificationPagination(KeysetPagination):
+    """Notifications d'un utilisateur : index (user, -created_at)"""
+    ordering = ('-created_at', '-id')
+
+
+class AppointmentHistoryPagination(KeysetPagination):
+    """Historique d'un rendez-vous : index (appointment, -created_at)"""
+    page_size = 50
+    ordering = ('-created_at', '-id')
+
+
+class InvoicePagination(KeysetPagination):
+    """Factures : index (-created_at)"""
+    ordering = ('-created_at', '-id')
+
+
+class AppointmentPagination(KeysetPagination):
+    """
+    Rendez-vous, derniers créés d'abord : index (-created_at)
+
+    Sur demande seulement (?pagination=cursor) : la liste garde par défaut la
+    pagination par numéro de page, triée par date et heure décroissantes.
+
+    CursorPagination ne place dans le curseur que le premier champ de l'ordre
+    (les égalités sont franchies par OFFSET) : ce champ doit être immuable et
+    quasi unique. date/time changent à l'acceptation ou à la contre-proposition
+    et se répètent d'un RDV à l'autre.
+    """
+    ordering = ('-created_at', '-id')
+
+
+class AuditLogPagination(KeysetPagination):
+    """Logs d'audit : index (-timestamp)"""
+    page_size = 50
+    max_page_size = 200
+    ordering = ('-timestamp', '-id')
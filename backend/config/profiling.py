@@ -0,0 +1,317 @@
+"""
+Profilage par échantillonnage des requêtes lentes
+
+Un thread d'échantillonnage unique relève, toutes les PROFILING_INTERVAL_MS,
+la pile des threads qui traitent une requête profilée (sys._current_frames) :
+aucun traçage des appels, coût indépendant de la profondeur du code.
+
+- PROFILING_ENABLED : toutes les requêtes sont échantillonnées, seules celles
+  qui dépassent PROFILING_THRESHOLD_MS sont enregistrées ;
+- en-tête ``X-Profile: 1`` envoyé par un membre du personnel : la requête est
+  enregistrée quelle que soit sa durée (même si PROFILING_ENABLED est faux).
+  L'utilisateur n'est connu qu'après l'échantillonnage (authentification DRF
+  dans la vue) : l'en-tête n'est donc honoré que si PROFILING_HEADER_ENABLED,
+  pour qu'un client anonyme ne puisse pas déclencher l'échantillonnage.
+
+Chaque profil est écrit dans PROFILING_DIR :
+- ``<horodatage>_<route>_<durée>ms.collapsed`` : piles repliées
+  (« frame;frame;frame N »), lisibles par flamegraph.pl / speedscope ;
+- ``<...>.json`` : route, chemin, statut, durée, échantillons et journal des
+  requêtes SQL (durée, SQL sans paramètres).
+La commande ``profiles`` liste et résume ces fichiers.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_QUERIES = 500
+_UNSAFE_FILENAME = re.compile(r'[^\w.-]+')
+
+# Libellé « fonction (fichier:ligne) » par objet code
+_frame_labels = {}
+
+
+def _frame_label(code):
+    label = _frame_labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        base_dir = str(getattr(settings, 'BASE_DIR', ''))
+        if base_dir and filename.startswith(base_dir):
+            filename = os.path.relpath(filename, base_dir)
+        elif 'site-packages' in filename:
+            filename = filename.split('site-packages' + os.sep, 1)[1]
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        _frame_labels[code] = label
+    return label
+
+
+def collapse_stack(frame):
+    """Pile repliée d'une frame, de la racine vers la frame courante"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """
+    Échantillonne périodiquement la pile des threads enregistrés
+
+    Un seul thread démon pour tout le processus ; il ne relève que les
+    threads qui ont appelé start() et pas encore stop().
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id=None):
+        thread_id = thread_id or threading.get_ident()
+        with self._lock:
+            self._stacks[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id=None):
+        """Arrête l'échantillonnage du thread et retourne ses piles (Counter)"""
+        with self._lock:
+            return self._stacks.pop(thread_id or threading.get_ident(), Counter())
+
+    def _run(self):
+        sampler_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._stacks:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, stacks in self._stacks.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != sampler_id:
+                        stacks[collapse_stack(frame)] += 1
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """Échantillonneur du processus (PROFILING_INTERVAL_MS)"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = StackSampler(getattr(settings, 'PROFILING_INTERVAL_MS', 5) / 1000)
+        return _sampler
+
+
+class QueryLog:
+    """execute_wrapper conservant le SQL et la durée des requêtes"""
+
+    def __init__(self, limit=MAX_LOGGED_QUERIES):
+        self.limit = limit
+        self.entries = []
+        self.dropped = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.entries) < self.limit:
+                self.entries.append({'sql': sql, 'ms': round((time.perf_counter() - start) * 1000, 3)})
+            else:
+                self.dropped += 1
+
+
+@contextmanager
+def profile_scope():
+    """
+    Échantillonne le thread courant et journalise ses requêtes SQL
+
+    Usage:
+        with profile_scope() as profile:
+            ...
+        profile['stacks'], profile['queries']
+    """
+    query_log = QueryLog()
+    profile = {'stacks': Counter(), 'queries': query_log.entries}
+    sampler = get_sampler()
+    sampler.start()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_log))
+            yield profile
+    finally:
+        profile['stacks'] = sampler.stop()
+        profile['queries_dropped'] = query_log.dropped
+
+
+def get_profiles_dir():
+    return str(getattr(settings, 'PROFILING_DIR', os.path.join(str(settings.BASE_DIR), 'logs', 'profiles')))
+
+
+def save_profile(profile, metadata, directory=None):
+    """
+    Écrit un profil (.collapsed + .json) et applique PROFILING_MAX_FILES
+
+    Returns:
+        Chemin du fichier .json
+    """
+    directory = directory or get_profiles_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    route = _UNSAFE_FILENAME.sub('_', metadata.get('route') or 'unresolved')[:80]
+    stem = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{route}_{int(metadata['duration_ms'])}ms"
+    base = os.path.join(directory, stem)
+
+    with open(f"{base}.collapsed", 'w', encoding='utf-8') as f:
+        for stack, count in profile['stacks'].most_common():
+            f.write(f"{stack} {count}\n")
+
+    metadata = {
+        **metadata,
+        'samples': sum(profile['stacks'].values()),
+        'interval_ms': getattr(settings, 'PROFILING_INTERVAL_MS', 5),
+        'query_count': len(profile['queries']) + profile.get('queries_dropped', 0),
+        'query_ms': round(sum(entry['ms'] for entry in profile['queries']), 3),
+        'queries': profile['queries'],
+        'collapsed': os.path.basename(f"{base}.collapsed"),
+    }
+    with open(f"{base}.json", 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=1)
+
+    _enforce_retention(directory, getattr(settings, 'PROFILING_MAX_FILES', 200))
+    return f"{base}.json"
+
+
+def _enforce_retention(directory, max_files):
+    profiles = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    for name in profiles[:max(len(profiles) - max_files, 0)]:
+        for extension in ('.json', '.collapsed'):
+            path = os.path.join(directory, name[:-len('.json')] + extension)
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def load_profiles(directory=None):
+    """Métadonnées des profils enregistrés, plus récents d'abord"""
+    directory = directory or get_profiles_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path, encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            continue
+        metadata['path'] = path
+        profiles.append(metadata)
+    return profiles
+
+
+def load_stacks(profile):
+    """Piles repliées d'un profil (Counter)"""
+    stacks = Counter()
+    path = os.path.join(os.path.dirname(profile['path']), profile['collapsed'])
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+
+def summarize_stacks(stacks, top=15):
+    """
+    Frames les plus présentes dans les échantillons
+
+    Returns:
+        Tuple (self, cumulé) : listes de (frame, échantillons) ; « self »
+        compte la frame au sommet de la pile, « cumulé » toute présence
+    """
+    own = Counter()
+    cumulative = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for frame in set(frames):
+            cumulative[frame] += count
+    return own.most_common(top), cumulative.most_common(top)
+
+
+def _is_staff(request):
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and getattr(user, 'is_medical_staff', False))
+
+
+class ProfilingMiddleware:
+    """
+    Profile les requêtes lentes (ou demandées par le personnel)
+
+    Configuration dans settings.py :
+        PROFILING_ENABLED = False      # échantillonner toutes les requêtes
+        PROFILING_HEADER_ENABLED = False  # honorer X-Profile: 1 (personnel)
+        PROFILING_THRESHOLD_MS = 1000  # durée à partir de laquelle on enregistre
+        PROFILING_INTERVAL_MS = 5      # période d'échantillonnage
+        PROFILING_DIR = BASE_DIR / 'logs' / 'profiles'
+        PROFILING_MAX_FILES = 200      # profils conservés
+    """
+
+    header = 'HTTP_X_PROFILE'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', False)
+        self.threshold_ms = getattr(settings, 'PROFILING_THRESHOLD_MS', 1000)
+        self.header_enabled = getattr(settings, 'PROFILING_HEADER_ENABLED', False)
+
+    def __call__(self, request):
+        requested = self.header_enabled and request.META.get(self.header) == '1'
+        if not (self.enabled or requested):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with profile_scope() as profile:
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        forced = requested and _is_staff(request)
+        if forced or (self.enabled and duration_ms >= self.threshold_ms):
+            match = getattr(request, 'resolver_match', None)
+            try:
+                path = save_profile(profile, {
+                    'route': match.view_name if match else None,
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': round(duration_ms, 1),
+                    'trigger': 'header' if forced else 'threshold',
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                })
+            except OSError as e:
+                logger.warning(f"Enregistrement du profil impossible: {e}")
+            else:
+                logger.info(f"Profil enregistré {request.method} {request.path} ({duration_ms:.0f} ms): {path}")
+        return response
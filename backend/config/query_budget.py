@@ -0,0 +1,195 @@
+"""
+Budget de requêtes SQL par vue et détection des N+1
+
+Chaque requête HTTP est instrumentée par un execute_wrapper : nombre de
+requêtes SQL, temps passé en base et empreintes des requêtes (SQL sans
+valeurs, listes IN réduites). Une même empreinte exécutée de nombreuses fois
+trahit un N+1 (accès à une relation non préchargée dans un serializer).
+
+Les vues DRF déclarent leur budget :
+    class AppointmentViewSet(viewsets.ModelViewSet):
+        query_budget = {'list': 6, 'history': 6}  # par action
+    class AuditLogListView(ListAPIView):
+        query_budget = 5  # toutes méthodes
+
+- QueryBudgetMiddleware : statistiques dans request.query_stats, en-têtes
+  X-Query-* si QUERY_BUDGET_HEADERS (DEBUG par défaut), avertissement dans
+  les logs en cas de dépassement ou de N+1 ; QueryBudgetExceeded levée si
+  QUERY_BUDGET_STRICT (tests) ;
+- assert_max_queries() : même contrôle dans un test, message détaillé.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'exécutions d'une même empreinte à partir duquel on signale un N+1
+DEFAULT_DUPLICATE_THRESHOLD = 5
+
+_IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)', re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Nombre de requêtes SQL supérieur au budget déclaré"""
+
+
+def fingerprint(sql):
+    """Empreinte d'une requête : SQL sans valeurs littérales, IN (...) réduit"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """
+    Statistiques SQL d'une portée (requête HTTP, bloc de test)
+
+    S'utilise comme execute_wrapper sur une ou plusieurs connexions.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicate_count(self):
+        """Exécutions redondantes (au-delà de la première par empreinte)"""
+        return sum(count - 1 for count in self.fingerprints.values() if count > 1)
+
+    def duplicates(self, threshold=2):
+        """Empreintes exécutées au moins ``threshold`` fois, les plus fréquentes d'abord"""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+    def summary(self, limit=3):
+        """Description courte pour les logs et les messages d'assertion"""
+        lines = [f"{self.count} requêtes SQL, {self.duration * 1000:.1f} ms"]
+        for sql, count in self.duplicates()[:limit]:
+            lines.append(f"  {count}x {sql[:200]}")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries(using=None):
+    """
+    Enregistre les requêtes SQL exécutées dans le bloc
+
+    Usage:
+        with record_queries() as stats:
+            ...
+        stats.count, stats.duration, stats.duplicates()
+    """
+    stats = QueryStats()
+    aliases = [using] if using else [connection.alias for connection in connections.all()]
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+        yield stats
+
+
+@contextmanager
+def assert_max_queries(budget, using=None):
+    """
+    Échoue si le bloc exécute plus de ``budget`` requêtes SQL
+
+    Usage (tests):
+        with assert_max_queries(4):
+            self.client.get(url)
+    """
+    with record_queries(using) as stats:
+        yield stats
+    if stats.count > budget:
+        raise QueryBudgetExceeded(f"Budget de {budget} requêtes dépassé : {stats.summary()}")
+
+
+def get_view_budget(view_func, method):
+    """
+    Budget déclaré par une vue DRF (attribut query_budget)
+
+    Returns:
+        Nombre maximum de requêtes, ou None si la vue n'en déclare pas
+    """
+    view_class = getattr(view_func, 'cls', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, 'actions', None) or {}
+        return budget.get(actions.get(method.lower(), method.lower()))
+    return budget
+
+
+class QueryBudgetMiddleware:
+    """
+    Mesure les requêtes SQL de chaque requête HTTP et applique les budgets
+
+    Configuration dans settings.py :
+        QUERY_BUDGET_HEADERS = DEBUG     # en-têtes X-Query-Count/-Time/-Duplicates
+        QUERY_BUDGET_STRICT = False      # lever QueryBudgetExceeded (tests)
+        QUERY_DUPLICATE_THRESHOLD = 5    # répétitions signalées comme N+1
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.headers = getattr(settings, 'QUERY_BUDGET_HEADERS', settings.DEBUG)
+        self.strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+        self.duplicate_threshold = getattr(
+            settings, 'QUERY_DUPLICATE_THRESHOLD', DEFAULT_DUPLICATE_THRESHOLD
+        )
+
+    def __call__(self, request):
+        request.query_budget = None
+        with record_queries() as stats:
+            request.query_stats = stats
+            response = self.get_response(request)
+
+        budget = request.query_budget
+        if self.headers:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-Query-Time'] = f"{stats.duration * 1000:.1f}"
+            response['X-Query-Duplicates'] = str(stats.duplicate_count)
+            if budget is not None:
+                response['X-Query-Budget'] = str(budget)
+
+        self.check(request, stats, budget)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_view_budget(view_func, request.method)
+        return None
+
+    def check(self, request, stats, budget):
+        """Signale un dépassement de budget ou des requêtes répétées (N+1)"""
+        extra = {
+            'path': request.path,
+            'query_count': stats.count,
+            'query_time': stats.duration,
+            'query_budget': budget,
+        }
+        if budget is not None and stats.count > budget:
+            message = f"Budget SQL dépassé {request.method} {request.path} ({budget}) : {stats.summary()}"
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra=extra)
+        elif stats.duplicates(self.duplicate_threshold):
+            logger.warning(
+                f"N+1 probable {request.method} {request.path} : {stats.summary()}",
+                extra=extra
+            )
@@ -0,0 +1,201 @@
+"""
+Moteur de rate limiting GCRA (Generic Cell Rate Algorithm)
+
+Remplace l'historique de timestamps de SimpleRateThrottle (une liste par clé,
+lue puis réécrite à chaque requête) par un état constant : l'heure théorique
+d'arrivée (TAT) de la prochaine requête. Pour un taux "N/période" :
+- intervalle d'émission T = période / N ;
+- une requête est acceptée si TAT - maintenant <= période - T, et TAT avance
+  de T ; sinon elle est refusée et le délai d'attente est exact.
+
+Le backend est choisi par le setting THROTTLE_BACKEND :
+- CacheGCRABackend : cache Django (dev/tests, un seul processus)
+- RedisGCRABackend : script Lua atomique, un aller-retour par contrôle,
+  horloge Redis commune à tous les workers
+
+GCRAThrottleMixin se place devant n'importe quel throttle DRF dérivé de
+SimpleRateThrottle : get_cache_key() et les taux (DEFAULT_THROTTLE_RATES)
+restent inchangés.
+"""
+import math
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.throttling import SimpleRateThrottle
+
+DEFAULT_THROTTLE_BACKEND = 'config.rate_limit.CacheGCRABackend'
+
+
+class BaseRateLimitBackend:
+    """Interface commune des backends GCRA."""
+
+    def consume(self, key, limit, period):
+        """
+        Consomme une requête pour la clé si le taux le permet.
+
+        Returns:
+            Tuple (acceptée, secondes avant la prochaine requête acceptée)
+        """
+        raise NotImplementedError
+
+    def get_tat(self, key):
+        """Retourne (TAT, maintenant) pour une clé (TAT None si inconnue)."""
+        raise NotImplementedError
+
+    def get_status(self, key, limit, period):
+        """
+        État d'une clé sans consommer de requête.
+
+        Returns:
+            Dictionnaire {'remaining', 'reset_time'} (reset_time : timestamp
+            auquel le quota est de nouveau complet)
+        """
+        tat, now = self.get_tat(key)
+        backlog = max((tat or now) - now, 0)
+        interval = period / limit
+        remaining = min(max(math.floor((period - backlog) / interval + 1e-9), 0), limit)
+        return {
+            'remaining': remaining,
+            'reset_time': int(time.time() + backlog),
+        }
+
+
+def gcra_step(tat, now, limit, period):
+    """
+    Une étape GCRA.
+
+    Returns:
+        Tuple (acceptée, nouveau TAT, délai d'attente)
+    """
+    interval = period / limit
+    new_tat = max(tat or now, now) + interval
+    allow_at = new_tat - period
+    if now < allow_at:
+        return False, tat, allow_at - now
+    return True, new_tat, 0
+
+
+class CacheGCRABackend(BaseRateLimitBackend):
+    """
+    GCRA stocké dans le cache Django (une valeur flottante par clé).
+
+    Lecture puis écriture non atomiques : suffisant en développement et en
+    tests ; en production multi-workers, utiliser RedisGCRABackend.
+    """
+
+    def _now(self):
+        return time.time()
+
+    def consume(self, key, limit, period):
+        now = self._now()
+        allowed, tat, wait = gcra_step(cache.get(key), now, limit, period)
+        if allowed:
+            cache.set(key, tat, max(math.ceil(tat - now), 1))
+        return allowed, wait
+
+    def get_tat(self, key):
+        return cache.get(key), self._now()
+
+
+class RedisGCRABackend(BaseRateLimitBackend):
+    """
+    GCRA dans Redis : un script Lua lit, décide et écrit en un aller-retour.
+
+    L'heure vient de Redis (TIME) : pas de dérive entre les horloges des
+    workers. La clé expire d'elle-même quand le quota est de nouveau complet.
+    """
+
+    KEY_PREFIX = 'vida:throttle'
+
+    # ARGV : intervalle d'émission, période (secondes)
+    # Retourne {1|0, délai d'attente} (chaînes : Lua tronque les nombres)
+    CONSUME_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = now
+local stored = redis.call('GET', KEYS[1])
+if stored then
+    tat = math.max(tonumber(stored), now)
+end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0'}
+"""
+
+    def __init__(self, alias='default'):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection(alias)
+        self._consume = self.client.register_script(self.CONSUME_SCRIPT)
+
+    def _key(self, key):
+        return f"{self.KEY_PREFIX}:{key}"
+
+    def consume(self, key, limit, period):
+        allowed, wait = self._consume(keys=[self._key(key)], args=[period / limit, period])
+        return bool(int(allowed)), float(wait)
+
+    def get_tat(self, key):
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.get(self._key(key))
+        pipeline.time()
+        stored, (seconds, microseconds) = pipeline.execute()
+        return (float(stored) if stored is not None else None), seconds + microseconds / 1000000
+
+
+@lru_cache(maxsize=None)
+def get_rate_limit_backend():
+    """Retourne l'instance du backend configuré par THROTTLE_BACKEND."""
+    backend_path = getattr(settings, 'THROTTLE_BACKEND', DEFAULT_THROTTLE_BACKEND)
+    return import_string(backend_path)()
+
+
+@receiver(setting_changed)
+def _reset_rate_limit_backend(setting, **kwargs):
+    if setting == 'THROTTLE_BACKEND':
+        get_rate_limit_backend.cache_clear()
+
+
+class GCRAThrottleMixin:
+    """
+    Remplace le stockage d'historique de SimpleRateThrottle par GCRA.
+
+    À placer avant la classe DRF dans les bases :
+        class MyThrottle(GCRAThrottleMixin, AnonRateThrottle): ...
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, self._wait = get_rate_limit_backend().consume(
+            self.key, self.num_requests, self.duration
+        )
+        if allowed:
+            return self.throttle_success()
+        return self.throttle_failure()
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class GCRARateThrottle(GCRAThrottleMixin, SimpleRateThrottle):
+    """Équivalent GCRA de SimpleRateThrottle (base des throttles avancés)."""
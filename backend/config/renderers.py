@@ -0,0 +1,144 @@
+"""
+Renderer JSON rapide pour les réponses de l'API
+
+FastJSONRenderer sérialise avec orjson lorsqu'il est installé (encodeur natif :
+datetime, date, time, UUID, sous-classes de dict/list comme ReturnDict),
+sinon avec le json de la bibliothèque standard. Les deux backends produisent
+un JSON compact, UTF-8, où <, >, & et U+2028/U+2029 sont échappés en \\uXXXX :
+la réponse reste sûre si elle est injectée dans une page HTML. orjson n'offre
+pas de point d'extension pour l'encodage des chaînes : l'échappement est une
+passe sur le résultat encodé (bytes.replace, sans copie si aucun caractère
+n'est présent ; str.translate pour le json standard).
+
+Cas limites alignés : NaN et Infinity (non représentables en JSON) sont
+écrits null, comme le fait orjson ; les entiers au-delà de 64 bits, refusés
+par orjson, sont sérialisés par le json standard.
+
+Le backend est choisi par le setting JSON_RENDERER_BACKEND ('auto', 'orjson'
+ou 'stdlib').
+"""
+import json
+import math
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Dépendance optionnelle
+    orjson = None
+
+# Caractères échappés dans le JSON produit (HTML / JavaScript)
+HTML_ESCAPES = (
+    ('<', '\\u003c'),
+    ('>', '\\u003e'),
+    ('&', '\\u0026'),
+    ('\u2028', '\\u2028'),
+    ('\u2029', '\\u2029'),
+)
+_HTML_ESCAPES_BYTES = tuple(
+    (char.encode('utf-8'), escaped.encode('ascii')) for char, escaped in HTML_ESCAPES
+)
+_HTML_ESCAPES_TABLE = str.maketrans(dict(HTML_ESCAPES))
+
+
+def escape_html_bytes(content):
+    """
+    Échappe les caractères HTML sensibles d'un JSON encodé en UTF-8.
+
+    Ces caractères ne peuvent apparaître que dans des chaînes JSON : le
+    remplacement direct sur les octets est sûr, et ne copie rien quand le
+    caractère est absent (cas le plus fréquent).
+    """
+    for char, escaped in _HTML_ESCAPES_BYTES:
+        if char in content:
+            content = content.replace(char, escaped)
+    return content
+
+
+class HTMLSafeJSONEncoder(JSONEncoder):
+    """Encodeur stdlib (types DRF) qui échappe les caractères HTML sensibles"""
+
+    def encode(self, obj):
+        return super().encode(obj).translate(_HTML_ESCAPES_TABLE)
+
+
+def _default(obj):
+    """Types non natifs pour orjson (Decimal, lazy strings, QuerySet...)"""
+    return JSONEncoder().default(obj)
+
+
+def _replace_non_finite(data):
+    """Remplace NaN et Infinity par None (copie des listes et dictionnaires)"""
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {key: _replace_non_finite(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_replace_non_finite(item) for item in data]
+    return data
+
+
+def _stdlib_dumps(data, indent=None):
+    return json.dumps(
+        data,
+        cls=HTMLSafeJSONEncoder,
+        indent=indent,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(',', ':') if indent is None else (',', ': '),
+    )
+
+
+def get_json_backend():
+    """Retourne 'orjson' ou 'stdlib' selon JSON_RENDERER_BACKEND et l'installation"""
+    backend = getattr(settings, 'JSON_RENDERER_BACKEND', 'auto')
+    if backend == 'stdlib' or orjson is None:
+        return 'stdlib'
+    return 'orjson'
+
+
+def dumps(data, indent=None):
+    """
+    Sérialise en JSON UTF-8 (bytes), échappement HTML inclus
+
+    Args:
+        data: Données à sérialiser
+        indent: Indentation (non supportée par orjson : stdlib dans ce cas)
+    """
+    if indent is None and get_json_backend() == 'orjson':
+        try:
+            content = orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z,
+            )
+            return escape_html_bytes(content)
+        except orjson.JSONEncodeError:
+            # Entier au-delà de 64 bits : le json standard le sérialise
+            pass
+
+    try:
+        content = _stdlib_dumps(data, indent)
+    except ValueError:
+        # NaN / Infinity (rare) : null, comme orjson
+        content = _stdlib_dumps(_replace_non_finite(data), indent)
+    return content.encode('utf-8')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renderer JSON de l'API : orjson si disponible, échappement HTML
+    appliqué au JSON encodé (cf. escape_html_bytes)
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = None
+        if renderer_context is not None:
+            indent = self.get_indent(accepted_media_type, renderer_context)
+
+        return dumps(data, indent=indent)
@@ -9,5 +9,7 @@ environment = os.environ.get("DJANGO_ENV", "development")
 
 if environment == "production":
     from .production import *
+elif environment == "loadtest":
+    from .loadtest import *
 else:
     from .development import *
@@ -61,6 +61,10 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "config.metrics.MetricsMiddleware",  # Latence, temps DB, cache et taille par route (Prometheus)
+    "config.profiling.ProfilingMiddleware",  # Échantillonnage des piles des requêtes lentes (opt-in)
+    "config.timeouts.TimeoutMiddleware",  # Échéance par requête (threads/ASGI, sans signal.alarm)
+    "config.query_budget.QueryBudgetMiddleware",  # Requêtes SQL par vue, budgets et détection N+1
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -75,7 +79,6 @@ MIDDLEWARE = [
     "config.sentry_middleware.SentryContextMiddleware",  # Contexte Sentry (si activé)
     "config.audit_middleware.AuditMiddleware",  # Audit trail automatique
     "config.audit_middleware.FailedLoginMiddleware",  # Logging des échecs de connexion
-    # "config.timeouts.TimeoutMiddleware",  # Timeout requêtes (Unix uniquement - décommenter en production avec gunicorn)
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -170,7 +173,7 @@ REST_FRAMEWORK = {
         "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_RENDERER_CLASSES": [
-        "config.json_validators.SafeJSONRenderer",
+        "config.renderers.FastJSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",
     ],
     "DEFAULT_THROTTLE_CLASSES": [
@@ -208,10 +211,14 @@ REST_FRAMEWORK = {
 # =============================================================================
 # ADVANCED THROTTLING (FIX #29)
 # =============================================================================
-# Whitelist d'IPs (pas de rate limiting)
+# Stockage GCRA des throttles (cf. config.rate_limit) : cache Django par défaut,
+# script Lua Redis en production
+THROTTLE_BACKEND = "config.rate_limit.CacheGCRABackend"
+
+# Whitelist d'IPs (pas de rate limiting) - IPs ou réseaux CIDR (cf. config.ip_matcher)
 THROTTLE_WHITELIST_IPS = [
     '127.0.0.1',  # Localhost
-    # Ajouter les IPs de confiance (monitoring, CI/CD, etc.)
+    # Ajouter les IPs/réseaux de confiance (monitoring, CI/CD, ex: '10.0.0.0/8')
 ]
 
 # Whitelist d'utilisateurs (emails)
@@ -220,9 +227,9 @@ THROTTLE_WHITELIST_USERS = [
     # Les staff sont automatiquement whitelistés
 ]
 
-# Blacklist d'IPs (toujours throttlé)
+# Blacklist d'IPs (toujours throttlé) - IPs ou réseaux CIDR
 THROTTLE_BLACKLIST_IPS = [
-    # Ajouter les IPs malveillantes
+    # Ajouter les IPs/réseaux malveillants (ex: '203.0.113.0/24')
 ]
 
 # Blacklist d'utilisateurs (emails)
@@ -230,6 +237,11 @@ THROTTLE_BLACKLIST_USERS = [
     # Ajouter les emails des utilisateurs malveillants
 ]
 
+# Détection de force brute (compteurs glissants, cf. apps.users.security_counters)
+SECURITY_BRUTE_FORCE_WINDOW = 900  # Fenêtre d'observation (secondes, max 3600)
+SECURITY_BRUTE_FORCE_IP_THRESHOLD = 20  # Échecs de connexion par IP
+SECURITY_BRUTE_FORCE_USERNAME_THRESHOLD = 10  # Échecs de connexion par identifiant
+
 # =============================================================================
 # FIELD LIMITING (FIX #30)
 # =============================================================================
@@ -245,6 +257,14 @@ MAX_REQUEST_KEYS = 100
 # Profondeur maximale d'une requête JSON
 MAX_REQUEST_DEPTH = 5
 
+# Limites appliquées pendant le décodage du corps JSON (StrictJSONParser)
+JSON_MAX_DEPTH = 10
+JSON_MAX_ELEMENTS = 1000
+
+# Sérialisation des réponses (FastJSONRenderer) : 'auto' (orjson si installé),
+# 'orjson' ou 'stdlib'
+JSON_RENDERER_BACKEND = 'auto'
+
 # Nombre maximum de champs dans sparse fieldsets
 MAX_SPARSE_FIELDS = 50
 
@@ -401,6 +421,7 @@ CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 # TIMEOUTS (Protection contre requêtes longues)
 # =============================================================================
 REQUEST_TIMEOUT = 30  # Timeout global pour requêtes HTTP (secondes)
+REQUEST_OFFLOAD_THRESHOLD = 0.8  # Part du budget au-delà de laquelle une requête est signalée (cf. config.timeouts)
 
 # Timeouts pour requêtes HTTP externes (requests library)
 HTTP_TIMEOUT_CONNECT = 5  # Timeout de connexion
@@ -413,6 +434,59 @@ DATABASE_TIMEOUT_LONG = 60  # Pour requêtes complexes (rapports, etc.)
 # Timeout pour uploads
 UPLOAD_TIMEOUT = 120  # 2 minutes pour uploads de fichiers
 
+# =============================================================================
+# BUDGET DE REQUÊTES SQL (cf. config.query_budget)
+# =============================================================================
+# QUERY_BUDGET_HEADERS : en-têtes X-Query-Count / -Time / -Duplicates (défaut : DEBUG)
+QUERY_BUDGET_STRICT = False  # Lever QueryBudgetExceeded si une vue dépasse son budget (tests)
+QUERY_DUPLICATE_THRESHOLD = 5  # Répétitions d'une même requête signalées comme N+1
+
+# =============================================================================
+# MÉTRIQUES (format Prometheus, cf. config.metrics)
+# =============================================================================
+# IPs / réseaux autorisés sur /metrics. Vide par défaut : derrière un proxy local
+# (SECURE_PROXY_SSL_HEADER), toutes les requêtes publiques arrivent de 127.0.0.1
+METRICS_ALLOWED_IPS = []
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # Sinon : Authorization: Bearer <jeton>
+METRICS_DIR = config('METRICS_DIR', default='')  # Instantanés multi-processus (gunicorn, Celery)
+METRICS_FLUSH_INTERVAL = 10  # Secondes entre deux instantanés d'un processus
+METRICS_TEXTFILE = config('METRICS_TEXTFILE', default='')  # Fichier .prom pour node-exporter
+
+# =============================================================================
+# PROFILAGE DES REQUÊTES LENTES (cf. config.profiling)
+# =============================================================================
+# Indépendamment de PROFILING_ENABLED, l'en-tête « X-Profile: 1 » envoyé par
+# un membre du personnel enregistre le profil de la requête, si
+# PROFILING_HEADER_ENABLED : l'échantillonnage démarre avant l'authentification,
+# tout client qui envoie l'en-tête en paie le coût
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)  # Échantillonner toutes les requêtes
+PROFILING_HEADER_ENABLED = config('PROFILING_HEADER_ENABLED', default=False, cast=bool)  # Honorer X-Profile: 1
+PROFILING_THRESHOLD_MS = config('PROFILING_THRESHOLD_MS', default=1000, cast=int)  # Durée minimale enregistrée
+PROFILING_INTERVAL_MS = 5  # Période d'échantillonnage des piles
+PROFILING_DIR = BASE_DIR / 'logs' / 'profiles'  # Fichiers .collapsed (flamegraph) et .json
+PROFILING_MAX_FILES = 200  # Profils conservés (les plus anciens sont supprimés)
+
+# =============================================================================
+# VERROUILLAGE DES CRÉNEAUX
+# =============================================================================
+# Backend de verrouillage temporaire pendant la réservation
+# (DatabaseSlotLockBackend ou RedisSlotLockBackend)
+SLOT_LOCK_BACKEND = "apps.appointments.locks.DatabaseSlotLockBackend"
+SLOT_LOCK_TTL = 300  # 5 minutes
+
+# =============================================================================
+# AUDIT TRAIL
+# =============================================================================
+# Écriture différée des AuditLog / LoginAttempt : file bornée en mémoire,
+# vidée par un thread d'arrière-plan avec bulk_create (cf. apps.users.audit_sink)
+AUDIT_ASYNC_WRITES = True
+AUDIT_BATCH_SIZE = 100  # Lignes par bulk_create
+AUDIT_FLUSH_INTERVAL = 2.0  # Secondes max avant écriture d'un lot incomplet
+AUDIT_BUFFER_SIZE = 10000  # Taille max de la file (au-delà : écriture synchrone)
+AUDIT_ENQUEUE_TIMEOUT = 0.05  # Attente max (s) d'une place dans la file pleine
+# Partitions mensuelles créées à l'avance (PostgreSQL, cf. apps.users.partitioning)
+AUDIT_PARTITION_MONTHS_AHEAD = 3
+
 # =============================================================================
 # CHANNELS (WebSocket)
 # =============================================================================
@@ -528,6 +602,7 @@ AUTHENTICATION_BACKENDS = [
 # =============================================================================
 HCAPTCHA_SECRET_KEY = config('HCAPTCHA_SECRET_KEY', default='')
 HCAPTCHA_SITE_KEY = config('HCAPTCHA_SITE_KEY', default='')
+HCAPTCHA_STUB = False  # Accepter tout jeton non vide sans appeler hCaptcha (pile de test de charge uniquement)
 
 # =============================================================================
 # SENTRY (Monitoring & Error Tracking)
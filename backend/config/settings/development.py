@@ -19,7 +19,7 @@ DATABASES = {
 # Cache (Local memory for dev - Redis not required)
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "config.cache_backends.InstrumentedLocMemCache",
         "LOCATION": "unique-snowflake",
     }
 }
@@ -64,6 +64,9 @@ INSTALLED_APPS += ["debug_toolbar"]
 MIDDLEWARE.insert(0, "debug_toolbar.middleware.DebugToolbarMiddleware")
 INTERNAL_IPS = ["127.0.0.1"]
 
+# Métriques Prometheus (/metrics) accessibles en local sans jeton
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+
 # Email (Console backend for dev)
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
@@ -0,0 +1,104 @@
+"""
+Django settings de la pile locale de test de charge (DJANGO_ENV=loadtest).
+
+Configuration proche de la production (DEBUG désactivé, mêmes throttles)
+où les services externes sont remplacés par des doublures locales :
+- hCaptcha : tout jeton non vide est accepté (HCAPTCHA_STUB) ;
+- SMTP : emails ignorés (backend dummy) ;
+- Celery : tâches exécutées dans le processus si aucun broker n'est fourni ;
+- PostgreSQL / Redis : utilisés si DB_NAME / REDIS_URL sont définis, sinon
+  SQLite et cache mémoire (compteurs de throttling propres à chaque worker).
+
+Usage:
+    DJANGO_ENV=loadtest python manage.py migrate
+    DJANGO_ENV=loadtest gunicorn config.wsgi -w 4
+    DJANGO_ENV=loadtest python manage.py loadtest --create-accounts --password <mdp> --concurrency 50
+"""
+
+from .base import *
+
+# SECURITY
+DEBUG = False
+ALLOWED_HOSTS = ["localhost", "127.0.0.1", "0.0.0.0"]
+
+# Database
+if config("DB_NAME", default=""):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": config("DB_NAME"),
+            "USER": config("DB_USER", default="postgres"),
+            "PASSWORD": config("DB_PASSWORD", default=""),
+            "HOST": config("DB_HOST", default="localhost"),
+            "PORT": config("DB_PORT", default="5432"),
+            "CONN_MAX_AGE": 60,
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "loadtest.sqlite3",
+            # Attente du verrou d'écriture : limite les « database is locked » sans
+            # les supprimer (écritures sérialisées) ; dimensionner sur PostgreSQL
+            "OPTIONS": {"timeout": 20},
+        }
+    }
+
+# Cache, verrous de créneaux et throttling
+REDIS_URL = config("REDIS_URL", default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "config.cache_backends.InstrumentedRedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+        }
+    }
+    SLOT_LOCK_BACKEND = "apps.appointments.locks.RedisSlotLockBackend"
+    THROTTLE_BACKEND = "config.rate_limit.RedisGCRABackend"
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "config.cache_backends.InstrumentedLocMemCache",
+            "LOCATION": "loadtest",
+        }
+    }
+
+# Throttles avancés (config.advanced_throttling) en plus des throttles par défaut,
+# pour évaluer leur effet avant de les activer en production
+if config("LOADTEST_ADVANCED_THROTTLING", default=False, cast=bool):
+    REST_FRAMEWORK["DEFAULT_THROTTLE_CLASSES"] = REST_FRAMEWORK["DEFAULT_THROTTLE_CLASSES"] + [
+        "config.advanced_throttling.CombinedRateThrottle",
+        "config.advanced_throttling.BurstProtectionThrottle",
+    ]
+
+# Celery
+CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="memory://")
+CELERY_TASK_ALWAYS_EAGER = CELERY_BROKER_URL == "memory://"
+
+# Channels (WebSocket)
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    },
+}
+
+# Doublures des services externes
+HCAPTCHA_STUB = True
+EMAIL_BACKEND = "django.core.mail.backends.dummy.EmailBackend"
+
+# Cookies - HTTP en local
+SIMPLE_JWT["AUTH_COOKIE_SECURE"] = False
+CSRF_COOKIE_SECURE = False
+SESSION_COOKIE_SECURE = False
+
+FRONTEND_URL = "http://localhost:3000"
+
+# Métriques Prometheus (/metrics) lisibles en local pendant le test
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+
+# Logging level (les logs par requête fausseraient les mesures)
+LOGGING["root"]["level"] = "WARNING"
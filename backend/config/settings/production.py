@@ -39,7 +39,7 @@ DATABASES = {
 # Cache (Redis)
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        "BACKEND": "config.cache_backends.InstrumentedRedisCache",
         "LOCATION": config("REDIS_URL"),
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
@@ -48,6 +48,12 @@ CACHES = {
     }
 }
 
+# Verrous de créneaux dans Redis (SET NX + TTL, pas de purge de table)
+SLOT_LOCK_BACKEND = "apps.appointments.locks.RedisSlotLockBackend"
+
+# Throttling GCRA dans Redis (script Lua atomique, un aller-retour par contrôle)
+THROTTLE_BACKEND = "config.rate_limit.RedisGCRABackend"
+
 # Celery
 CELERY_BROKER_URL = config("CELERY_BROKER_URL")
 
@@ -1,11 +1,14 @@
 """
 Throttling personnalisé pour l'API VIDA
 Protection contre le scraping, spam et abus
+Comptage GCRA à état constant (cf. config.rate_limit)
 """
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 
+from config.rate_limit import GCRAThrottleMixin
 
-class BurstAnonRateThrottle(AnonRateThrottle):
+
+class BurstAnonRateThrottle(GCRAThrottleMixin, AnonRateThrottle):
     """
     Throttle pour les pics de requêtes anonymes
     Limite stricte sur une courte période
@@ -13,7 +16,7 @@ class BurstAnonRateThrottle(AnonRateThrottle):
     scope = 'burst_anon'
 
 
-class SustainedAnonRateThrottle(AnonRateThrottle):
+class SustainedAnonRateThrottle(GCRAThrottleMixin, AnonRateThrottle):
     """
     Throttle pour les requêtes anonymes soutenues
     Limite plus large sur une longue période
@@ -21,21 +24,21 @@ class SustainedAnonRateThrottle(AnonRateThrottle):
     scope = 'sustained_anon'
 
 
-class BurstUserRateThrottle(UserRateThrottle):
+class BurstUserRateThrottle(GCRAThrottleMixin, UserRateThrottle):
     """
     Throttle pour les pics de requêtes utilisateurs authentifiés
     """
     scope = 'burst_user'
 
 
-class SustainedUserRateThrottle(UserRateThrottle):
+class SustainedUserRateThrottle(GCRAThrottleMixin, UserRateThrottle):
     """
     Throttle pour les requêtes utilisateurs authentifiés soutenues
     """
     scope = 'sustained_user'
 
 
-class ContactRateThrottle(AnonRateThrottle):
+class ContactRateThrottle(GCRAThrottleMixin, AnonRateThrottle):
     """
     Throttle spécifique pour le formulaire de contact
     Limite stricte pour éviter le spam
@@ -43,7 +46,7 @@ class ContactRateThrottle(AnonRateThrottle):
     scope = 'contact'
 
 
-class AppointmentRateThrottle(AnonRateThrottle):
+class AppointmentRateThrottle(GCRAThrottleMixin, AnonRateThrottle):
     """
     Throttle spécifique pour la création de rendez-vous
     Limite pour éviter les réservations abusives
@@ -51,7 +54,7 @@ class AppointmentRateThrottle(AnonRateThrottle):
     scope = 'appointment'
 
 
-class SlotsRateThrottle(AnonRateThrottle):
+class SlotsRateThrottle(GCRAThrottleMixin, AnonRateThrottle):
     """
     Throttle pour la consultation des créneaux disponibles
     Évite le scraping massif des disponibilités
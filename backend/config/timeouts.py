@@ -1,13 +1,33 @@
 """
 Configuration des timeouts pour protéger contre les requêtes longues
+
+Chaque requête reçoit une échéance (Deadline) propagée par contextvar :
+compatible workers threadés (gunicorn --threads), ASGI (daphne) et Celery,
+contrairement à signal.alarm (thread principal uniquement, interruption à
+un point arbitraire du code).
+
+L'échéance est appliquée aux points sûrs :
+- requêtes SQL : statement_timeout (PostgreSQL) / max_execution_time (MySQL)
+  ajusté au budget restant via un execute_wrapper, et refus d'exécuter une
+  requête une fois le budget épuisé ;
+- appels HTTP sortants (make_request) : timeouts bornés au budget restant ;
+- code applicatif : Deadline.check() entre deux étapes coûteuses.
+Une requête qui consomme l'essentiel de son budget est signalée dans les
+logs comme candidate à un traitement asynchrone (Celery).
 """
-import signal
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
 from functools import wraps
 from django.conf import settings
-from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, OperationalError, connections
+from django.http import JsonResponse
 from rest_framework.exceptions import APIException
 from rest_framework import status
 
+logger = logging.getLogger(__name__)
+
 
 class RequestTimeoutError(APIException):
     """Exception levée quand une requête dépasse le timeout"""
@@ -16,43 +36,213 @@ class RequestTimeoutError(APIException):
     default_code = 'request_timeout'
 
 
+_current_deadline = ContextVar('request_deadline', default=None)
+
+# Écart toléré (ms) entre le timeout SQL appliqué et le budget restant avant
+# de le réajuster : évite un SET avant chaque requête
+STATEMENT_TIMEOUT_SLACK_MS = 1000
+
+# (réglage, réinitialisation) du timeout de requête par SGBD
+STATEMENT_TIMEOUT_SQL = {
+    'postgresql': ('SET statement_timeout = %d', 'RESET statement_timeout'),
+    'mysql': ('SET SESSION max_execution_time = %d', 'SET SESSION max_execution_time = DEFAULT'),
+}
+
+
+class Deadline:
+    """
+    Échéance d'exécution (horloge monotone)
+    
+    Une échéance imbriquée ne peut pas dépasser celle qui la contient.
+    """
+    
+    def __init__(self, timeout, parent=None):
+        self.timeout = timeout
+        self.started = time.monotonic()
+        self.expires_at = self.started + timeout
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+    
+    def remaining(self):
+        """Budget restant en secondes (0 si dépassé)"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+    
+    def elapsed(self):
+        """Temps écoulé depuis le début en secondes"""
+        return time.monotonic() - self.started
+    
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+    
+    def check(self):
+        """Lève RequestTimeoutError si l'échéance est dépassée"""
+        if self.expired:
+            raise RequestTimeoutError()
+    
+    def clamp(self, timeout):
+        """Borne un timeout (secondes, None = illimité) au budget restant"""
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+def get_current_deadline():
+    """Retourne l'échéance courante (None hors requête / hors deadline_scope)"""
+    return _current_deadline.get()
+
+
+class DeadlineQueryWrapper:
+    """
+    execute_wrapper appliquant l'échéance courante aux requêtes SQL
+    d'une connexion
+    """
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.applied_ms = None
+        self._transaction_marker = None
+    
+    def __call__(self, execute, sql, params, many, context):
+        deadline = get_current_deadline()
+        if deadline is None:
+            return execute(sql, params, many, context)
+        
+        deadline.check()
+        self._apply_statement_timeout(context['cursor'], deadline)
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as e:
+            # Requête annulée par le SGBD faute de budget
+            if deadline.expired:
+                raise RequestTimeoutError() from e
+            raise
+    
+    def _apply_statement_timeout(self, cursor, deadline):
+        statements = STATEMENT_TIMEOUT_SQL.get(self.connection.vendor)
+        if statements is None:
+            return
+        
+        # 0 désactive le timeout côté SGBD : au moins 1 ms
+        remaining_ms = max(int(deadline.remaining() * 1000), 1)
+        if self._rolled_back():
+            self.applied_ms = None
+        if self.applied_ms is not None and self.applied_ms <= remaining_ms + STATEMENT_TIMEOUT_SLACK_MS:
+            return
+        
+        # Curseur DB-API brut : ne repasse pas par les execute_wrappers
+        cursor.cursor.execute(statements[0] % remaining_ms)
+        self.applied_ms = remaining_ms
+        self._transaction_marker = None
+        if self.connection.in_atomic_block:
+            # Un SET exécuté dans une transaction est annulé par son rollback
+            # (ou celui du savepoint) : un callback on_commit sert de témoin
+            def committed():
+                if self._transaction_marker is committed:
+                    self._transaction_marker = None
+            self._transaction_marker = committed
+            self.connection.on_commit(committed)
+    
+    def _rolled_back(self):
+        """Indique si le dernier SET a été annulé par un rollback"""
+        marker = self._transaction_marker
+        if marker is None:
+            return False
+        # Toujours dans la transaction et savepoint non annulé : callback en attente
+        if self.connection.in_atomic_block and any(
+            entry[1] is marker for entry in self.connection.run_on_commit
+        ):
+            return False
+        # Transaction terminée sans commit (le callback aurait retiré le témoin)
+        self._transaction_marker = None
+        return True
+    
+    def reset(self):
+        """Restaure le timeout par défaut de la connexion (connexions persistantes)"""
+        if self._rolled_back():
+            self.applied_ms = None
+        if self.applied_ms is None:
+            return
+        self.applied_ms = None
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(STATEMENT_TIMEOUT_SQL[self.connection.vendor][1])
+        except DatabaseError as e:
+            logger.warning(f"Réinitialisation du timeout SQL impossible: {e}")
+
+
+@contextmanager
+def deadline_scope(timeout):
+    """
+    Exécute un bloc avec une échéance de ``timeout`` secondes
+    
+    La première échéance installe le contrôle des requêtes SQL sur toutes les
+    connexions ; une échéance imbriquée ne fait que resserrer le budget.
+    
+    Usage:
+        with deadline_scope(10) as deadline:
+            ...
+            deadline.check()
+    """
+    parent = get_current_deadline()
+    deadline = Deadline(timeout, parent=parent)
+    token = _current_deadline.set(deadline)
+    wrappers = []
+    try:
+        with ExitStack() as stack:
+            if parent is None:
+                for connection in connections.all():
+                    wrapper = DeadlineQueryWrapper(connection)
+                    stack.enter_context(connection.execute_wrapper(wrapper))
+                    wrappers.append(wrapper)
+            yield deadline
+    finally:
+        for wrapper in wrappers:
+            wrapper.reset()
+        _current_deadline.reset(token)
+
+
 class TimeoutMiddleware:
     """
     Middleware pour limiter le temps d'exécution des requêtes
     
+    Chaque requête s'exécute dans un deadline_scope (request.deadline) :
+    aucune dépendance à signal.alarm, fonctionne en threads et en ASGI.
+    
     Configuration dans settings.py :
         REQUEST_TIMEOUT = 30  # secondes (défaut: 30)
+        REQUEST_OFFLOAD_THRESHOLD = 0.8  # part du budget au-delà de laquelle
+                                         # la requête est signalée (Celery)
     """
     
     def __init__(self, get_response):
         self.get_response = get_response
         self.timeout = getattr(settings, 'REQUEST_TIMEOUT', 30)
-        
-        # Vérifier si signal.alarm est disponible (Unix uniquement)
-        if not hasattr(signal, 'alarm'):
-            # Sur Windows, désactiver ce middleware
-            raise MiddlewareNotUsed(
-                "TimeoutMiddleware nécessite signal.alarm (Unix uniquement). "
-                "Utilisez un serveur de production avec gunicorn/uwsgi."
-            )
+        self.offload_threshold = getattr(settings, 'REQUEST_OFFLOAD_THRESHOLD', 0.8)
     
     def __call__(self, request):
-        # Définir le handler de timeout
-        def timeout_handler(signum, frame):
-            raise RequestTimeoutError()
-        
-        # Configurer l'alarme
-        old_handler = signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(self.timeout)
-        
-        try:
+        with deadline_scope(self.timeout) as deadline:
+            request.deadline = deadline
             response = self.get_response(request)
-        finally:
-            # Annuler l'alarme et restaurer l'ancien handler
-            signal.alarm(0)
-            signal.signal(signal.SIGALRM, old_handler)
+        
+        elapsed = deadline.elapsed()
+        if elapsed >= self.timeout * self.offload_threshold:
+            logger.warning(
+                f"Requête lente {request.method} {request.path}: {elapsed:.1f}s "
+                f"sur un budget de {self.timeout}s - envisager un traitement "
+                f"asynchrone (tâche Celery)",
+                extra={'path': request.path, 'elapsed': elapsed, 'timeout': self.timeout}
+            )
         
         return response
+    
+    def process_exception(self, request, exception):
+        """Réponse 408 pour les vues hors DRF"""
+        if isinstance(exception, RequestTimeoutError):
+            return JsonResponse(
+                {'detail': str(exception.detail)},
+                status=RequestTimeoutError.status_code
+            )
+        return None
 
 
 def timeout_decorator(seconds=30):
@@ -65,30 +255,22 @@ def timeout_decorator(seconds=30):
             # Code qui peut prendre du temps
             pass
     
-    Note: Fonctionne uniquement sur Unix (signal.alarm)
+    La fonction s'exécute dans un deadline_scope : ses requêtes SQL et appels
+    make_request sont bornés au budget, et TimeoutError est levée dès le
+    premier point de contrôle après l'échéance (ou au retour de la fonction).
     """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Vérifier si signal.alarm est disponible
-            if not hasattr(signal, 'alarm'):
-                # Sur Windows, exécuter sans timeout
-                return func(*args, **kwargs)
-            
-            def timeout_handler(signum, frame):
-                raise TimeoutError(f"La fonction {func.__name__} a dépassé le timeout de {seconds}s")
-            
-            # Configurer l'alarme
-            old_handler = signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(seconds)
-            
+            message = f"La fonction {func.__name__} a dépassé le timeout de {seconds}s"
             try:
-                result = func(*args, **kwargs)
-            finally:
-                # Annuler l'alarme et restaurer l'ancien handler
-                signal.alarm(0)
-                signal.signal(signal.SIGALRM, old_handler)
+                with deadline_scope(seconds) as deadline:
+                    result = func(*args, **kwargs)
+            except RequestTimeoutError as e:
+                raise TimeoutError(message) from e
             
+            if deadline.expired:
+                raise TimeoutError(message)
             return result
         
         return wrapper
@@ -187,6 +369,9 @@ def make_request(method, url, **kwargs):
     Usage:
         response = make_request('GET', 'https://api.example.com/data')
         response = make_request('POST', 'https://api.example.com/data', json={'key': 'value'})
+    
+    Dans une requête (ou un deadline_scope), les timeouts sont bornés au
+    budget restant ; RequestTimeoutError est levée s'il est épuisé.
     """
     if 'timeout' not in kwargs:
         kwargs['timeout'] = (
@@ -194,6 +379,15 @@ def make_request(method, url, **kwargs):
             get_timeout('http', 'read')
         )
     
+    deadline = get_current_deadline()
+    if deadline is not None:
+        deadline.check()
+        timeout = kwargs['timeout']
+        if isinstance(timeout, tuple):
+            kwargs['timeout'] = tuple(deadline.clamp(value) for value in timeout)
+        else:
+            kwargs['timeout'] = deadline.clamp(timeout)
+    
     return default_session.request(method, url, **kwargs)
 
 
@@ -208,30 +402,18 @@ class DatabaseTimeoutMixin:
             def get(self, request):
                 # Les requêtes DB auront un timeout de 10s
                 pass
+    
+    Le timeout resserre l'échéance de la requête (deadline_scope) et est
+    retiré à la fin de la vue, y compris sur les connexions persistantes.
     """
     
     db_timeout = None  # À définir dans la classe fille
     
     def dispatch(self, request, *args, **kwargs):
-        from django.db import connection
-        
         timeout = self.db_timeout or get_timeout('database', 'default')
         
-        # Configurer le timeout pour PostgreSQL
-        if connection.vendor == 'postgresql':
-            with connection.cursor() as cursor:
-                cursor.execute(f"SET statement_timeout = {timeout * 1000}")  # millisecondes
-        
-        # Configurer le timeout pour MySQL
-        elif connection.vendor == 'mysql':
-            with connection.cursor() as cursor:
-                cursor.execute(f"SET SESSION max_execution_time = {timeout * 1000}")  # millisecondes
-        
-        # SQLite n'a pas de timeout natif, utiliser le timeout de connexion
-        elif connection.vendor == 'sqlite':
-            connection.connection.timeout = timeout
-        
-        return super().dispatch(request, *args, **kwargs)
+        with deadline_scope(timeout):
+            return super().dispatch(request, *args, **kwargs)
 
 
 def with_db_timeout(timeout=30):
@@ -247,21 +429,8 @@ def with_db_timeout(timeout=30):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            from django.db import connection
-            
-            # Configurer le timeout selon le SGBD
-            if connection.vendor == 'postgresql':
-                with connection.cursor() as cursor:
-                    cursor.execute(f"SET statement_timeout = {timeout * 1000}")
-            
-            elif connection.vendor == 'mysql':
-                with connection.cursor() as cursor:
-                    cursor.execute(f"SET SESSION max_execution_time = {timeout * 1000}")
-            
-            elif connection.vendor == 'sqlite':
-                connection.connection.timeout = timeout
-            
-            return func(*args, **kwargs)
+            with deadline_scope(timeout):
+                return func(*args, **kwargs)
         
         return wrapper
     return decorator
@@ -9,10 +9,15 @@ from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 
+from config.metrics import metrics_view
+
 urlpatterns = [
     # Admin
     path("admin/", admin.site.urls),
     
+    # Métriques Prometheus (IPs autorisées ou jeton)
+    path("metrics", metrics_view, name="metrics"),
+    
     # API Documentation
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/schema/swagger-ui/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
@@ -0,0 +1,16 @@
+"""
+Configuration pytest commune
+"""
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def synchronous_audit_writes(settings):
+    """Les logs d'audit sont écrits immédiatement pendant les tests"""
+    settings.AUDIT_ASYNC_WRITES = False
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budgets(settings):
+    """Un dépassement du budget de requêtes d'une vue fait échouer le test"""
+    settings.QUERY_BUDGET_STRICT = True
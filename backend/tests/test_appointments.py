@@ -2,16 +2,26 @@
 Tests de gestion des rendez-vous
 """
 import pytest
+from unittest.mock import patch
 from datetime import datetime, timedelta, time as dt_time
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from apps.appointments.models import Appointment, AppointmentSlotLock
-from apps.content_management.models import ClinicSchedule
+from apps.appointments.models import Appointment, AppointmentHistory, AppointmentSlotLock, DailyClinicStats
+from apps.appointments.rollups import get_period_totals, rollup_daily_stats
+from apps.appointments.slots import get_available_slots
+from apps.appointments.locks import DatabaseSlotLockBackend
+from apps.appointments import slot_cache
+from apps.appointments.slot_cache import get_cached_available_slots, encode_day, get_slot_states
+from apps.appointments.stats import get_dashboard_stats, get_time_series
+from apps.content_management.models import ClinicSchedule, ClinicHoliday, ConsultationFee
 
 User = get_user_model()
 
@@ -197,6 +207,65 @@ class AppointmentTestCase(TestCase):
         self.assertEqual(len(response.data['results']), 1)
 
 
+class AppointmentPaginationTestCase(TestCase):
+    """Tests de la pagination de la liste des rendez-vous"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(
+            email='staff@example.com',
+            password='TestPassword123!',
+            first_name='Staff',
+            last_name='Test',
+            role='staff'
+        ))
+        self.today = timezone.now().date()
+    
+    def _create(self, count):
+        return [
+            Appointment.objects.create(
+                patient_first_name='Patient',
+                patient_last_name=str(index),
+                patient_email=f'patient{index}@example.com',
+                patient_phone='06 123 45 67',
+                date=self.today + timedelta(days=index + 1),
+                time=dt_time(10, 0),
+                consultation_type='generale',
+                status='pending'
+            )
+            for index in range(count)
+        ]
+    
+    def test_page_number_by_default(self):
+        """Sans opt-in : pagination par numéro de page, dates les plus récentes d'abord"""
+        created = self._create(3)
+        Appointment.objects.filter(pk=created[0].pk).update(date=self.today + timedelta(days=30))
+        
+        response = self.client.get(reverse('appointments-list'), {'page_size': 2})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['count'], response.data['total_pages']), (3, 2))
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [created[0].pk, created[2].pk]
+        )
+    
+    def test_rescheduled_appointment_is_listed_once(self):
+        """Curseur (?pagination=cursor) : un RDV déplacé entre deux pages n'est ni sauté ni répété"""
+        created = self._create(4)
+        
+        first = self.client.get(reverse('appointments-list'), {'page_size': 2, 'pagination': 'cursor'})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        
+        # Contre-proposition : le plus ancien RDV passe après tous les autres
+        Appointment.objects.filter(pk=created[0].pk).update(date=self.today + timedelta(days=30))
+        second = self.client.get(first.data['next'])
+        
+        listed = [item['id'] for item in first.data['results'] + second.data['results']]
+        self.assertEqual(sorted(listed), sorted(appointment.pk for appointment in created))
+        self.assertIsNone(second.data['next'])
+
+
 class AvailableSlotsTestCase(TestCase):
     """Tests de récupération des créneaux disponibles"""
     
@@ -317,3 +386,555 @@ class SlotLockTestCase(TestCase):
         response = self.client.delete(self.lock_url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class SlotEngineTestCase(TestCase):
+    """Tests du moteur de disponibilité (apps.appointments.slots)"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.slots_url = reverse('appointments-available-slots')
+        
+        # Lundi ouvert : 8h-10h et 14h-16h, créneaux de 30 min
+        ClinicSchedule.objects.create(
+            day_of_week=0,
+            is_open=True,
+            morning_start=dt_time(8, 0),
+            morning_end=dt_time(10, 0),
+            afternoon_start=dt_time(14, 0),
+            afternoon_end=dt_time(16, 0),
+            slot_duration=30
+        )
+        # Mardi fermé
+        ClinicSchedule.objects.create(day_of_week=1, is_open=False)
+        
+        today = timezone.now().date()
+        days_ahead = 0 - today.weekday()
+        if days_ahead <= 0:
+            days_ahead += 7
+        self.monday = today + timedelta(days=days_ahead)
+    
+    def test_schedule_expansion(self):
+        """Les plages matin / après-midi sont découpées selon slot_duration"""
+        slots = get_available_slots(self.monday)[self.monday]
+        
+        self.assertEqual(slots, [
+            dt_time(8, 0), dt_time(8, 30), dt_time(9, 0), dt_time(9, 30),
+            dt_time(14, 0), dt_time(14, 30), dt_time(15, 0), dt_time(15, 30),
+        ])
+    
+    def test_booked_and_locked_slots_are_removed(self):
+        """Les RDV actifs et les verrous valides retirent leur créneau"""
+        Appointment.objects.create(
+            patient_first_name='Test',
+            patient_last_name='Patient',
+            patient_email='test@example.com',
+            patient_phone='06 123 45 67',
+            date=self.monday,
+            time=dt_time(8, 0),
+            consultation_type='generale',
+            status='confirmed'
+        )
+        Appointment.objects.create(
+            patient_first_name='Annule',
+            patient_last_name='Patient',
+            patient_email='cancelled@example.com',
+            patient_phone='06 123 45 68',
+            date=self.monday,
+            time=dt_time(8, 30),
+            consultation_type='generale',
+            status='cancelled'
+        )
+        AppointmentSlotLock.objects.create(
+            date=self.monday,
+            time=dt_time(9, 0),
+            locked_by='visitor',
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        AppointmentSlotLock.objects.create(
+            date=self.monday,
+            time=dt_time(9, 30),
+            locked_by='expired',
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        
+        slots = get_available_slots(self.monday)[self.monday]
+        
+        self.assertNotIn(dt_time(8, 0), slots)
+        self.assertIn(dt_time(8, 30), slots)
+        self.assertNotIn(dt_time(9, 0), slots)
+        self.assertIn(dt_time(9, 30), slots)
+    
+    def test_recurring_holiday(self):
+        """Un férié récurrent ferme la clinique les années suivantes"""
+        ClinicHoliday.objects.create(
+            date=self.monday.replace(year=self.monday.year - 3),
+            name='Fête récurrente',
+            is_recurring=True
+        )
+        
+        self.assertEqual(get_available_slots(self.monday)[self.monday], [])
+    
+    def test_range_uses_constant_number_of_queries(self):
+        """Une plage d'un mois se calcule en un nombre fixe de requêtes"""
+        end = self.monday + timedelta(days=27)
+        
+        with self.assertNumQueries(4):
+            available = get_available_slots(self.monday, end)
+        
+        self.assertEqual(len(available), 28)
+        self.assertEqual(len(available[self.monday + timedelta(days=7)]), 8)
+        self.assertEqual(available[self.monday + timedelta(days=1)], [])
+    
+    def test_range_endpoint(self):
+        """L'endpoint accepte start / end et renvoie un bloc par jour"""
+        response = self.client.get(self.slots_url, {
+            'start': self.monday.isoformat(),
+            'end': (self.monday + timedelta(days=6)).isoformat(),
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['days']), 7)
+        self.assertEqual(len(response.data['days'][0]['slots']), 8)
+    
+    def test_range_endpoint_rejects_inverted_range(self):
+        """Une plage inversée est refusée"""
+        response = self.client.get(self.slots_url, {
+            'start': self.monday.isoformat(),
+            'end': (self.monday - timedelta(days=1)).isoformat(),
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SlotBitmapCacheTestCase(TestCase):
+    """Tests du cache bitmap des disponibilités (apps.appointments.slot_cache)"""
+    
+    def setUp(self):
+        cache.clear()
+        ClinicSchedule.objects.create(
+            day_of_week=0,
+            is_open=True,
+            morning_start=dt_time(8, 0),
+            morning_end=dt_time(10, 0),
+            afternoon_start=dt_time(14, 0),
+            afternoon_end=dt_time(16, 0),
+            slot_duration=30
+        )
+        
+        today = timezone.now().date()
+        days_ahead = 0 - today.weekday()
+        if days_ahead <= 0:
+            days_ahead += 7
+        self.monday = today + timedelta(days=days_ahead)
+    
+    def test_cached_read_does_not_query_database(self):
+        """Une date déjà calculée est servie depuis le cache"""
+        get_cached_available_slots(self.monday)
+        
+        with self.assertNumQueries(0):
+            slots = get_cached_available_slots(self.monday)[self.monday]
+        
+        self.assertEqual(len(slots), 8)
+    
+    def test_appointment_save_updates_bitmap(self):
+        """Le post_save d'un RDV met à jour le bitmap de sa date"""
+        get_cached_available_slots(self.monday)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = Appointment.objects.create(
+                patient_first_name='Test',
+                patient_last_name='Patient',
+                patient_email='test@example.com',
+                patient_phone='06 123 45 67',
+                date=self.monday,
+                time=dt_time(8, 0),
+                consultation_type='generale',
+                status='confirmed'
+            )
+        
+        with self.assertNumQueries(0):
+            slots = get_cached_available_slots(self.monday)[self.monday]
+        self.assertNotIn(dt_time(8, 0), slots)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+        
+        self.assertIn(dt_time(8, 0), get_cached_available_slots(self.monday)[self.monday])
+    
+    def test_miss_does_not_overwrite_concurrent_refresh(self):
+        """Un bitmap reconstruit sur un miss n'écrase pas un refresh post-commit concurrent"""
+        build_bitmaps = slot_cache.build_bitmaps
+        stale = build_bitmaps(self.monday, self.monday)
+        Appointment.objects.create(
+            patient_first_name='Test',
+            patient_last_name='Patient',
+            patient_email='test@example.com',
+            patient_phone='06 123 45 67',
+            date=self.monday,
+            time=dt_time(8, 0),
+            consultation_type='generale',
+            status='confirmed'
+        )
+        
+        def build_then_refresh(start, end):
+            # Le commit concurrent rafraîchit la date après notre lecture de la base
+            with patch.object(slot_cache, 'build_bitmaps', build_bitmaps):
+                slot_cache.refresh_day_bitmap(self.monday)
+            return stale
+        
+        with patch.object(slot_cache, 'build_bitmaps', side_effect=build_then_refresh):
+            slots = get_cached_available_slots(self.monday)[self.monday]
+        
+        self.assertNotIn(dt_time(8, 0), slots)
+        self.assertNotIn(dt_time(8, 0), get_cached_available_slots(self.monday)[self.monday])
+    
+    def test_slot_states(self):
+        """Le bitmap distingue créneaux libres, verrouillés et réservés"""
+        entry = encode_day(
+            [dt_time(8, 0), dt_time(8, 30), dt_time(9, 0)],
+            {dt_time(8, 0)},
+            {dt_time(8, 30): timezone.now() + timedelta(minutes=5)}
+        )
+        
+        self.assertEqual(
+            [state for _, state in get_slot_states(entry)],
+            ['booked', 'locked', 'free']
+        )
+        
+        later = timezone.now() + timedelta(minutes=10)
+        self.assertEqual(
+            [state for _, state in get_slot_states(entry, later)],
+            ['booked', 'free', 'free']
+        )
+    
+    def test_schedule_change_invalidates_bitmaps(self):
+        """Une modification des horaires invalide les bitmaps en cache"""
+        get_cached_available_slots(self.monday)
+        
+        ClinicSchedule.objects.filter(day_of_week=0).get().delete()
+        
+        self.assertEqual(get_cached_available_slots(self.monday)[self.monday], [])
+
+
+class SlotLockBackendTestCase(TestCase):
+    """Tests du backend de verrouillage base de données (apps.appointments.locks)"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.lock_url = reverse('appointments-lock-slot')
+        self.unlock_url = reverse('appointments-unlock-slot')
+        self.backend = DatabaseSlotLockBackend()
+        self.future_date = timezone.now().date() + timedelta(days=7)
+    
+    def test_acquire_is_exclusive_per_owner(self):
+        """Un créneau verrouillé ne peut pas être pris par un autre propriétaire"""
+        self.assertIsNotNone(self.backend.acquire(self.future_date, dt_time(10, 0), 'alice', 300))
+        self.assertIsNone(self.backend.acquire(self.future_date, dt_time(10, 0), 'bob', 300))
+        # Le propriétaire peut prolonger son verrou
+        self.assertIsNotNone(self.backend.acquire(self.future_date, dt_time(10, 0), 'alice', 300))
+    
+    def test_release_checks_owner(self):
+        """Seul le propriétaire peut libérer le verrou"""
+        self.backend.acquire(self.future_date, dt_time(10, 0), 'alice', 300)
+        
+        self.assertFalse(self.backend.release(self.future_date, dt_time(10, 0), 'bob'))
+        self.assertTrue(self.backend.release(self.future_date, dt_time(10, 0), 'alice'))
+        self.assertFalse(AppointmentSlotLock.objects.exists())
+    
+    def test_expired_lock_can_be_taken(self):
+        """Un verrou expiré est repris par un nouveau propriétaire"""
+        AppointmentSlotLock.objects.create(
+            date=self.future_date,
+            time=dt_time(10, 0),
+            locked_by='alice',
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        
+        self.assertIsNotNone(self.backend.acquire(self.future_date, dt_time(10, 0), 'bob', 300))
+        self.assertEqual(self.backend.cleanup(), 0)
+    
+    def test_lock_endpoint_conflict(self):
+        """L'endpoint renvoie 409 si un autre visiteur détient le créneau"""
+        data = {'date': self.future_date.isoformat(), 'time': '10:00'}
+        
+        response = self.client.post(self.lock_url, {**data, 'lock_id': 'alice'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        response = self.client.post(self.lock_url, {**data, 'lock_id': 'bob'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        
+        self.client.post(self.unlock_url, {**data, 'lock_id': 'bob'}, format='json')
+        self.assertTrue(AppointmentSlotLock.objects.exists())
+        
+        self.client.post(self.unlock_url, {**data, 'lock_id': 'alice'}, format='json')
+        self.assertFalse(AppointmentSlotLock.objects.exists())
+
+
+class DashboardStatsTestCase(TestCase):
+    """Tests des statistiques du dashboard (apps.appointments.stats)"""
+    
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.now().date()
+    
+    def _create_appointment(self, time, status='confirmed', consultation_type='generale'):
+        return Appointment.objects.create(
+            patient_first_name='Jean',
+            patient_last_name='Dupont',
+            patient_email=f'patient{time.hour}@example.com',
+            patient_phone='06 123 45 67',
+            date=self.today,
+            time=time,
+            consultation_type=consultation_type,
+            status=status
+        )
+    
+    def test_counts_today(self):
+        """Les compteurs du jour sont calculés par agrégat"""
+        self._create_appointment(dt_time(9, 0))
+        self._create_appointment(dt_time(10, 0), status='pending')
+        self._create_appointment(dt_time(11, 0), consultation_type='specialisee')
+        
+        stats = get_dashboard_stats(self.today)
+        self.assertEqual(stats['today_appointments']['total'], 3)
+        self.assertEqual(stats['today_appointments']['confirmed'], 2)
+        self.assertEqual(stats['today_appointments']['pending'], 1)
+        self.assertEqual(stats['total_patients']['total'], 3)
+        self.assertEqual(stats['month_revenue']['consultations'], 2)
+        self.assertEqual(stats['month_revenue']['amount'], 15000 + 25000)
+    
+    def test_snapshot_is_cached_and_invalidated(self):
+        """L'instantané est servi depuis le cache jusqu'à la prochaine écriture"""
+        get_dashboard_stats(self.today)
+        with self.assertNumQueries(0):
+            get_dashboard_stats(self.today)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_appointment(dt_time(9, 0))
+        
+        self.assertEqual(get_dashboard_stats(self.today)['today_appointments']['total'], 1)
+
+
+class TimeSeriesTestCase(TestCase):
+    """Tests des séries temporelles des graphiques (apps.appointments.stats)"""
+    
+    def setUp(self):
+        self.start = timezone.now().date().replace(day=1) - timedelta(days=60)
+        self.start = self.start.replace(day=1)
+    
+    def _create_appointment(self, day, time, status='confirmed', consultation_type='generale'):
+        return Appointment.objects.create(
+            patient_first_name='Jean',
+            patient_last_name='Dupont',
+            patient_email='jean@example.com',
+            patient_phone='06 123 45 67',
+            date=day,
+            time=time,
+            consultation_type=consultation_type,
+            status=status
+        )
+    
+    def test_daily_buckets_are_zero_filled(self):
+        """Chaque jour de la plage est présent, même sans RDV"""
+        self._create_appointment(self.start, dt_time(9, 0))
+        self._create_appointment(self.start, dt_time(10, 0), status='pending')
+        
+        with self.assertNumQueries(1):
+            series = get_time_series(self.start, self.start + timedelta(days=6), 'day')
+        
+        self.assertEqual(len(series), 7)
+        self.assertEqual(series[0]['count'], 2)
+        self.assertEqual(sum(bucket['count'] for bucket in series[1:]), 0)
+    
+    def test_monthly_revenue_uses_consultation_fees(self):
+        """Le chiffre d'affaires applique les tarifs configurés, sinon les défauts"""
+        ConsultationFee.objects.create(consultation_type='generale', price=20000)
+        next_month = (self.start + timedelta(days=31)).replace(day=1)
+        self._create_appointment(self.start, dt_time(9, 0))
+        self._create_appointment(self.start, dt_time(10, 0), consultation_type='urgence')
+        self._create_appointment(next_month, dt_time(9, 0), consultation_type='suivi')
+        self._create_appointment(next_month, dt_time(10, 0), status='cancelled')
+        
+        series = get_time_series(
+            self.start, next_month, 'month',
+            statuses=['confirmed', 'completed'], with_revenue=True
+        )
+        
+        self.assertEqual([bucket['period'] for bucket in series], [self.start, next_month])
+        self.assertEqual(series[0]['revenue'], 20000 + 30000)
+        self.assertEqual(series[1]['revenue'], 10000)
+    
+    def test_group_by_consultation_type(self):
+        """La ventilation par type est calculée dans la même requête"""
+        self._create_appointment(self.start, dt_time(9, 0))
+        self._create_appointment(self.start, dt_time(10, 0), consultation_type='suivi')
+        self._create_appointment(self.start, dt_time(11, 0), consultation_type='suivi')
+        
+        series = get_time_series(
+            self.start, self.start, 'week', group_by='consultation_type'
+        )
+        
+        self.assertEqual(len(series), 1)
+        self.assertEqual(series[0]['consultation_type'], {'generale': 1, 'suivi': 2})
+    
+    def test_chart_data_endpoint(self):
+        """Le endpoint chart_data conserve son format de réponse"""
+        staff = User.objects.create_user(
+            email='staff@example.com',
+            password='TestPassword123!',
+            first_name='Staff',
+            last_name='Test',
+            role='staff'
+        )
+        client = APIClient()
+        client.force_authenticate(user=staff)
+        self._create_appointment(timezone.now().date(), dt_time(9, 0), status='pending')
+        
+        response = client.get(reverse('appointments-chart-data'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['appointments_evolution']), 7)
+        self.assertEqual(response.data['appointments_evolution'][-1]['rdv'], 1)
+        self.assertEqual(response.data['status_distribution'][0]['value'], 1)
+        self.assertEqual(len(response.data['revenue_data']), 6)
+
+
+class DailyClinicStatsTestCase(TestCase):
+    """Tests des agrégats journaliers (apps.appointments.rollups)"""
+    
+    def setUp(self):
+        self.day = timezone.localdate() - timedelta(days=10)
+    
+    def _create_appointment(self, time, status='completed', consultation_type='generale'):
+        return Appointment.objects.create(
+            patient_first_name='Jean',
+            patient_last_name='Dupont',
+            patient_email='jean@example.com',
+            patient_phone='06 123 45 67',
+            date=self.day,
+            time=time,
+            consultation_type=consultation_type,
+            status=status
+        )
+    
+    def test_rollup_counts_and_revenue(self):
+        """Une ligne par jour avec compteurs par statut, type et revenu"""
+        self._create_appointment(dt_time(9, 0))
+        self._create_appointment(dt_time(10, 0), consultation_type='urgence')
+        self._create_appointment(dt_time(11, 0), status='no_show')
+        self._create_appointment(dt_time(12, 0), status='rejected_by_patient')
+        
+        self.assertEqual(rollup_daily_stats(self.day, self.day + timedelta(days=1)), 2)
+        
+        stats = DailyClinicStats.objects.get(date=self.day)
+        self.assertEqual(stats.appointments_total, 4)
+        self.assertEqual(stats.completed_count, 2)
+        self.assertEqual(stats.no_show_count, 1)
+        self.assertEqual(stats.rejected_count, 1)
+        self.assertEqual(stats.billable_count, 2)
+        self.assertEqual(stats.general_count, 1)
+        self.assertEqual(stats.emergency_count, 1)
+        self.assertEqual(stats.revenue, 15000 + 30000)
+        self.assertEqual(DailyClinicStats.objects.get(date=self.day + timedelta(days=1)).appointments_total, 0)
+    
+    def test_rollup_is_idempotent(self):
+        """Un second passage met à jour la ligne existante"""
+        appointment = self._create_appointment(dt_time(9, 0))
+        rollup_daily_stats(self.day, self.day)
+        
+        appointment.status = 'no_show'
+        appointment.save()
+        rollup_daily_stats(self.day, self.day)
+        
+        stats = DailyClinicStats.objects.get(date=self.day)
+        self.assertEqual(DailyClinicStats.objects.count(), 1)
+        self.assertEqual(stats.completed_count, 0)
+        self.assertEqual(stats.no_show_count, 1)
+    
+    def test_period_totals_fill_missing_days(self):
+        """Les jours non agrégés sont calculés à la volée"""
+        self._create_appointment(dt_time(9, 0))
+        rollup_daily_stats(self.day, self.day)
+        self.day += timedelta(days=1)
+        self._create_appointment(dt_time(9, 0))
+        
+        totals = get_period_totals(self.day - timedelta(days=1), self.day)
+        
+        self.assertEqual(totals['appointments_total'], 2)
+        self.assertEqual(totals['general_count'], 2)
+
+
+class AppointmentChangeTrackingTestCase(TestCase):
+    """Tests du suivi des modifications (Appointment.from_db / tracked_changes)"""
+    
+    def setUp(self):
+        self.patient = User.objects.create_user(
+            email='patient@example.com',
+            password='TestPassword123!',
+            first_name='Patient',
+            last_name='Test'
+        )
+        self.date = timezone.now().date() + timedelta(days=7)
+        created = Appointment.objects.create(
+            patient=self.patient,
+            patient_first_name='Patient',
+            patient_last_name='Test',
+            patient_email='patient@example.com',
+            patient_phone='06 123 45 67',
+            date=self.date,
+            time=dt_time(10, 0),
+            consultation_type='generale',
+            status='pending'
+        )
+        self.appointment = Appointment.objects.get(pk=created.pk)
+    
+    def test_save_does_not_reload_row(self):
+        """Le diff est calculé sans relire le RDV en base"""
+        self.appointment.status = 'confirmed'
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.appointment.save()
+        
+        table = Appointment._meta.db_table
+        reloads = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+        ]
+        self.assertEqual(reloads, [])
+    
+    def test_history_records_diff(self):
+        """L'historique reçoit les anciennes et nouvelles valeurs"""
+        new_date = self.date + timedelta(days=1)
+        self.appointment.date = new_date
+        self.appointment.time = dt_time(11, 0)
+        self.appointment.save()
+        
+        history = AppointmentHistory.objects.get(appointment=self.appointment, action_type='modified')
+        self.assertEqual(history.old_date, self.date)
+        self.assertEqual(history.new_date, new_date)
+        self.assertEqual(history.old_time, dt_time(10, 0))
+        self.assertEqual(set(history.changes_data), {'date', 'time'})
+    
+    def test_successive_saves_diff_from_last_save(self):
+        """Chaque sauvegarde repart des valeurs enregistrées"""
+        self.appointment.status = 'confirmed'
+        self.appointment.save()
+        self.appointment.notes_staff = 'Note'
+        self.appointment.save()
+        
+        history = AppointmentHistory.objects.filter(
+            appointment=self.appointment, action_type='modified'
+        ).order_by('created_at', 'pk').last()
+        self.assertEqual(set(history.changes_data), {'notes_staff'})
+    
+    def test_confirmation_notifies_patient(self):
+        """La confirmation (changement de statut) notifie le patient"""
+        from apps.notifications.models import Notification
+        
+        self.appointment.status = 'confirmed'
+        self.appointment.save()
+        
+        self.assertTrue(
+            Notification.objects.filter(user=self.patient, type='appointment_confirmed').exists()
+        )
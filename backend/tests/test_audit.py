@@ -0,0 +1,313 @@
+"""
+Tests de l'écriture différée des logs d'audit
+"""
+import csv
+import gzip
+import io
+import os
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import skipUnless
+from unittest.mock import patch
+
+import pytest
+from celery.signals import task_postrun
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.users import audit_sink
+from apps.users.audit_sink import AuditSink
+from apps.users.models_audit import AuditLog, LoginAttempt
+from apps.users.security_counters import get_failed_logins
+from apps.users.partitioning import (
+    add_months, create_audit_partitions, month_start, partition_bounds, partition_name,
+)
+from apps.users.tasks import cleanup_old_audit_logs
+
+User = get_user_model()
+
+
+class AuditSinkTestCase(TestCase):
+    """Tests de la file d'audit (apps.users.audit_sink)"""
+
+    def setUp(self):
+        # tests/conftest.py désactive l'écriture différée par défaut
+        async_writes = override_settings(AUDIT_ASYNC_WRITES=True)
+        async_writes.enable()
+        self.addCleanup(async_writes.disable)
+        self.sink = AuditSink(batch_size=100, flush_interval=60, buffer_size=3, enqueue_timeout=0)
+        # Pas de thread : la file est vidée explicitement
+        patcher = patch.object(self.sink, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _audit_log(self, index=0):
+        return AuditLog(action='login', description=f'Connexion {index}')
+
+    def test_enqueue_defers_write(self):
+        """Les logs ne sont écrits qu'au vidage, en un INSERT par modèle"""
+        self.sink.enqueue(self._audit_log(1))
+        self.sink.enqueue(self._audit_log(2))
+        self.sink.enqueue(LoginAttempt(username='a@example.com', ip_address='127.0.0.1'))
+        self.assertFalse(AuditLog.objects.exists())
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.sink.flush(), 3)
+
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self.assertEqual(LoginAttempt.objects.count(), 1)
+
+    def test_back_pressure_writes_synchronously(self):
+        """File pleine : l'appelant écrit son log lui-même"""
+        for index in range(4):
+            self.sink.enqueue(self._audit_log(index))
+
+        self.assertEqual(AuditLog.objects.count(), 1)
+        self.sink.flush()
+        self.assertEqual(AuditLog.objects.count(), 4)
+
+    def test_failed_batch_falls_back_to_single_writes(self):
+        """Un lot rejeté est réécrit ligne par ligne au lieu d'être perdu"""
+        self.sink.enqueue(self._audit_log(1))
+        self.sink.enqueue(self._audit_log(2))
+
+        with patch.object(AuditLog.objects, 'bulk_create', side_effect=Exception('lot rejeté')):
+            self.sink.flush()
+
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_celery_task_end_flushes_queue(self):
+        """La fin d'une tâche Celery vide la file (les enfants prefork sortent sans atexit)"""
+        audit_sink.connect_celery_signals()
+        self.sink.enqueue(self._audit_log())
+
+        with patch.object(audit_sink, '_sink', self.sink):
+            task_postrun.send(sender=None, task_id='test', task=None, state='SUCCESS')
+
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+    def test_timestamp_is_event_time(self):
+        """L'horodatage est celui de l'événement, pas du vidage"""
+        audit_log = self._audit_log()
+        self.sink.enqueue(audit_log)
+        self.sink.flush()
+
+        self.assertEqual(AuditLog.objects.get().timestamp, audit_log.timestamp)
+
+
+class AuditSinkShutdownTestCase(TransactionTestCase):
+    """Tests du thread d'écriture"""
+
+    def test_close_drains_queue(self):
+        """L'arrêt du processus vide la file"""
+        async_writes = override_settings(AUDIT_ASYNC_WRITES=True)
+        async_writes.enable()
+        self.addCleanup(async_writes.disable)
+        sink = AuditSink(batch_size=100, flush_interval=60)
+        for index in range(5):
+            sink.enqueue(AuditLog(action='login', description=f'Connexion {index}'))
+
+        sink.close()
+
+        self.assertFalse(sink._thread.is_alive())
+        self.assertEqual(AuditLog.objects.count(), 5)
+
+
+class FailedLoginMiddlewareTestCase(TestCase):
+    """Tests du logging des échecs de connexion (config.audit_middleware)"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(
+            email='victim@example.com',
+            password='TestPassword123!',
+            first_name='Test',
+            last_name='User'
+        )
+
+    def test_bad_credentials_are_recorded(self):
+        """Un échec crée la tentative, le compteur glissant et le log d'audit"""
+        with patch('apps.users.views_secure.verify_hcaptcha', return_value=True):
+            response = APIClient().post(reverse('token_obtain_pair'), {
+                'email': 'victim@example.com',
+                'password': 'WrongPassword123!',
+                'captcha': 'test_captcha_token'
+            }, format='json')
+
+        self.assertEqual(response.status_code, 401)
+        attempt = LoginAttempt.objects.get()
+        self.assertEqual((attempt.username, attempt.success), ('victim@example.com', False))
+        self.assertEqual(get_failed_logins(username='victim@example.com'), 1)
+        self.assertTrue(AuditLog.objects.filter(action='failed_login').exists())
+
+
+class AuditPartitioningTestCase(TestCase):
+    """Tests du partitionnement mensuel des tables d'audit"""
+
+    def test_month_arithmetic(self):
+        """Les mois sont décalés et bornés en UTC"""
+        self.assertEqual(add_months(date(2026, 11, 1), 2), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+        self.assertEqual(
+            month_start(datetime(2026, 3, 31, 23, 30, tzinfo=dt_timezone(timedelta(hours=-2)))),
+            date(2026, 4, 1)
+        )
+        self.assertEqual(partition_name('audit_log', date(2026, 4, 1)), 'audit_log_2026_04')
+        self.assertEqual(
+            partition_bounds(date(2026, 12, 1)),
+            (datetime(2026, 12, 1, tzinfo=dt_timezone.utc), datetime(2027, 1, 1, tzinfo=dt_timezone.utc))
+        )
+
+    def test_partitions_skipped_without_postgresql(self):
+        """Hors PostgreSQL, aucune partition n'est créée"""
+        self.assertEqual(create_audit_partitions(), [])
+
+    @pytest.mark.postgresql
+    @skipUnless(connection.vendor == 'postgresql', 'Partitionnement PostgreSQL uniquement')
+    def test_missing_partition_takes_rows_from_default(self):
+        """Une partition créée en retard récupère les lignes tombées dans la partition par défaut"""
+        month = date(2040, 5, 1)
+        LoginAttempt.objects.create(
+            username='a@example.com',
+            ip_address='127.0.0.1',
+            timestamp=datetime(2040, 5, 14, tzinfo=dt_timezone.utc)
+        )
+
+        created = create_audit_partitions(months_ahead=0, start=month)
+
+        self.assertIn(partition_name('login_attempt', month), created)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {partition_name('login_attempt', month)}")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("SELECT COUNT(*) FROM login_attempt_default")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(LoginAttempt.objects.count(), 1)
+
+    def test_cleanup_falls_back_to_delete(self):
+        """Hors PostgreSQL, la rétention supprime les lignes expirées"""
+        old = timezone.now() - timedelta(days=120)
+        AuditLog.objects.create(action='login', description='Ancien', timestamp=old)
+        AuditLog.objects.create(action='login', description='Récent')
+        LoginAttempt.objects.create(username='a@example.com', ip_address='127.0.0.1', timestamp=old)
+
+        result = cleanup_old_audit_logs()
+
+        self.assertEqual(result['audit_logs_deleted'], 1)
+        self.assertEqual(result['login_attempts_deleted'], 1)
+        self.assertEqual(result['partitions_dropped'], [])
+        self.assertEqual(list(AuditLog.objects.values_list('description', flat=True)), ['Récent'])
+
+
+class AuditExportTestCase(TestCase):
+    """Tests de l'export CSV en flux des logs d'audit"""
+
+    def setUp(self):
+        for index in range(5):
+            AuditLog.objects.create(action='login', level='info', description=f'Connexion {index}')
+        AuditLog.objects.create(action='permission_denied', level='warning', description='Refus')
+        AuditLog.objects.create(
+            action='login', description='Ancien', timestamp=timezone.now() - timedelta(days=30)
+        )
+
+    def _read_rows(self, content):
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_command_exports_gzip_in_chunks(self):
+        """L'export du rapport est écrit par paquets, compressé si demandé"""
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'audit.csv.gz')
+            call_command('audit_report', export=filename, chunk_size=2, stdout=io.StringIO())
+
+            with gzip.open(filename, 'rt', encoding='utf-8') as f:
+                rows = self._read_rows(f.read())
+
+        self.assertEqual(rows[0][:3], ['Timestamp', 'User', 'Action'])
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[1][4], 'Refus')
+
+    def test_command_statistics(self):
+        """Les statistiques par action et par niveau sont correctes"""
+        stdout = io.StringIO()
+        call_command('audit_report', stdout=stdout)
+        output = stdout.getvalue()
+
+        self.assertIn("Total d'actions: 6", output)
+        self.assertIn('Connexion: 5', output)
+        self.assertIn('Warning: 1', output)
+
+    def test_http_export_streams_for_admin(self):
+        """Les administrateurs reçoivent un CSV en flux, gzip compris"""
+        admin = User.objects.create_user(
+            email='admin@example.com',
+            password='TestPassword123!',
+            first_name='Admin',
+            last_name='Test',
+            role='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        url = reverse('audit_export')
+
+        response = client.get(url, {'level': 'warning'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = self._read_rows(b''.join(response.streaming_content).decode('utf-8'))
+        self.assertEqual([row[4] for row in rows[1:]], ['Refus'])
+
+        response = client.get(url, {'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = self._read_rows(gzip.decompress(b''.join(response.streaming_content)).decode('utf-8'))
+        self.assertEqual(len(rows), 7)
+
+    def test_log_list_cursor_pagination(self):
+        """La liste des logs se parcourt par curseur, total estimé sur demande"""
+        admin = User.objects.create_user(
+            email='admin@example.com',
+            password='TestPassword123!',
+            first_name='Admin',
+            last_name='Test',
+            role='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+
+        response = client.get(reverse('audit_logs'), {'page_size': 3, 'count': 'estimated'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 7)
+        self.assertFalse(response.data['count_is_estimate'])
+
+        timestamps = []
+        while True:
+            timestamps += [log['timestamp'] for log in response.data['results']]
+            if not response.data['next']:
+                break
+            response = client.get(response.data['next'])
+            self.assertNotIn('count', response.data)
+
+        self.assertEqual(len(timestamps), 7)
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+        response = client.get(reverse('audit_logs'), {'level': 'inconnu'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_http_export_requires_admin(self):
+        """L'export est refusé aux autres rôles"""
+        staff = User.objects.create_user(
+            email='staff@example.com',
+            password='TestPassword123!',
+            first_name='Staff',
+            last_name='Test',
+            role='staff'
+        )
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        response = client.get(reverse('audit_export'))
+
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,90 @@
+"""
+Tests du harnais de benchmark du parcours de réservation (apps.appointments.benchmarks)
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.appointments.benchmarks import BookingBenchmark, compare_results, isolated_services, seed_dataset
+from apps.appointments.locks import BaseSlotLockBackend, DatabaseSlotLockBackend, get_slot_lock_backend
+from apps.appointments.models import Appointment
+from apps.appointments.slots import ACTIVE_APPOINTMENT_STATUSES
+from config.celery import app as celery_app
+from config.rate_limit import BaseRateLimitBackend, CacheGCRABackend, get_rate_limit_backend
+
+User = get_user_model()
+
+
+class SharedSlotLockBackend(BaseSlotLockBackend):
+    """Doublure du backend Redis partagé"""
+
+
+class SharedRateLimitBackend(BaseRateLimitBackend):
+    """Doublure du backend Redis partagé"""
+
+
+class BookingBenchmarkTestCase(TestCase):
+    """Tests de la génération des données et des mesures"""
+
+    def test_seed_dataset_is_reproducible(self):
+        """Même graine, mêmes données ; un seul RDV actif par créneau"""
+        self.assertEqual(seed_dataset(300, seed=7), 300)
+        first = list(Appointment.objects.order_by('id').values_list('date', 'time', 'status', 'patient_last_name'))
+
+        Appointment.objects.all().delete()
+        User.objects.filter(role='patient').delete()
+        seed_dataset(300, seed=7)
+        second = list(Appointment.objects.order_by('id').values_list('date', 'time', 'status', 'patient_last_name'))
+        self.assertEqual(first, second)
+
+        active = Appointment.objects.filter(status__in=ACTIVE_APPOINTMENT_STATUSES)
+        self.assertFalse(active.filter(date__lt=timezone.localdate()).exists())
+        self.assertEqual(active.count(), len(set(active.values_list('date', 'time'))))
+
+    def test_scenarios_report_percentiles_and_queries(self):
+        """Chaque scénario rapporte percentiles, requêtes SQL et temps en base"""
+        seed_dataset(300, seed=7)
+        results = BookingBenchmark(repeat=2).run()
+
+        self.assertEqual(set(results), {
+            'validate', 'available_slots', 'available_slots_range_cold', 'lock_slot',
+            'respond', 'accept', 'counter_propose', 'dashboard_stats', 'chart_data',
+        })
+        for result in results.values():
+            self.assertEqual(result['runs'], 2 if result is not results['respond'] else 4)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(results['validate']['queries'], 1)
+
+    def test_compare_results(self):
+        """Régression signalée sur le p95 au-delà de la tolérance ou sur le nombre de requêtes"""
+        def dataset(p95, queries):
+            return {'datasets': {'10k': {'scenarios': {'respond': {'p95_ms': p95, 'queries': queries}}}}}
+
+        self.assertEqual(compare_results(dataset(10, 12), dataset(11.5, 12)), [])
+        self.assertEqual(
+            compare_results(dataset(10, 12), dataset(13, 13)),
+            [('10k', 'respond', 'p95_ms', 10, 13), ('10k', 'respond', 'queries', 12, 13)]
+        )
+        self.assertEqual(compare_results(dataset(10, 12), {'datasets': {'1m': {'scenarios': {}}}}), [])
+
+    @override_settings(
+        SLOT_LOCK_BACKEND='tests.test_benchmarks.SharedSlotLockBackend',
+        THROTTLE_BACKEND='tests.test_benchmarks.SharedRateLimitBackend',
+    )
+    def test_isolated_services(self):
+        """Cache, verrous, throttling et Celery locaux pendant la mesure, restaurés ensuite"""
+        # Backends partagés déjà instanciés (lru_cache) avant la mesure
+        self.assertIsInstance(get_slot_lock_backend(), SharedSlotLockBackend)
+        self.assertIsInstance(get_rate_limit_backend(), SharedRateLimitBackend)
+        eager = celery_app.conf.task_always_eager
+        with isolated_services():
+            self.assertEqual(settings.CACHES['default']['LOCATION'], 'benchmark')
+            self.assertIsInstance(get_slot_lock_backend(), DatabaseSlotLockBackend)
+            self.assertIsInstance(get_rate_limit_backend(), CacheGCRABackend)
+            self.assertTrue(celery_app.conf.task_always_eager)
+            self.assertEqual(celery_app.conf.broker_url, 'memory://')
+        self.assertEqual(celery_app.conf.task_always_eager, eager)
+        self.assertNotEqual(settings.CACHES['default'].get('LOCATION'), 'benchmark')
+        self.assertIsInstance(get_slot_lock_backend(), SharedSlotLockBackend)
+        self.assertIsInstance(get_rate_limit_backend(), SharedRateLimitBackend)
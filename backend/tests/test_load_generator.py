@@ -0,0 +1,137 @@
+"""
+Tests du générateur de charge (config.load_generator)
+"""
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, override_settings
+
+from config.load_generator import HTTPClient, LoadStats, Response, client_ip, parse_mix, run_load
+
+User = get_user_model()
+
+
+class LoadGeneratorTestCase(SimpleTestCase):
+    """Tests du client HTTP, de la pondération et du rapport"""
+
+    def test_http_client_keep_alive_chunked_and_cookies(self):
+        """Réponses Content-Length puis chunked sur la même connexion, cookies renvoyés"""
+        requests = []
+
+        async def handle(reader, writer):
+            connections = len(requests)
+            for body in (b'{"ok": true}', None):
+                head = await reader.readuntil(b'\r\n\r\n')
+                requests.append((connections, head.decode('latin-1')))
+                if body is not None:
+                    writer.write(
+                        b'HTTP/1.1 200 OK\r\nContent-Length: 12\r\n'
+                        b'Set-Cookie: access_token=abc; HttpOnly; Path=/\r\n\r\n' + body
+                    )
+                else:
+                    writer.write(
+                        b'HTTP/1.1 429 Too Many Requests\r\nTransfer-Encoding: chunked\r\n'
+                        b'Retry-After: 30\r\n\r\n3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n'
+                    )
+                await writer.drain()
+            writer.close()
+
+        async def scenario():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            client = HTTPClient(f'http://127.0.0.1:{port}', headers={'X-Forwarded-For': '198.18.0.1'})
+            first = await client.request('POST', '/login/', json_body={'email': 'a@b.c'})
+            second = await client.request('GET', '/data/', params={'page': 2})
+            await client.close()
+            server.close()
+            await server.wait_closed()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+
+        self.assertEqual(first.json(), {'ok': True})
+        self.assertEqual((second.status, second.body), (429, b'abcde'))
+        self.assertEqual([connection for connection, _ in requests], [0, 0])
+        self.assertIn('Content-Length: 18', requests[0][1])
+        self.assertIn('GET /data/?page=2 HTTP/1.1', requests[1][1])
+        self.assertIn('Cookie: access_token=abc', requests[1][1])
+        self.assertIn('X-Forwarded-For: 198.18.0.1', requests[1][1])
+
+    def test_parse_mix(self):
+        """Pondération « persona=poids », parcours inconnus refusés"""
+        self.assertEqual(
+            parse_mix('anonymous_booking=3, staff_dashboard'),
+            {'anonymous_booking': 3.0, 'staff_dashboard': 1.0}
+        )
+        with self.assertRaises(ValueError):
+            parse_mix('inconnu=1')
+        with self.assertRaises(ValueError):
+            parse_mix('staff_dashboard=0')
+
+    def test_client_ips_and_report(self):
+        """IP synthétiques distinctes ; 429 et 5xx comptés séparément"""
+        self.assertEqual(client_ip(0, 2), '198.18.0.1')
+        self.assertEqual(client_ip(2, 2), '198.18.0.1')
+        self.assertNotEqual(client_ip(1, 2), client_ip(0, 2))
+
+        stats = LoadStats()
+        stats.record('a:list', Response(200, {}, b''), 0.010)
+        stats.record('a:list', Response(429, {'retry-after': '60'}, b''), 0.002)
+        stats.record('a:list', Response(500, {}, b''), 0.050)
+        stats.record_error('a:list', 1.0)
+        report = stats.report()
+
+        step = report['steps']['a:list']
+        self.assertEqual((step['requests'], step['ok'], step['throttled']), (4, 1, 1))
+        self.assertEqual((step['server_errors'], step['failures']), (1, 1))
+        self.assertEqual(report['error_rate'], 0.5)
+        self.assertEqual(report['retry_after_max_s'], 60)
+
+
+class LoadTestCommandTestCase(TestCase):
+    """Garde-fous de la commande loadtest"""
+
+    @override_settings(HCAPTCHA_STUB=False)
+    def test_create_accounts_refused_outside_loadtest(self):
+        """--create-accounts refusé hors DJANGO_ENV=loadtest, aucun compte créé"""
+        with self.assertRaises(CommandError):
+            call_command('loadtest', '--create-accounts', '--password=Secret123!', '--duration=1')
+        self.assertFalse(User.objects.filter(email__endswith='@loadtest.vida.local').exists())
+
+    def test_password_required(self):
+        """Pas de mot de passe par défaut"""
+        with self.assertRaises(CommandError):
+            call_command('loadtest', '--duration=1')
+
+
+@override_settings(HCAPTCHA_STUB=True)
+class LoadGeneratorLiveServerTestCase(LiveServerTestCase):
+    """Parcours connectés contre un serveur réel"""
+
+    def test_run_load_against_live_server(self):
+        """Connexion (captcha doublé) puis lecture des notifications"""
+        User.objects.create_user(
+            email='loadtest-patient-0@loadtest.vida.local',
+            password='LoadTest123!Secure',
+            first_name='Charge',
+            last_name='Patient',
+            role='patient'
+        )
+        report = asyncio.run(run_load(
+            self.live_server_url,
+            concurrency=2,
+            duration=1,
+            mix={'patient_notifications': 1},
+            accounts={'patient': [('loadtest-patient-0@loadtest.vida.local', 'LoadTest123!Secure')]},
+            think_time=0.05,
+            seed=1,
+        ))
+
+        steps = report['steps']
+        self.assertEqual(steps['patient_notifications:login']['requests'], 2)
+        self.assertEqual(steps['patient_notifications:login']['ok'], 2)
+        self.assertGreater(steps['patient_notifications:list']['ok'], 0)
+        self.assertEqual(report['error_rate'], 0)
+        self.assertGreater(report['throughput_rps'], 0)
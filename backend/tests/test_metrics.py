@@ -0,0 +1,138 @@
+"""
+Tests des métriques de performance (config.metrics)
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from config.metrics import (
+    CACHE_OPERATIONS, REQUEST_DURATION, TASK_DURATION, TASK_QUERIES, Counter, Histogram,
+    MetricsMiddleware, MetricsRegistry, _task_postrun, _task_prerun, collect, flush,
+    histogram_quantile, merge_snapshots, render, route_summary,
+)
+
+
+def _sample(metric, **labels):
+    key = list(metric._key(labels))
+    for sample_labels, value in metric.snapshot()['samples']:
+        if sample_labels == key:
+            return value
+    return None
+
+
+class MetricsTestCase(TestCase):
+    """Tests du registre, de l'exposition et de l'instrumentation"""
+
+    def test_histogram_render_and_merge(self):
+        """Exposition Prometheus et addition des instantanés de processus"""
+        registry = MetricsRegistry()
+        latency = registry.register(Histogram('latency_seconds', 'Latence', ('route',), (0.1, 1)))
+        hits = registry.register(Counter('hits_total', 'Hits', ('route',)))
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, route='a')
+        hits.inc(2, route='a')
+
+        merged = merge_snapshots([registry.snapshot(), registry.snapshot()])
+        output = render(merged)
+
+        self.assertIn('# TYPE latency_seconds histogram', output)
+        self.assertIn('latency_seconds_bucket{route="a",le="0.1"} 2', output)
+        self.assertIn('latency_seconds_bucket{route="a",le="1"} 4', output)
+        self.assertIn('latency_seconds_bucket{route="a",le="+Inf"} 6', output)
+        self.assertIn('latency_seconds_count{route="a"} 6', output)
+        self.assertIn('hits_total{route="a"} 4', output)
+
+    def test_quantiles_from_buckets(self):
+        """p50 / p95 interpolés dans les seaux"""
+        self.assertAlmostEqual(histogram_quantile(0.5, (0.1, 0.2, 0.4), [50, 40, 10], 100), 0.1)
+        self.assertAlmostEqual(histogram_quantile(0.95, (0.1, 0.2, 0.4), [50, 40, 10], 100), 0.3)
+        self.assertIsNone(histogram_quantile(0.5, (0.1,), [0], 0))
+
+    def test_middleware_records_route_and_cache(self):
+        """Durée par nom de route, hits / misses du cache de la requête"""
+        url = reverse('notification-list')
+        before = _sample(REQUEST_DURATION, route='notification-list', method='GET', status='2xx')
+        before_hits = _sample(CACHE_OPERATIONS, route='notification-list', result='hit') or 0
+
+        def get_response(request):
+            request.resolver_match = resolve(url)
+            cache.set('metrics:test', 1)
+            cache.get('metrics:test')
+            cache.get('metrics:absent')
+            return HttpResponse('ok')
+
+        MetricsMiddleware(get_response)(RequestFactory().get(url))
+
+        after = _sample(REQUEST_DURATION, route='notification-list', method='GET', status='2xx')
+        self.assertEqual(after['count'], (before['count'] if before else 0) + 1)
+        self.assertEqual(_sample(CACHE_OPERATIONS, route='notification-list', result='hit'), before_hits + 1)
+
+        summary = {row['route']: row for row in route_summary(collect())}
+        self.assertIn('notification-list', summary)
+        self.assertIsNotNone(summary['notification-list']['p95'])
+
+    def test_celery_tasks_instrumented(self):
+        """Durée et requêtes SQL des tâches Celery"""
+        task = SimpleNamespace(name='tests.metrics_task')
+
+        _task_prerun(task_id='abc', task=task)
+        cache.get('metrics:absent')
+        _task_postrun(task_id='abc', task=task, state='SUCCESS')
+
+        self.assertEqual(_sample(TASK_DURATION, task='tests.metrics_task', state='SUCCESS')['count'], 1)
+        self.assertEqual(_sample(TASK_QUERIES, task='tests.metrics_task')['count'], 1)
+        self.assertEqual(_sample(CACHE_OPERATIONS, route='task:tests.metrics_task', result='miss'), 1)
+
+    def test_endpoint_access_and_multiprocess(self):
+        """/metrics réservé ; les instantanés des autres processus vivants sont additionnés"""
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            other = Histogram('vida_http_request_duration_seconds', '', ('route', 'method', 'status'))
+            other.observe(0.2, route='autre-worker', method='GET', status='2xx')
+            with open(os.path.join(directory, f'{os.getppid()}.json'), 'w', encoding='utf-8') as f:
+                json.dump({other.name: other.snapshot()}, f)
+            gone = Histogram('vida_http_request_duration_seconds', '', ('route', 'method', 'status'))
+            gone.observe(0.2, route='worker-termine', method='GET', status='2xx')
+            dead_path = os.path.join(directory, f'{dead.pid}.json')
+            with open(dead_path, 'w', encoding='utf-8') as f:
+                json.dump({gone.name: gone.snapshot()}, f)
+
+            with override_settings(METRICS_DIR=directory, METRICS_TOKEN='secret'):
+                self.assertTrue(flush(force=True))
+                self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+
+                response = self.client.get(reverse('metrics'))
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b'route="autre-worker"', response.content)
+                self.assertNotIn(b'route="worker-termine"', response.content)
+                self.assertFalse(os.path.exists(dead_path))
+
+                response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.9')
+                self.assertEqual(response.status_code, 403)
+
+                response = self.client.get(
+                    reverse('metrics'), REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION='Bearer secret'
+                )
+                self.assertEqual(response.status_code, 200)
+
+                response = self.client.get(
+                    reverse('metrics'), REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION='Bearer secrez'
+                )
+                self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='')
+    def test_endpoint_closed_without_configuration(self):
+        """Sans IP autorisée ni jeton, /metrics reste fermé, y compris depuis la boucle locale (proxy)"""
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(
+            self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ').status_code, 403
+        )
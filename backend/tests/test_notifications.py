@@ -0,0 +1,209 @@
+"""
+Tests des notifications
+"""
+from datetime import timedelta, time as dt_time
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from apps.appointments.models import Appointment
+from apps.notifications.models import Notification
+from apps.notifications.consumers import NotificationConsumer
+from apps.notifications.counters import get_counts
+from apps.notifications.tasks import notify_admins_task, reconcile_notification_counters
+
+User = get_user_model()
+
+
+class NotifyAdminsTestCase(TestCase):
+    """Tests de la diffusion des notifications aux admins"""
+
+    def setUp(self):
+        self.admins = [
+            User.objects.create_user(
+                email=f'admin{index}@example.com',
+                password='TestPassword123!',
+                first_name='Admin',
+                last_name=str(index),
+                is_staff=True
+            )
+            for index in range(3)
+        ]
+
+    def _create_appointment(self):
+        return Appointment.objects.create(
+            patient_first_name='Jean',
+            patient_last_name='Dupont',
+            patient_phone='06 123 45 67',
+            date=timezone.now().date() + timedelta(days=7),
+            time=dt_time(10, 0),
+            consultation_type='generale',
+            status='pending'
+        )
+
+    @patch('apps.notifications.signals.notify_admins_task.delay')
+    def test_fan_out_deferred_until_commit(self, mock_delay):
+        """La tâche n'est envoyée qu'après le commit"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            appointment = self._create_appointment()
+
+        mock_delay.assert_not_called()
+        self.assertFalse(Notification.objects.exists())
+
+        for callback in callbacks:
+            callback()
+
+        mock_delay.assert_called_once()
+        self.assertEqual(mock_delay.call_args.kwargs['related_appointment_id'], appointment.pk)
+        self.assertEqual(mock_delay.call_args.kwargs['notification_type'], 'new_appointment')
+
+    def test_bulk_create_sets_icon_and_color(self):
+        """Une seule requête d'insertion, icône et couleur renseignées"""
+        appointment = self._create_appointment()
+
+        with self.assertNumQueries(3):
+            result = notify_admins_task(
+                notification_type='new_appointment',
+                title='Nouveau rendez-vous',
+                message='Test',
+                related_appointment_id=appointment.pk
+            )
+
+        self.assertEqual(result['notifications_created'], 3)
+        notifications = Notification.objects.filter(related_appointment=appointment)
+        self.assertEqual(notifications.count(), 3)
+        for notification in notifications:
+            self.assertEqual(notification.icon, Notification.ICON_MAP['new_appointment'])
+            self.assertEqual(notification.color, Notification.COLOR_MAP['new_appointment'])
+
+    @patch('apps.notifications.signals.notify_admins_task.delay', side_effect=ConnectionError)
+    def test_fallback_without_broker(self, mock_delay):
+        """Sans broker, les notifications sont créées en synchrone"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_appointment()
+
+        self.assertEqual(Notification.objects.filter(type='new_appointment').count(), 3)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class NotificationConsumerTestCase(TransactionTestCase):
+    """Tests du WebSocket des notifications"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='patient@example.com',
+            password='TestPassword123!',
+            first_name='Patient',
+            last_name='Test'
+        )
+
+    async def _connect(self, user):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = user
+        connected, code = await communicator.connect()
+        return communicator, connected, code
+
+    def test_anonymous_is_rejected(self):
+        """Une connexion sans utilisateur est refusée"""
+        from django.contrib.auth.models import AnonymousUser
+
+        async def run():
+            communicator, connected, code = await self._connect(AnonymousUser())
+            self.assertFalse(connected)
+            self.assertEqual(code, 4401)
+
+        async_to_sync(run)()
+
+    def test_push_on_create_and_mark_all_as_read(self):
+        """Les compteurs initiaux, créations et lectures sont poussés"""
+        async def run():
+            communicator, connected, _ = await self._connect(self.user)
+            self.assertTrue(connected)
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {'type': 'unread_count', 'unread_count': 0, 'total_count': 0}
+            )
+
+            await database_sync_to_async(Notification.create_notification)(
+                user=self.user,
+                notification_type='system',
+                title='Test',
+                message='Message'
+            )
+            message = await communicator.receive_json_from()
+            self.assertEqual(message['type'], 'notification')
+            self.assertEqual(message['notification']['title'], 'Test')
+
+            await database_sync_to_async(Notification.mark_all_as_read)(self.user)
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {'type': 'count_delta', 'unread_delta': -1, 'total_delta': 0}
+            )
+            await communicator.disconnect()
+
+        async_to_sync(run)()
+
+
+class NotificationCountersTestCase(TestCase):
+    """Tests des compteurs de notifications en cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='patient@example.com',
+            password='TestPassword123!',
+            first_name='Patient',
+            last_name='Test'
+        )
+
+    def _create_notification(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.create_notification(
+                user=self.user,
+                notification_type='system',
+                title='Test',
+                message='Message'
+            )
+
+    def test_cached_read_does_not_query_database(self):
+        """Après un premier calcul, le badge est lu sans requête"""
+        self._create_notification()
+        self.assertEqual(get_counts(self.user.pk), {'unread_count': 1, 'total_count': 1})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_counts(self.user.pk), {'unread_count': 1, 'total_count': 1})
+
+    def test_counters_follow_writes(self):
+        """Création, lecture et suppression mettent à jour les compteurs"""
+        get_counts(self.user.pk)
+        first = self._create_notification()
+        self._create_notification()
+        self.assertEqual(get_counts(self.user.pk), {'unread_count': 2, 'total_count': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.mark_as_read()
+        self.assertEqual(get_counts(self.user.pk), {'unread_count': 1, 'total_count': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.delete_all_read(self.user)
+        self.assertEqual(get_counts(self.user.pk), {'unread_count': 1, 'total_count': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.mark_all_as_read(self.user)
+        self.assertEqual(get_counts(self.user.pk), {'unread_count': 0, 'total_count': 1})
+
+    def test_reconcile_fixes_drift(self):
+        """La réconciliation réaligne les compteurs sur la base"""
+        notification = self._create_notification()
+        get_counts(self.user.pk)
+        Notification.objects.filter(pk=notification.pk).delete()
+
+        reconcile_notification_counters()
+
+        self.assertEqual(get_counts(self.user.pk), {'unread_count': 0, 'total_count': 0})
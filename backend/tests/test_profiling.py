@@ -0,0 +1,126 @@
+"""
+Tests du profilage par échantillonnage des requêtes lentes (config.profiling)
+"""
+import os
+import tempfile
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from config.profiling import StackSampler, load_profiles, load_stacks, summarize_stacks
+
+User = get_user_model()
+
+
+def _busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class ProfilingTestCase(TestCase):
+    """Tests de l'échantillonneur, du middleware et de la commande profiles"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.staff = User.objects.create_user(
+            email='staff@example.com',
+            password='TestPassword123!',
+            first_name='Staff',
+            last_name='Test',
+            role='admin'
+        )
+        self.patient = User.objects.create_user(
+            email='patient@example.com',
+            password='TestPassword123!',
+            first_name='Patient',
+            last_name='Test',
+            role='patient'
+        )
+        self.client = APIClient()
+        self.url = reverse('notification-list')
+
+    def test_sampler_collects_collapsed_stacks(self):
+        """Les piles du thread échantillonné sont repliées racine → feuille"""
+        sampler = StackSampler(0.001)
+        sampler.start()
+        _busy_loop(0.05)
+        stacks = sampler.stop()
+
+        self.assertGreater(sum(stacks.values()), 0)
+        own, cumulative = summarize_stacks(stacks, top=None)
+        self.assertTrue(own[0][0].startswith('_busy_loop (tests'))
+        self.assertEqual(cumulative[0][1], sum(stacks.values()))
+
+    def test_header_from_staff_saves_profile(self):
+        """X-Profile: 1 d'un membre du personnel : profil et requêtes SQL enregistrés"""
+        self.client.force_authenticate(user=self.staff)
+        with override_settings(PROFILING_DIR=self.directory.name, PROFILING_HEADER_ENABLED=True):
+            response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+
+        profiles = load_profiles(self.directory.name)
+        self.assertEqual(len(profiles), 1)
+        profile = profiles[0]
+        self.assertEqual(profile['route'], 'notification-list')
+        self.assertEqual(profile['trigger'], 'header')
+        self.assertGreater(profile['query_count'], 0)
+        self.assertIn('sql', profile['queries'][0])
+        self.assertIsInstance(load_stacks(profile), dict)
+
+    def test_header_ignored_for_patients(self):
+        """L'en-tête n'a pas d'effet pour un patient"""
+        self.client.force_authenticate(user=self.patient)
+        with override_settings(PROFILING_DIR=self.directory.name, PROFILING_HEADER_ENABLED=True):
+            self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(load_profiles(self.directory.name), [])
+
+    def test_header_disabled_by_default(self):
+        """Sans PROFILING_HEADER_ENABLED, l'en-tête ne démarre pas l'échantillonnage"""
+        with override_settings(PROFILING_DIR=self.directory.name), \
+                patch('config.profiling.profile_scope') as scope:
+            response = APIClient().get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 401)
+        scope.assert_not_called()
+
+    def test_threshold_and_retention(self):
+        """PROFILING_ENABLED : seules les requêtes au-delà du seuil sont gardées"""
+        self.client.force_authenticate(user=self.patient)
+        with override_settings(PROFILING_DIR=self.directory.name, PROFILING_ENABLED=True,
+                               PROFILING_THRESHOLD_MS=60000):
+            self.client.get(self.url)
+        self.assertEqual(load_profiles(self.directory.name), [])
+
+        with override_settings(PROFILING_DIR=self.directory.name, PROFILING_ENABLED=True,
+                               PROFILING_THRESHOLD_MS=0, PROFILING_MAX_FILES=2):
+            client = APIClient()
+            client.force_authenticate(user=self.patient)
+            for _ in range(3):
+                client.get(self.url)
+        self.assertEqual(len(load_profiles(self.directory.name)), 2)
+        self.assertEqual(len(os.listdir(self.directory.name)), 4)
+
+    def test_profiles_command(self):
+        """Liste et résumé des profils enregistrés"""
+        self.client.force_authenticate(user=self.staff)
+        with override_settings(PROFILING_DIR=self.directory.name, PROFILING_HEADER_ENABLED=True):
+            self.client.get(self.url, HTTP_X_PROFILE='1')
+
+            out = StringIO()
+            call_command('profiles', stdout=out)
+            self.assertIn('notification-list', out.getvalue())
+
+            out = StringIO()
+            call_command('profiles', '--summary', '--route=notification-list', stdout=out)
+            self.assertIn('1 profil(s)', out.getvalue())
+            self.assertIn('Requêtes SQL', out.getvalue())
+
+            call_command('profiles', '--purge', stdout=StringIO())
+            self.assertEqual(os.listdir(self.directory.name), [])
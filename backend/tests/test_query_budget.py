@@ -0,0 +1,88 @@
+"""
+Tests du budget de requêtes SQL et de la détection des N+1 (config.query_budget)
+"""
+from datetime import time as dt_time, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.appointments.models import Appointment, AppointmentHistory
+from apps.appointments.views import AppointmentViewSet
+from config.query_budget import QueryBudgetExceeded, assert_max_queries, fingerprint
+
+User = get_user_model()
+
+
+class QueryBudgetTestCase(TestCase):
+    """Tests de l'instrumentation des requêtes SQL"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            email='staff@example.com',
+            password='TestPassword123!',
+            first_name='Staff',
+            last_name='Test',
+            role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.staff)
+        self.appointment = Appointment.objects.create(
+            patient_first_name='Jean',
+            patient_last_name='Dupont',
+            patient_email='patient@example.com',
+            patient_phone='06 123 45 67',
+            date=timezone.localdate() + timedelta(days=3),
+            time=dt_time(10, 0),
+            consultation_type='generale',
+            status='pending'
+        )
+        self.history_url = reverse('appointments-history', args=[self.appointment.pk])
+
+    def test_fingerprint_ignores_values(self):
+        """Les requêtes qui ne diffèrent que par leurs valeurs ont la même empreinte"""
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+            fingerprint('SELECT *  FROM "t" WHERE "id" IN (%s) LIMIT 5'),
+        )
+        self.assertNotEqual(
+            fingerprint("SELECT * FROM t WHERE a = 'x'"),
+            fingerprint("SELECT * FROM t WHERE b = 'x'"),
+        )
+
+    def test_assert_max_queries_reports_duplicates(self):
+        """Le helper de test échoue en listant les requêtes répétées"""
+        with self.assertRaises(QueryBudgetExceeded) as context:
+            with assert_max_queries(2):
+                for _ in range(3):
+                    list(Appointment.objects.filter(pk=self.appointment.pk))
+
+        self.assertIn('3x SELECT', str(context.exception))
+
+    @override_settings(QUERY_BUDGET_HEADERS=True)
+    def test_history_query_count_is_constant(self):
+        """L'historique ne fait pas une requête par ligne (acteur, RDV préchargés)"""
+        for _ in range(10):
+            AppointmentHistory.objects.create(
+                appointment=self.appointment,
+                action_type='modified',
+                actor=self.staff,
+                actor_type='admin'
+            )
+
+        response = self.client.get(self.history_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['history']), 10)
+        self.assertLessEqual(int(response['X-Query-Count']), 3)
+        self.assertEqual(response['X-Query-Duplicates'], '0')
+        self.assertEqual(response['X-Query-Budget'], '6')
+
+    def test_view_budget_enforced_in_tests(self):
+        """Une vue qui dépasse son budget fait échouer le test"""
+        with patch.object(AppointmentViewSet, 'query_budget', {'history': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.history_url)
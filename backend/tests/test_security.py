@@ -1,8 +1,17 @@
 """
 Tests de sécurité
 """
+import json
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
 import pytest
-from django.test import TestCase
+from django.core.cache import cache
+from django.urls import reverse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -10,6 +19,19 @@ from rest_framework import status
 from apps.users.sanitizers import sanitize_text_input
 from apps.users.validators import calculate_password_strength
 from apps.content_management.validators import validate_image_file
+from apps.users.models_audit import LoginAttempt, SecurityHourlySummary
+from apps.users.security_counters import (
+    floor_hour, get_login_summary, get_window_count, is_brute_force,
+    record_event, record_login_attempt, rollup_security_summary,
+)
+from config.advanced_throttling import (
+    CombinedRateThrottle, DynamicRateThrottle, add_to_blacklist, is_temporarily_blacklisted,
+    remove_from_blacklist,
+)
+from config.ip_matcher import IPRangeSet, temporary_blacklist
+from config.json_validators import JSONLimitExceeded, StrictJSONParser, get_request_json, parse_json
+from config.renderers import FastJSONRenderer
+from config.rate_limit import CacheGCRABackend, RedisGCRABackend
 
 User = get_user_model()
 
@@ -182,6 +204,237 @@ class ThrottlingTestCase(TestCase):
             )
 
 
+class GCRABackendTestCase(TestCase):
+    """Tests du moteur de rate limiting GCRA (config.rate_limit)"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_cache_backend_burst_then_steady_rate(self):
+        """Rafale jusqu'à la limite, puis une requête par intervalle"""
+        backend = CacheGCRABackend()
+        now = 1000.0
+        with patch.object(backend, '_now', side_effect=lambda: now):
+            results = [backend.consume('gcra:test', 5, 60) for _ in range(6)]
+            self.assertEqual([allowed for allowed, _ in results], [True] * 5 + [False])
+            self.assertAlmostEqual(results[-1][1], 12.0)
+            self.assertEqual(backend.get_status('gcra:test', 5, 60)['remaining'], 0)
+            
+            now += 12
+            self.assertTrue(backend.consume('gcra:test', 5, 60)[0])
+            self.assertFalse(backend.consume('gcra:test', 5, 60)[0])
+            
+            now += 60
+            self.assertEqual(backend.get_status('gcra:test', 5, 60)['remaining'], 5)
+    
+    def test_cache_backend_constant_state(self):
+        """L'état stocké reste une seule valeur, quel que soit le trafic"""
+        backend = CacheGCRABackend()
+        for _ in range(50):
+            backend.consume('gcra:state', 100, 3600)
+        self.assertIsInstance(cache.get('gcra:state'), float)
+    
+    def test_redis_backend_lua_script(self):
+        """Le script Lua applique la même règle en un aller-retour"""
+        fakeredis = pytest.importorskip('fakeredis')
+        client = fakeredis.FakeStrictRedis()
+        with patch('django_redis.get_redis_connection', return_value=client):
+            backend = RedisGCRABackend()
+        
+        results = [backend.consume('gcra:redis', 3, 60) for _ in range(4)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertGreater(results[-1][1], 19)
+        self.assertEqual(backend.get_status('gcra:redis', 3, 60)['remaining'], 0)
+        self.assertGreater(client.pttl('vida:throttle:gcra:redis'), 0)
+
+
+class IPMatcherTestCase(TestCase):
+    """Tests des listes d'IPs compilées (config.ip_matcher)"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def _request(self, ip_address):
+        request = RequestFactory().get('/', REMOTE_ADDR=ip_address)
+        request.user = type('Anonymous', (), {'is_authenticated': False})()
+        return request
+    
+    def test_range_set_cidr_and_merge(self):
+        """Réseaux CIDR, IPv6 et plages adjacentes fusionnées"""
+        ranges = IPRangeSet([
+            '10.0.0.0/25', '10.0.0.128/25', '203.0.113.7', '2001:db8::/32', 'invalide'
+        ])
+        
+        self.assertEqual(len(ranges), 3)
+        self.assertIn('10.0.0.200', ranges)
+        self.assertIn('203.0.113.7', ranges)
+        self.assertIn('::ffff:203.0.113.7', ranges)
+        self.assertIn('2001:db8:1::1', ranges)
+        self.assertNotIn('10.0.1.0', ranges)
+        self.assertNotIn('203.0.113.8', ranges)
+        self.assertNotIn('pas-une-ip', ranges)
+    
+    @override_settings(THROTTLE_WHITELIST_IPS=['192.168.0.0/16'], THROTTLE_BLACKLIST_IPS=['198.51.100.0/24'])
+    def test_throttle_lists_accept_networks(self):
+        """Whitelist et blacklist acceptent des réseaux"""
+        throttle = CombinedRateThrottle()
+        
+        self.assertTrue(throttle.is_whitelisted(self._request('192.168.4.2')))
+        self.assertTrue(throttle.is_blacklisted(self._request('198.51.100.77')))
+        self.assertFalse(throttle.is_blacklisted(self._request('198.51.101.1')))
+    
+    def test_temporary_blacklist_versioned(self):
+        """La blacklist temporaire est prise en compte puis retirée"""
+        throttle = CombinedRateThrottle()
+        request = self._request('100.64.3.4')
+        self.assertFalse(throttle.is_blacklisted(request))
+        
+        add_to_blacklist('100.64.0.0/10', duration=60)
+        self.assertTrue(throttle.is_blacklisted(request))
+        
+        remove_from_blacklist('100.64.0.0/10')
+        self.assertFalse(throttle.is_blacklisted(request))
+
+    
+    def test_temporary_blacklist_concurrent_adds(self):
+        """Deux ajouts simultanés depuis des workers différents sont tous deux conservés"""
+        load_entries = temporary_blacklist._load_entries
+        
+        def slow_load():
+            entries = load_entries()
+            time.sleep(0.05)
+            return entries
+        
+        with patch.object(temporary_blacklist, '_load_entries', side_effect=slow_load):
+            threads = [
+                threading.Thread(target=add_to_blacklist, args=(ip_address, 60))
+                for ip_address in ('100.64.0.1', '100.64.0.2')
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        self.assertTrue(is_temporarily_blacklisted('100.64.0.1'))
+        self.assertTrue(is_temporarily_blacklisted('100.64.0.2'))
+
+class JSONParsingTestCase(TestCase):
+    """Tests du décodage JSON en une passe (config.json_validators)"""
+    
+    def test_complexity_measured_while_parsing(self):
+        """Profondeur, éléments et plus grand conteneur mesurés au décodage"""
+        data, complexity = parse_json('{"a": [1, 2, {"b": {}}], "c": [[3]], "d": 4}')
+        
+        self.assertEqual(data['a'][2], {'b': {}})
+        self.assertEqual(complexity.depth, 3)
+        self.assertEqual(complexity.elements, 9)
+        self.assertEqual(complexity.widest, 3)
+        self.assertEqual(parse_json('"texte"')[1].depth, 0)
+    
+    def test_limits_abort_parsing(self):
+        """Les limites interrompent le décodage"""
+        with self.assertRaises(JSONLimitExceeded):
+            parse_json('{"a": ' * 12 + '1' + '}' * 12, max_depth=10)
+        with self.assertRaises(JSONLimitExceeded):
+            parse_json('[' * 100000 + ']' * 100000, max_depth=10)
+        with self.assertRaises(JSONLimitExceeded):
+            parse_json('[' + ','.join(['{"k": 1}'] * 600) + ']', max_size=1000)
+        
+        parse_json('{"a": ' * 10 + '1' + '}' * 10, max_depth=10)
+    
+    def test_large_array_rejected_before_decoding(self):
+        """Un grand tableau est rejeté sans être construit ; les virgules des chaînes ne comptent pas"""
+        with patch('config.json_validators.json.loads') as loads:
+            with self.assertRaises(JSONLimitExceeded):
+                parse_json('[' + ','.join(['0'] * 1000000) + ']', max_size=1000)
+        loads.assert_not_called()
+        
+        data, complexity = parse_json(json.dumps({'text': 'a, \\"b\\", ' * 1000}), max_size=1000)
+        self.assertEqual(complexity.elements, 1)
+    
+    def test_body_decoded_once(self):
+        """Le JSON décodé par un middleware est réutilisé par le parser DRF"""
+        request = RequestFactory().post(
+            '/api/auth/login/', data='{"email": "user@example.com"}', content_type='application/json'
+        )
+        
+        with patch('config.json_validators.json.loads', wraps=json.loads) as loads:
+            self.assertEqual(get_request_json(request), {'email': 'user@example.com'})
+            drf_request = type('DRFRequest', (), {'_request': request})()
+            data = StrictJSONParser().parse(
+                None, parser_context={'request': drf_request, 'encoding': 'utf-8'}
+            )
+        
+        self.assertEqual(data, {'email': 'user@example.com'})
+        self.assertEqual(loads.call_count, 1)
+    
+    def test_parser_rejects_too_complex_body(self):
+        """Un corps trop profond est refusé par l'API"""
+        client = APIClient()
+        body = '{"email": ' * 20 + '"x"' + '}' * 20
+        
+        response = client.post(reverse('token_obtain_pair'), data=body, content_type='application/json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('trop profond', str(response.json()))
+    
+    def test_deeply_nested_arrays_rejected(self):
+        """Des tableaux très imbriqués sont refusés (400), sans RecursionError"""
+        for n in (400, 990):
+            with self.assertRaises(JSONLimitExceeded):
+                parse_json('[' * n + ']' * n, max_depth=10)
+        self.assertEqual(parse_json('[' * 900 + ']' * 900)[1].depth, 899)
+        
+        response = APIClient().post(
+            reverse('token_obtain_pair'), data='[' * 400 + ']' * 400, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('trop profond', str(response.json()))
+
+
+class JSONRendererTestCase(TestCase):
+    """Tests du renderer JSON de l'API (config.renderers)"""
+    
+    def test_backends_render_identically(self):
+        """orjson et stdlib : même sortie, types DRF et échappement HTML"""
+        import datetime
+        import decimal
+        import uuid
+        
+        data = [{
+            'text': '<script>alert("x")</script> & é\u2028',
+            'price': decimal.Decimal('12.50'),
+            'uuid': uuid.UUID(int=1),
+            'created_at': datetime.datetime(2024, 1, 1, 8, 30, tzinfo=datetime.timezone.utc),
+            'date': datetime.date(2024, 1, 2),
+            'time': datetime.time(10, 5),
+        }]
+        
+        rendered = FastJSONRenderer().render(data)
+        with override_settings(JSON_RENDERER_BACKEND='stdlib'):
+            self.assertEqual(FastJSONRenderer().render(data), rendered)
+        
+        self.assertNotIn(b'<', rendered)
+        self.assertNotIn(b'&', rendered)
+        self.assertIn(b'"created_at":"2024-01-01T08:30:00Z"', rendered)
+        self.assertEqual(json.loads(rendered)[0]['price'], 12.5)
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+    
+    def test_backends_agree_on_edge_cases(self):
+        """NaN / Infinity écrits null et entiers au-delà de 64 bits conservés, quel que soit le backend"""
+        data = {'ratio': float('nan'), 'limit': [float('inf')], 'big': 2 ** 70, 'ok': 1.5}
+        
+        rendered = FastJSONRenderer().render(data)
+        with override_settings(JSON_RENDERER_BACKEND='stdlib'):
+            self.assertEqual(FastJSONRenderer().render(data), rendered)
+        
+        self.assertEqual(
+            json.loads(rendered),
+            {'ratio': None, 'limit': [None], 'big': 2 ** 70, 'ok': 1.5}
+        )
+        self.assertEqual(FastJSONRenderer().render({'big': 2 ** 70}), b'{"big":1180591620717411303424}')
+
+
 class CSRFProtectionTestCase(TestCase):
     """Tests de protection CSRF"""
     
@@ -274,3 +527,101 @@ class SecurityHeadersTestCase(TestCase):
         
         self.assertIn('Referrer-Policy', response)
         self.assertEqual(response['Referrer-Policy'], 'strict-origin-when-cross-origin')
+
+
+class SecurityCountersTestCase(TestCase):
+    """Tests des compteurs de sécurité (fenêtres glissantes et synthèses horaires)"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_sliding_window_expires(self):
+        """Les événements sortent de la fenêtre après son expiration"""
+        now = time.time()
+        record_event('login_failed', 'ip', '10.0.0.1', now=now)
+        record_event('login_failed', 'ip', '10.0.0.1', now=now - 1200)
+        
+        self.assertEqual(get_window_count('login_failed', 'ip', '10.0.0.1', window=900, now=now), 1)
+        self.assertEqual(get_window_count('login_failed', 'ip', '10.0.0.1', window=3600, now=now), 2)
+        self.assertEqual(get_window_count('login_failed', 'ip', '10.0.0.1', now=now + 4000), 0)
+    
+    @override_settings(SECURITY_BRUTE_FORCE_IP_THRESHOLD=3, SECURITY_BRUTE_FORCE_USERNAME_THRESHOLD=2)
+    def test_brute_force_thresholds(self):
+        """La force brute est détectée par IP ou par identifiant"""
+        record_login_attempt('10.0.0.1', 'Victim@Example.com', success=False)
+        self.assertFalse(is_brute_force(ip_address='10.0.0.1', username='victim@example.com'))
+        
+        record_login_attempt('10.0.0.2', 'victim@example.com', success=False)
+        self.assertTrue(is_brute_force(username='victim@example.com'))
+        self.assertFalse(is_brute_force(ip_address='10.0.0.1'))
+        
+        record_login_attempt('10.0.0.1', 'other@example.com', success=False)
+        record_login_attempt('10.0.0.1', 'third@example.com', success=False)
+        self.assertTrue(is_brute_force(ip_address='10.0.0.1'))
+    
+    def test_suspicious_behavior_reads_counters(self):
+        """DynamicRateThrottle s'appuie sur les compteurs glissants"""
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.9')
+        request.user = type('Anonymous', (), {'is_authenticated': False})()
+        throttle = DynamicRateThrottle()
+        
+        self.assertFalse(throttle.is_suspicious_behavior(request))
+        for _ in range(11):
+            record_login_attempt('10.0.0.9', 'victim@example.com', success=False)
+        self.assertTrue(throttle.is_suspicious_behavior(request))
+    
+    def test_rollup_catches_up_missed_hours(self):
+        """Tâche interrompue plus de SUMMARY_LOOKBACK_HOURS : les heures manquées sont agrégées"""
+        now = timezone.now()
+        for hours_ago in (10, 6):
+            LoginAttempt.objects.create(
+                username='victim@example.com', ip_address='10.0.0.1', success=False,
+                timestamp=now - timedelta(hours=hours_ago)
+            )
+        rollup_security_summary(end=floor_hour(now) - timedelta(hours=9))
+        self.assertEqual(SecurityHourlySummary.objects.count(), 1)
+        
+        rollup_security_summary()
+        
+        self.assertEqual(SecurityHourlySummary.objects.count(), 2)
+        summary = get_login_summary(now - timedelta(hours=12), now)
+        self.assertEqual(summary['failed'], 2)
+    
+    def test_suspicious_behavior_halves_rate(self):
+        """Un comportement suspect réduit de moitié la limite appliquée à la requête"""
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.8')
+        request.user = type('Anonymous', (), {'is_authenticated': False})()
+        throttle = DynamicRateThrottle()
+        
+        throttle.allow_request(request, None)
+        self.assertEqual(throttle.num_requests, 150)
+        
+        for _ in range(11):
+            record_login_attempt('10.0.0.8', 'victim@example.com', success=False)
+        throttle.allow_request(request, None)
+        self.assertEqual(throttle.num_requests, 75)
+        throttle.allow_request(request, None)
+        self.assertEqual(throttle.num_requests, 75)
+    
+    def test_login_summary_matches_raw_rows(self):
+        """Synthèses horaires et heures non agrégées donnent les mêmes totaux"""
+        now = timezone.now()
+        for hours_ago, ip_address, success in [
+            (5, '10.0.0.1', False), (5, '10.0.0.1', False), (4, '10.0.0.2', True),
+            (3, '10.0.0.1', False), (0, '10.0.0.3', False),
+        ]:
+            LoginAttempt.objects.create(
+                username='victim@example.com', ip_address=ip_address, success=success,
+                timestamp=now - timedelta(hours=hours_ago)
+            )
+        start, end = now - timedelta(hours=6), now + timedelta(seconds=1)
+        expected = get_login_summary(start, end)
+        
+        rollup_security_summary(start=floor_hour(start), end=floor_hour(now) - timedelta(hours=1))
+        self.assertTrue(SecurityHourlySummary.objects.exists())
+        
+        self.assertEqual(get_login_summary(start, end), expected)
+        self.assertEqual(expected['total'], 5)
+        self.assertEqual(expected['failed'], 4)
+        self.assertEqual(expected['top_failed_ips'][0], ('10.0.0.1', 3))
+        self.assertEqual(expected['top_failed_usernames'], [('victim@example.com', 4)])
@@ -0,0 +1,126 @@
+"""
+Tests des échéances de requête (config.timeouts)
+"""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from config.timeouts import (
+    DeadlineQueryWrapper, RequestTimeoutError, deadline_scope, get_current_deadline,
+    make_request, timeout_decorator,
+)
+
+User = get_user_model()
+
+
+class DeadlineTestCase(TestCase):
+    """Tests du mécanisme d'échéance"""
+
+    def test_expired_deadline_blocks_queries(self):
+        """Une requête SQL n'est plus exécutée une fois le budget épuisé"""
+        with deadline_scope(30):
+            User.objects.count()
+
+        with self.assertRaises(RequestTimeoutError):
+            with deadline_scope(0):
+                User.objects.count()
+
+        # Hors échéance, les requêtes ne sont plus contrôlées
+        self.assertIsNone(get_current_deadline())
+        User.objects.count()
+
+    def test_nested_scope_cannot_extend_budget(self):
+        """Une échéance imbriquée reste bornée par l'échéance englobante"""
+        with deadline_scope(1) as outer:
+            with deadline_scope(60) as inner:
+                self.assertLessEqual(inner.remaining(), outer.remaining() + 0.01)
+                self.assertIs(get_current_deadline(), inner)
+            self.assertIs(get_current_deadline(), outer)
+
+    def test_deadline_is_per_thread(self):
+        """Les échéances ne fuient pas entre threads (workers threadés)"""
+        seen = []
+
+        with deadline_scope(30):
+            thread = threading.Thread(target=lambda: seen.append(get_current_deadline()))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(seen, [None])
+
+    @patch('config.timeouts.default_session.request')
+    def test_make_request_uses_remaining_budget(self, mock_request):
+        """Les appels HTTP sortants reçoivent le budget restant"""
+        with deadline_scope(2):
+            make_request('GET', 'https://api.example.com/data')
+
+        connect, read = mock_request.call_args.kwargs['timeout']
+        self.assertLessEqual(connect, 2)
+        self.assertLessEqual(read, 2)
+
+        with self.assertRaises(RequestTimeoutError):
+            with deadline_scope(0):
+                make_request('GET', 'https://api.example.com/data')
+
+    def test_decorator_reports_overrun(self):
+        """Le décorateur signale un dépassement sans signal.alarm"""
+        @timeout_decorator(0.01)
+        def slow_function():
+            time.sleep(0.05)
+            return 'ok'
+
+        with self.assertRaises(TimeoutError):
+            slow_function()
+
+    def test_statement_timeout_follows_budget(self):
+        """PostgreSQL : statement_timeout réglé au budget, sans SET à chaque requête"""
+        connection = MagicMock(vendor='postgresql', in_atomic_block=False)
+        wrapper = DeadlineQueryWrapper(connection)
+        cursor = MagicMock()
+        execute = MagicMock(return_value='result')
+
+        with deadline_scope(5):
+            for _ in range(3):
+                self.assertEqual(
+                    wrapper(execute, 'SELECT 1', None, False, {'cursor': cursor}), 'result'
+                )
+
+        cursor.cursor.execute.assert_called_once()
+        sql = cursor.cursor.execute.call_args.args[0]
+        self.assertTrue(sql.startswith('SET statement_timeout = '))
+        self.assertLessEqual(int(sql.rsplit(' ', 1)[1]), 5000)
+        self.assertEqual(execute.call_count, 3)
+
+    def test_statement_timeout_reapplied_after_rollback(self):
+        """Un SET annulé par le rollback de sa transaction est réappliqué"""
+        connection = MagicMock(vendor='postgresql', in_atomic_block=True, run_on_commit=[])
+        connection.on_commit.side_effect = lambda func: connection.run_on_commit.append((set(), func, False))
+        wrapper = DeadlineQueryWrapper(connection)
+        cursor = MagicMock()
+        execute = MagicMock()
+
+        with deadline_scope(5):
+            wrapper(execute, 'SELECT 1', None, False, {'cursor': cursor})
+            wrapper(execute, 'SELECT 1', None, False, {'cursor': cursor})
+            self.assertEqual(cursor.cursor.execute.call_count, 1)
+
+            # Rollback : les callbacks on_commit sont abandonnés
+            connection.run_on_commit.clear()
+            connection.in_atomic_block = False
+            wrapper(execute, 'SELECT 1', None, False, {'cursor': cursor})
+            self.assertEqual(cursor.cursor.execute.call_count, 2)
+
+            # Commit : le SET est conservé
+            connection.in_atomic_block = True
+            wrapper = DeadlineQueryWrapper(connection)
+            wrapper(execute, 'SELECT 1', None, False, {'cursor': cursor})
+            self.assertEqual(cursor.cursor.execute.call_count, 3)
+            for _, callback, _ in connection.run_on_commit:
+                callback()
+            connection.run_on_commit.clear()
+            connection.in_atomic_block = False
+            wrapper(execute, 'SELECT 1', None, False, {'cursor': cursor})
+            self.assertEqual(cursor.cursor.execute.call_count, 3)
@@ -1,9 +1,18 @@
 'use client';
 
-import { createContext, useContext, useState, useEffect, ReactNode, useCallback } from 'react';
+import { createContext, useContext, useState, useEffect, useRef, ReactNode, useCallback } from 'react';
 import { useAuth } from './AuthContext';
 import api from '@/lib/api';
 
+const WS_URL =
+  process.env.NEXT_PUBLIC_WS_URL ||
+  (process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1')
+    .replace('/api/v1', '')
+    .replace(/^http/, 'ws') + '/ws/notifications/';
+
+// Délai avant reconnexion du WebSocket (le polling prend le relais entre-temps)
+const WS_RECONNECT_DELAY = 10000;
+
 /**
  * Interface pour une notification
  */
@@ -52,7 +61,8 @@ const NotificationContext = createContext<NotificationContextType | undefined>(u
  * 
  * Fonctionnalités :
  * - Récupération des notifications
- * - Polling automatique toutes les 30s (quand connecté)
+ * - Mises à jour poussées par WebSocket (/ws/notifications/)
+ * - Polling toutes les 30s uniquement si le WebSocket est indisponible
  * - Count des notifications non lues
  * - Actions : marquer lu, supprimer, etc.
  */
@@ -63,6 +73,10 @@ export function NotificationProvider({ children }: { children: ReactNode }) {
   const [isLoading, setIsLoading] = useState(false);
   const [isPolling, setIsPolling] = useState(false);
   const [pollingInterval, setPollingInterval] = useState<NodeJS.Timeout | null>(null);
+  const [isSocketOpen, setIsSocketOpen] = useState(false);
+  const socketRef = useRef<WebSocket | null>(null);
+
+  const isSocketConnected = () => socketRef.current?.readyState === WebSocket.OPEN;
 
   /**
    * Récupérer les notifications de l'utilisateur
@@ -109,8 +123,10 @@ export function NotificationProvider({ children }: { children: ReactNode }) {
         )
       );
       
-      // Mettre à jour le count
-      setUnreadCount(prev => Math.max(0, prev - 1));
+      // Mettre à jour le count (sinon poussé par le WebSocket)
+      if (!isSocketConnected()) {
+        setUnreadCount(prev => Math.max(0, prev - 1));
+      }
     } catch (error) {
       console.error('Erreur lors du marquage comme lu:', error);
     }
@@ -130,8 +146,10 @@ export function NotificationProvider({ children }: { children: ReactNode }) {
         )
       );
       
-      // Mettre à jour le count
-      setUnreadCount(prev => prev + 1);
+      // Mettre à jour le count (sinon poussé par le WebSocket)
+      if (!isSocketConnected()) {
+        setUnreadCount(prev => prev + 1);
+      }
     } catch (error) {
       console.error('Erreur lors du marquage comme non lu:', error);
     }
@@ -167,8 +185,8 @@ export function NotificationProvider({ children }: { children: ReactNode }) {
       const notif = notifications.find(n => n.id === id);
       setNotifications(prev => prev.filter(n => n.id !== id));
       
-      // Mettre à jour le count si la notification était non lue
-      if (notif && !notif.is_read) {
+      // Mettre à jour le count si la notification était non lue (sinon poussé par le WebSocket)
+      if (notif && !notif.is_read && !isSocketConnected()) {
         setUnreadCount(prev => Math.max(0, prev - 1));
       }
     } catch (error) {
@@ -218,22 +236,71 @@ export function NotificationProvider({ children }: { children: ReactNode }) {
   }, [pollingInterval]);
 
   /**
-   * Démarrer le polling quand l'utilisateur est connecté
+   * Connexion WebSocket : compteurs et nouvelles notifications poussés par le serveur
+   */
+  useEffect(() => {
+    if (!isAuthenticated || typeof window === 'undefined') return;
+
+    let closedByClient = false;
+    let reconnectTimer: NodeJS.Timeout | null = null;
+
+    const connect = () => {
+      const socket = new WebSocket(WS_URL);
+      socketRef.current = socket;
+
+      socket.onopen = () => setIsSocketOpen(true);
+
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+
+        if (data.type === 'unread_count') {
+          setUnreadCount(data.unread_count);
+        } else if (data.type === 'notification') {
+          // Une nouvelle notification est toujours non lue
+          setNotifications(prev => [data.notification, ...prev]);
+          setUnreadCount(prev => prev + 1);
+        } else if (data.type === 'count_delta') {
+          setUnreadCount(prev => Math.max(0, prev + data.unread_delta));
+        }
+      };
+
+      socket.onclose = () => {
+        setIsSocketOpen(false);
+        socketRef.current = null;
+        if (!closedByClient) {
+          reconnectTimer = setTimeout(connect, WS_RECONNECT_DELAY);
+        }
+      };
+    };
+
+    connect();
+
+    return () => {
+      closedByClient = true;
+      if (reconnectTimer) clearTimeout(reconnectTimer);
+      socketRef.current?.close();
+    };
+  }, [isAuthenticated]);
+
+  /**
+   * Polling de secours quand l'utilisateur est connecté sans WebSocket
    */
   useEffect(() => {
-    if (isAuthenticated) {
+    if (isAuthenticated && !isSocketOpen) {
       fetchUnreadCount();
       startPolling();
     } else {
       stopPolling();
-      setNotifications([]);
-      setUnreadCount(0);
+      if (!isAuthenticated) {
+        setNotifications([]);
+        setUnreadCount(0);
+      }
     }
 
     return () => {
       stopPolling();
     };
-  }, [isAuthenticated, fetchUnreadCount, startPolling, stopPolling]);
+  }, [isAuthenticated, isSocketOpen, fetchUnreadCount, startPolling, stopPolling]);
 
   return (
     <NotificationContext.Provider